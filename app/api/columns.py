@@ -0,0 +1,48 @@
+from datetime import date
+from itertools import groupby
+
+# Value of the `format` query parameter selecting the columnar encoding.
+COLUMNAR_FORMAT = "columnar"
+
+
+def _station_runs(values: list) -> dict:
+    # Rows come ordered by station, so each station ID is sent once with the
+    # number of consecutive rows it covers.
+    runs = [(value, sum(1 for _ in group)) for value, group in groupby(values)]
+    return {"values": [value for value, _ in runs], "runs": [count for _, count in runs]}
+
+
+def _date_deltas(values: list) -> dict:
+    # The first date in full, then each row's distance in days from the row
+    # before it: mostly 1 for daily data, negative where a new station starts.
+    days = [(value if isinstance(value, date) else date.fromisoformat(value)).toordinal()
+            for value in values]
+    if not days:
+        return {"start": None, "deltas": []}
+    return {"start": date.fromordinal(days[0]).isoformat(),
+            "deltas": [0] + [day - previous for previous, day in zip(days, days[1:])]}
+
+
+def encode_columns(items: list[dict], fields: tuple) -> dict:
+    """
+    Encodes a page of rows as one array per field instead of one object per
+    row, so that key names are not repeated on every row:
+
+        {"length": 3,
+         "station_id": {"values": ["USC00110072"], "runs": [3]},
+         "date": {"start": "1985-01-01", "deltas": [0, 1, 1]},
+         "max_temp": [-2.2, -12.2, null], ...}
+
+    `station_id` is run-length encoded and `date` delta encoded in days;
+    every other field is a plain array. Dates may be `date`s or ISO strings.
+    """
+    columns = {"length": len(items)}
+    for field in fields:
+        values = [item[field] for item in items]
+        if field == "station_id":
+            columns[field] = _station_runs(values)
+        elif field == "date":
+            columns[field] = _date_deltas(values)
+        else:
+            columns[field] = values
+    return columns
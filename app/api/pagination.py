@@ -0,0 +1,31 @@
+import json
+import base64
+import binascii
+from fastapi import HTTPException
+
+# Response header carrying the cursor of the next page.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*key) -> str:
+    """
+    Encodes the sort key of the last row of a page into an opaque cursor.
+    The key values must be JSON serializable (dates are passed as ISO strings).
+    """
+    payload = json.dumps(list(key), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: tuple) -> tuple:
+    """
+    Decodes a cursor produced by `encode_cursor`, converting each key part with
+    the matching callable in `types`. Malformed cursors are rejected with a 400.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(key, list) or len(key) != len(types):
+            raise ValueError("cursor has the wrong number of key parts")
+        return tuple(convert(value) for convert, value in zip(types, key))
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -1,13 +1,55 @@
+import io
+import csv
+import json
+import zlib
 from datetime import date
-from fastapi import APIRouter, Depends, HTTPException, Query
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Integer, and_, cast, func, literal, or_, select, tuple_
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Dict, List
 from app import models
 from app.schemas import weather as weather_schema
+from app.core.cache import cached_json_response
+from app.core.serialization import FastJSONResponse, dumps
 from app.core.database import SessionLocal
+from app.core.generation import RECORDS_GENERATION_ROW_ID, current_generation
+from app.services import catalog, columnar, partitions
+from app.services.downsample import lttb_indices
+from app.api.columns import COLUMNAR_FORMAT, encode_columns
+from app.api.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
 
 router = APIRouter()
 
+# Rows fetched from the database per round trip while streaming an export.
+EXPORT_FETCH_SIZE = 5000
+EXPORT_COLUMNS = ("station_id", "date", "max_temp", "min_temp", "precip")
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+# SQLite expressions mapping a record's date onto the first day of its bucket
+# (weeks start on Monday).
+SERIES_BUCKETS = {
+    "day": lambda column: func.date(column),
+    "week": lambda column: func.date(column, "-6 days", "weekday 1"),
+    "month": lambda column: func.date(column, "start of month"),
+    "year": lambda column: func.date(column, "start of year"),
+}
+# Upper bound on `max_points`, keeping downsampled responses small.
+MAX_SERIES_POINTS = 10000
+# Columns selected for the paginated endpoints, in the order of the response
+# schemas' fields so that rows encode exactly like the schemas would.
+RECORD_FIELDS = tuple(weather_schema.WeatherRecord.model_fields)
+STATS_FIELDS = tuple(weather_schema.WeatherStats.model_fields)
+MONTHLY_STATS_FIELDS = tuple(weather_schema.WeatherMonthlyStats.model_fields)
+CLIMATOLOGY_FIELDS = tuple(weather_schema.WeatherClimatology.model_fields)
+ANOMALY_VALUES = ("max_temp", "min_temp", "precip")
+STATION_FIELDS = tuple(weather_schema.StationCoverage.model_fields)
+SERIES_FIELDS = tuple(weather_schema.WeatherSeriesPoint.model_fields)
+# Default records source of the statement builders: the unpartitioned table.
+RECORDS = models.WeatherRecord.__table__
+
 
 def get_db():
     """
@@ -22,6 +64,300 @@ def get_db():
         db.close()
 
 
+def _record_filters(station_id: str | None, start_date: date | None, end_date: date | None,
+                    records=RECORDS):
+    """
+    Builds the optional station and date range conditions on `records`, the
+    `weather_records` table or the partitions selected by
+    `partitions.records_source`.
+    """
+    filters = []
+    if station_id:
+        filters.append(records.c.station_id == station_id)
+    if start_date:
+        filters.append(records.c.date >= start_date)
+    if end_date:
+        filters.append(records.c.date <= end_date)
+    return filters
+
+
+def records_statement(station_id: str | None, start_date: date | None, end_date: date | None,
+                      skip: int, limit: int, cursor: str | None, records=RECORDS):
+    """
+    Builds the page query of `/weather`. Shared by the sync and async routers,
+    which only differ in how they execute it.
+    """
+    # Dynamically build the query based on the provided filter parameters.
+    # This is a clean and efficient way to handle optional filters.
+    # Plain columns rather than the entity: rows are encoded straight to JSON
+    # without hydrating ORM objects.
+    stmt = select(*(records.c[field] for field in RECORD_FIELDS)).where(
+        *_record_filters(station_id, start_date, end_date, records))
+
+    if cursor:
+        cursor_station_id, cursor_date = decode_cursor(
+            cursor, (str, date.fromisoformat))
+        stmt = stmt.where(
+            tuple_(records.c.station_id, records.c.date)
+            > tuple_(cursor_station_id, cursor_date))
+
+    # Apply pagination to the result set. Ordering by the unique (station_id, date)
+    # key makes pages stable and lets the `uix_station_date` index serve them.
+    return (
+        stmt.order_by(records.c.station_id, records.c.date)
+        .offset(skip).limit(limit)
+    )
+
+
+def _keyset_page(stmt, key_columns: tuple, key_types: tuple, skip: int, limit: int,
+                 cursor: str | None):
+    """
+    Orders `stmt` by the unique `key_columns` and applies the cursor, decoded
+    with `key_types`, and the `skip`/`limit` pagination.
+    """
+    if cursor:
+        stmt = stmt.where(tuple_(*key_columns) > tuple_(*decode_cursor(cursor, key_types)))
+    return stmt.order_by(*key_columns).offset(skip).limit(limit)
+
+
+def table_exists(connection: Connection, table) -> bool:
+    """
+    Whether `table` exists. Databases built before it was added and served
+    read-only, where `create_all` never runs, lack it.
+    """
+    try:
+        connection.execute(select(literal(1)).select_from(table).limit(1))
+    except OperationalError as e:
+        if "no such table" not in str(e.orig):
+            raise
+        return False
+    return True
+
+
+def stats_statement(station_id: str | None, year: int | None, skip: int, limit: int,
+                    cursor: str | None, with_extremes: bool = True):
+    """
+    Builds the page query of `/weather/stats`, joining each station-year to its
+    extremes through their `uix_extremes_station_year` index. Without the
+    extremes table (`with_extremes=False`), the extremes are null.
+    """
+    stats = models.WeatherStats
+    extremes = models.WeatherStatsExtremes
+    if with_extremes:
+        stmt = (
+            select(*(getattr(stats if hasattr(stats, field) else extremes, field)
+                     for field in STATS_FIELDS))
+            .outerjoin(extremes, and_(extremes.station_id == stats.station_id,
+                                      extremes.year == stats.year))
+        )
+    else:
+        stmt = select(*(getattr(stats, field) if hasattr(stats, field)
+                        else literal(None).label(field) for field in STATS_FIELDS))
+    if station_id:
+        stmt = stmt.where(models.WeatherStats.station_id == station_id)
+    if year:
+        stmt = stmt.where(models.WeatherStats.year == year)
+    return _keyset_page(stmt, (models.WeatherStats.station_id, models.WeatherStats.year),
+                        (str, int), skip, limit, cursor)
+
+
+def monthly_stats_statement(station_id: str | None, year: int | None, month: int | None,
+                            skip: int, limit: int, cursor: str | None):
+    """Builds the page query of `/weather/stats/monthly`."""
+    monthly = models.WeatherMonthlyStats
+    stmt = select(*(getattr(monthly, field) for field in MONTHLY_STATS_FIELDS))
+    if station_id:
+        stmt = stmt.where(monthly.station_id == station_id)
+    if year:
+        stmt = stmt.where(monthly.year == year)
+    if month:
+        stmt = stmt.where(monthly.month == month)
+    return _keyset_page(stmt, (monthly.station_id, monthly.year, monthly.month),
+                        (str, int, int), skip, limit, cursor)
+
+
+def climatology_statement(station_id: str | None, day_of_year: int | None, skip: int,
+                          limit: int, cursor: str | None):
+    """Builds the page query of `/weather/climatology`."""
+    normal = models.WeatherClimatology
+    stmt = select(*(getattr(normal, field) for field in CLIMATOLOGY_FIELDS))
+    if station_id:
+        stmt = stmt.where(normal.station_id == station_id)
+    if day_of_year:
+        stmt = stmt.where(normal.day_of_year == day_of_year)
+    return _keyset_page(stmt, (normal.station_id, normal.day_of_year),
+                        (str, int), skip, limit, cursor)
+
+
+def leap_day_of_year(column):
+    """
+    SQLite expression numbering a date 1-366 on the leap-year calendar of
+    `weather_climatology`, by moving it to the leap year 2000.
+    """
+    return cast(func.strftime("%j", literal("2000-").concat(func.strftime("%m-%d", column))),
+                Integer)
+
+
+def anomalies_statement(station_id: str, start_date: date | None, end_date: date | None,
+                        skip: int, limit: int, cursor: str | None, records=RECORDS,
+                        with_normals: bool = True):
+    """
+    Builds the page query of `/weather/anomalies`: the station's records, each
+    joined to its day's normal through the `uix_station_day_of_year` index.
+    Without the climatology table (`with_normals=False`), anomalies are null.
+    """
+    record = records.c
+    normal = models.WeatherClimatology
+    record_columns = (getattr(record, field)
+                      for field in weather_schema.WeatherRecordBase.model_fields)
+    if with_normals:
+        stmt = (
+            select(
+                *record_columns,
+                *((getattr(record, value) - getattr(normal, f"{value}_mean")).label(f"{value}_anomaly")
+                  for value in ANOMALY_VALUES),
+            )
+            .outerjoin(normal, and_(normal.station_id == record.station_id,
+                                    normal.day_of_year == leap_day_of_year(record.date)))
+        )
+    else:
+        stmt = select(*record_columns, *(literal(None).label(f"{value}_anomaly")
+                                         for value in ANOMALY_VALUES))
+    stmt = stmt.where(*_record_filters(station_id, start_date, end_date, records))
+    return _keyset_page(stmt, (record.station_id, record.date),
+                        (str, date.fromisoformat), skip, limit, cursor)
+
+
+def stations_statement(use_catalog: bool, start_date: date | None = None,
+                       end_date: date | None = None, min_records: int | None = None,
+                       records=RECORDS):
+    """
+    Builds the query listing the stations with their coverage, ordered by
+    station ID. Filters keep the stations with records within
+    [start_date, end_date] and at least `min_records` records.
+
+    The rows come from the `stations` catalog, or, until ingestion has built
+    it (`use_catalog=False`), are aggregated from the records.
+    """
+    if use_catalog:
+        source = models.Station.__table__
+    else:
+        source = catalog.coverage_query(records).subquery()
+    columns = source.c
+    stmt = select(*(columns[field] for field in STATION_FIELDS))
+    if start_date:
+        stmt = stmt.where(columns.last_date >= start_date)
+    if end_date:
+        stmt = stmt.where(columns.first_date <= end_date)
+    if min_records:
+        stmt = stmt.where(columns.record_count >= min_records)
+    return stmt.order_by(columns.station_id)
+
+
+def station_ids_statement(use_catalog: bool, start_date: date | None = None,
+                          end_date: date | None = None, min_records: int | None = None,
+                          records=RECORDS):
+    """
+    Builds the query of `/weather/stations`. Without a catalog or filters, a
+    plain `DISTINCT` is cheaper than aggregating the coverage.
+    """
+    if not use_catalog and not (start_date or end_date or min_records):
+        return select(records.c.station_id).distinct().order_by(records.c.station_id)
+    return stations_statement(use_catalog, start_date, end_date, min_records, records)
+
+
+def next_cursor_headers(rows, limit: int, key) -> dict:
+    """
+    Returns the `X-Next-Cursor` header for a full page, `key` giving the sort key
+    of its last row. A short page is the last one and gets no cursor.
+    """
+    if rows and len(rows) == limit:
+        return {NEXT_CURSOR_HEADER: encode_cursor(*key(rows[-1]))}
+    return {}
+
+
+def row_dicts(rows) -> list[dict]:
+    """
+    Converts result rows to dicts for `dumps`. The keys are made plain strings
+    once per page: the columns of subqueries, such as a union of partitions,
+    are keyed by `str` subclasses, which orjson refuses.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    fields = tuple(map(str, rows[0]._fields))
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def encode_page(items: list[dict], fields: tuple, response_format: str):
+    """The content of a page in the requested `format`: a list of objects, or columns."""
+    if response_format == COLUMNAR_FORMAT:
+        return encode_columns(items, fields)
+    return items
+
+
+def render_records(rows, limit: int, response_format: str = "json") -> Response:
+    """
+    Encodes a page of `records_statement` rows. The rows are already shaped like
+    the `WeatherRecord` schema, so they skip per-row model validation.
+    """
+    records = row_dicts(rows)
+    return FastJSONResponse(encode_page(records, RECORD_FIELDS, response_format),
+                            headers=next_cursor_headers(records, limit, lambda last: (
+                                last["station_id"], last["date"].isoformat())))
+
+
+def render_page(rows, limit: int, key, fields: tuple = (),
+                response_format: str = "json") -> tuple[bytes, dict]:
+    """
+    Serializes a page of rows selected in their schema's field order into the
+    body and headers to cache, `key` giving the cursor of the last row.
+    """
+    items = row_dicts(rows)
+    return (dumps(encode_page(items, fields, response_format)),
+            next_cursor_headers(items, limit, key))
+
+
+def render_stats(rows, limit: int, response_format: str = "json") -> tuple[bytes, dict]:
+    """Serializes a page of `stats_statement` rows into the body and headers to cache."""
+    return render_page(rows, limit, lambda last: (last["station_id"], last["year"]),
+                       STATS_FIELDS, response_format)
+
+
+def render_stations(rows) -> tuple[bytes, dict]:
+    return dumps([row.station_id for row in rows]), {}
+
+
+def columnar_page(station_id: str | None, start_date: date | None, end_date: date | None,
+                  skip: int, limit: int, cursor: str | None, response_format: str,
+                  records_generation) -> Response | None:
+    """
+    Serves a `/weather` page from the memory-mapped columnar store, when it is
+    enabled and built from the current records. Only single-station queries are
+    supported; None means the caller has to fall back to SQL.
+
+    `records_generation` returns the database's records generation, and is
+    only called when the store may answer.
+    """
+    store = columnar.columnar_store
+    if store is None or not station_id or skip < 0 or limit < 0:
+        return None
+    after_date = None
+    if cursor:
+        cursor_station_id, cursor_date = decode_cursor(cursor, (str, date.fromisoformat))
+        if cursor_station_id > station_id:
+            return FastJSONResponse(encode_page([], RECORD_FIELDS, response_format))
+        if cursor_station_id == station_id:
+            after_date = cursor_date
+    records = store.read_records(station_id, start_date, end_date, after_date, skip, limit,
+                                 records_generation())
+    if records is None:
+        return None
+    return FastJSONResponse(encode_page(records, RECORD_FIELDS, response_format),
+                            headers=next_cursor_headers(
+                                records, limit, lambda last: (last["station_id"], last["date"])))
+
+
 @router.get("/weather", response_model=List[weather_schema.WeatherRecord])
 def read_weather_records(
     station_id: str = Query(None, description="Filter by station ID"),
@@ -32,36 +368,283 @@ def read_weather_records(
     skip: int = Query(
         0, description="Number of records to skip for pagination"),
     limit: int = Query(100, description="Maximum number of records to return"),
+    cursor: str = Query(
+        None, description=f"Opaque cursor from the `{NEXT_CURSOR_HEADER}` header of the previous page"),
+    response_format: str = Query(
+        "json", alias="format", pattern="^(json|columnar)$",
+        description="Response encoding: json (one object per row) or columnar (one array per field)"),
     db: Session = Depends(get_db),
 ):
     """
     Retrieve weather records with optional filtering and pagination.
     This endpoint directly queries the `weather_records` table and is ideal for
     accessing the raw, daily observations.
+
+    Records are ordered by station and date. Whenever a page is full, the
+    `X-Next-Cursor` response header holds a cursor for the following page.
+    Passing it back as `cursor` resumes right after the last returned row with a
+    single index seek, however deep the page; `skip` keeps working but has to
+    walk past every skipped row.
+
+    With `COLUMNAR_READS` enabled, single-station queries are answered from the
+    memory-mapped columnar store rebuilt by each ingestion run, as long as it
+    holds the current records and the station.
+
+    `format=columnar` returns the same page as one array per field, with the
+    station IDs run-length encoded and the dates delta encoded (see
+    `app.api.columns`), a fraction of the size of the default list of objects.
     """
-    query = db.query(models.WeatherRecord)
+    page = columnar_page(station_id, start_date, end_date, skip, limit, cursor, response_format,
+                         lambda: current_generation(db, RECORDS_GENERATION_ROW_ID)[0])
+    if page is not None:
+        return page
 
-    # Dynamically build the query based on the provided filter parameters.
-    # This is a clean and efficient way to handle optional filters.
-    if station_id:
-        query = query.filter(models.WeatherRecord.station_id == station_id)
-    if start_date:
-        query = query.filter(models.WeatherRecord.date >= start_date)
-    if end_date:
-        query = query.filter(models.WeatherRecord.date <= end_date)
+    records = partitions.records_source(db.connection(), start_date, end_date)
+    stmt = records_statement(station_id, start_date, end_date, skip, limit, cursor, records)
+    return render_records(db.execute(stmt).all(), limit, response_format)
+
+
+def batch_condition(batch: weather_schema.WeatherBatchRequest, records=RECORDS):
+    """
+    Builds the condition matching every station and window of a batch, as one
+    disjunction SQLite answers with a seek on `uix_station_date` per term.
+    """
+    conditions = [and_(*_record_filters(window.station_id, window.start_date, window.end_date,
+                                        records))
+                  for window in batch.windows]
+    if batch.station_ids:
+        conditions.append(and_(records.c.station_id.in_(batch.station_ids),
+                               *_record_filters(None, batch.start_date, batch.end_date, records)))
+    return or_(*conditions)
+
+
+def batch_range(batch: weather_schema.WeatherBatchRequest) -> tuple[date | None, date | None]:
+    """The date range covering every term of a batch, None for an open end."""
+    ranges = [(window.start_date, window.end_date) for window in batch.windows]
+    if batch.station_ids:
+        ranges.append((batch.start_date, batch.end_date))
+    starts, ends = zip(*ranges)
+    return (None if None in starts else min(starts)), (None if None in ends else max(ends))
+
+
+@router.post("/weather/batch", response_model=Dict[str, List[weather_schema.WeatherRecord]],
+             responses={200: {"content": {"application/x-ndjson": {}}}})
+def read_weather_batch(
+    batch: weather_schema.WeatherBatchRequest,
+    batch_format: str = Query(
+        "json", alias="format", pattern="^(json|ndjson)$",
+        description="json: records grouped by station; ndjson: a stream of records"),
+    db: Session = Depends(get_db),
+):
+    """
+    Retrieve the records of many stations in one request and one query.
+
+    The body lists `station_ids` sharing one `start_date`/`end_date` range,
+    and/or `windows` with a range each, given as objects or as
+    `[station_id, start_date, end_date]` arrays (null for an open end). Records
+    matched by several windows are returned once.
+
+    The JSON response maps each requested station, in request order, to its
+    records ordered by date. With `format=ndjson` the records are streamed in
+    station and date order, one object per line as in `/weather/export`.
+    A batch matching more than `max_rows` records is rejected with a 400 before
+    anything is sent, so a response is never silently truncated.
+    """
+    records = partitions.records_source(db.connection(), *batch_range(batch))
+    condition = batch_condition(batch, records)
+    order = (records.c.station_id, records.c.date)
+    too_many = HTTPException(
+        status_code=400,
+        detail=f"The batch matches more than {batch.max_rows} records; split it or raise max_rows")
+
+    if batch_format == "ndjson":
+        overflow = db.execute(select(records.c.id).where(condition)
+                              .offset(batch.max_rows).limit(1)).first()
+        if overflow is not None:
+            raise too_many
+        stmt = (select(*(records.c[column] for column in EXPORT_COLUMNS))
+                .where(condition).order_by(*order))
+        return StreamingResponse(_stream_export(db.get_bind(), stmt, "ndjson", False),
+                                 media_type=EXPORT_MEDIA_TYPES["ndjson"])
+
+    stmt = (select(*(records.c[field] for field in RECORD_FIELDS))
+            .where(condition).order_by(*order).limit(batch.max_rows + 1))
+    rows = db.execute(stmt).all()
+    if len(rows) > batch.max_rows:
+        raise too_many
+    groups = {station_id: [] for station_id in batch.station_ids}
+    for window in batch.windows:
+        groups.setdefault(window.station_id, [])
+    for record in row_dicts(rows):
+        groups[record["station_id"]].append(record)
+    return FastJSONResponse(groups)
+
+
+def series_statement(station_id: str | None, start_date: date | None, end_date: date | None,
+                     bucket: str, records=RECORDS):
+    """
+    Builds the query aggregating the records of `/weather/series` into one row
+    per bucket. Precipitation is totalled per station, so a multi-station series
+    shows the average station's total rather than the sum over stations.
+    """
+    record = records.c
+    period = SERIES_BUCKETS[bucket](record.date).label("date")
+    return (
+        select(
+            period,
+            func.avg(record.max_temp).label("max_temp"),
+            func.avg(record.min_temp).label("min_temp"),
+            (func.sum(record.precip) / func.count(record.station_id.distinct())).label("precip"),
+            func.count().label("days"),
+        )
+        .where(*_record_filters(station_id, start_date, end_date, records))
+        .group_by(period)
+        .order_by(period)
+    )
+
+
+def downsample_series(rows, max_points: int):
+    """Keeps at most `max_points` rows of a series, chosen by LTTB on all three values."""
+    if len(rows) <= max_points:
+        return rows
+    x = np.array([date.fromisoformat(row.date).toordinal() for row in rows])
+    values = np.array([(row.max_temp, row.min_temp, row.precip) for row in rows], dtype=np.float64)
+    return [rows[i] for i in lttb_indices(x, values, max_points)]
+
+
+@router.get("/weather/series", response_model=List[weather_schema.WeatherSeriesPoint])
+def read_weather_series(
+    request: Request,
+    station_id: str = Query(None, description="Filter by station ID"),
+    start_date: date = Query(
+        None, description="Start date for filtering (YYYY-MM-DD)"),
+    end_date: date = Query(
+        None, description="End date for filtering (YYYY-MM-DD)"),
+    bucket: str = Query(
+        "day", pattern="^(day|week|month|year)$", description="Aggregation period: day, week, month or year"),
+    max_points: int = Query(
+        None, ge=3, le=MAX_SERIES_POINTS, description="Downsample the series to at most this many points"),
+    response_format: str = Query(
+        "json", alias="format", pattern="^(json|columnar)$",
+        description="Response encoding: json (one object per row) or columnar (one array per field)"),
+    db: Session = Depends(get_db),
+):
+    """
+    Retrieve a time series of the matching records, aggregated per bucket in SQL.
+
+    Each point holds the average daily maximum and minimum temperatures, the
+    total precipitation (mm) and the number of station-days in its bucket.
+    Unlike `/weather`, the series is never truncated: with `max_points` it is
+    downsampled with Largest-Triangle-Three-Buckets, which keeps the peaks and
+    troughs a chart needs, so any date range comes back with a bounded size.
+    Responses are cached like `/weather/stats`, and `format=columnar` encodes
+    them like `/weather`.
+    """
+    def render():
+        records = partitions.records_source(db.connection(), start_date, end_date)
+        rows = db.execute(series_statement(station_id, start_date, end_date, bucket,
+                                           records)).all()
+        if max_points:
+            rows = downsample_series(rows, max_points)
+        # The selected columns follow the `WeatherSeriesPoint` fields.
+        return dumps(encode_page(row_dicts(rows), SERIES_FIELDS, response_format)), {}
+
+    key = ("series", station_id, start_date, end_date, bucket, max_points, response_format)
+    return cached_json_response(request, db, key, render)
 
-    # Apply pagination to the result set.
-    records = query.offset(skip).limit(limit).all()
-    return records
+
+def _encode_export_rows(rows, export_format: str) -> bytes:
+    if export_format == "ndjson":
+        return "".join(
+            json.dumps({
+                "station_id": row.station_id,
+                "date": row.date.isoformat(),
+                "max_temp": row.max_temp,
+                "min_temp": row.min_temp,
+                "precip": row.precip,
+            }) + "\n"
+            for row in rows
+        ).encode()
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def _stream_export(bind: Engine, stmt, export_format: str, use_gzip: bool):
+    """
+    Yields the encoded export in chunks of `EXPORT_FETCH_SIZE` rows.
+
+    The rows are pulled from a cursor on a connection owned by the generator, so
+    only one chunk is ever held in memory and the request's own session can be
+    released as soon as the response starts.
+    """
+    compressor = zlib.compressobj(wbits=31) if use_gzip else None
+
+    def emit(chunk: bytes) -> bytes:
+        return compressor.compress(chunk) if compressor else chunk
+
+    if export_format == "csv":
+        yield emit((",".join(EXPORT_COLUMNS) + "\n").encode())
+    with bind.connect() as connection:
+        # `stmt` may read partitions attached to the request's own connection.
+        partitions.attach_partitions(connection)
+        result = connection.execution_options(
+            yield_per=EXPORT_FETCH_SIZE).execute(stmt)
+        for rows in result.partitions():
+            yield emit(_encode_export_rows(rows, export_format))
+    if compressor:
+        yield compressor.flush()
+
+
+@router.get("/weather/export", response_class=StreamingResponse, responses={
+    200: {"content": {media_type: {} for media_type in EXPORT_MEDIA_TYPES.values()}}})
+def export_weather_records(
+    station_id: str = Query(None, description="Filter by station ID"),
+    start_date: date = Query(
+        None, description="Start date for filtering (YYYY-MM-DD)"),
+    end_date: date = Query(
+        None, description="End date for filtering (YYYY-MM-DD)"),
+    export_format: str = Query(
+        "csv", alias="format", pattern="^(csv|ndjson)$", description="Output format: csv or ndjson"),
+    use_gzip: bool = Query(
+        False, alias="gzip", description="Gzip-compress the response body"),
+    db: Session = Depends(get_db),
+):
+    """
+    Streams every matching raw weather record as CSV or NDJSON.
+
+    Unlike `/weather`, the export is not paginated: rows go straight from a
+    database cursor to the client, so a station's full history is one request
+    with constant server memory.
+    """
+    records = partitions.records_source(db.connection(), start_date, end_date)
+    stmt = (
+        select(*(records.c[column] for column in EXPORT_COLUMNS))
+        .where(*_record_filters(station_id, start_date, end_date, records))
+        .order_by(records.c.station_id, records.c.date)
+    )
+    filename = f"weather_records.{export_format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        _stream_export(db.get_bind(), stmt, export_format, use_gzip),
+        media_type=EXPORT_MEDIA_TYPES[export_format], headers=headers)
 
 
 @router.get("/weather/stats", response_model=List[weather_schema.WeatherStats])
 def read_weather_stats(
+    request: Request,
     station_id: str = Query(None, description="Filter by station ID"),
     year: int = Query(None, description="Filter by a specific year"),
     skip: int = Query(
         0, description="Number of records to skip for pagination"),
     limit: int = Query(100, description="Maximum number of records to return"),
+    cursor: str = Query(
+        None, description=f"Opaque cursor from the `{NEXT_CURSOR_HEADER}` header of the previous page"),
+    response_format: str = Query(
+        "json", alias="format", pattern="^(json|columnar)$",
+        description="Response encoding: json (one object per row) or columnar (one array per field)"),
     db: Session = Depends(get_db),
 ):
     """
@@ -69,25 +652,169 @@ def read_weather_stats(
     This endpoint queries the `weather_stats` table, which acts as a materialized view.
     This ensures consistently fast response times for statistical data, as the
     aggregations are pre-computed.
+
+    Statistics are ordered by station and year and support the same
+    `X-Next-Cursor` keyset pagination as `/weather`.
+
+    Rendered responses are cached until the next ingestion or analysis run and
+    carry `ETag`/`Last-Modified` headers, so a matching `If-None-Match` gets a
+    304 without touching the statistics table.
+
+    `format=columnar` encodes the page like `/weather`.
     """
-    query = db.query(models.WeatherStats)
-    if station_id:
-        query = query.filter(models.WeatherStats.station_id == station_id)
-    if year:
-        query = query.filter(models.WeatherStats.year == year)
+    def render():
+        stmt = stats_statement(station_id, year, skip, limit, cursor, table_exists(
+            db.connection(), models.WeatherStatsExtremes.__table__))
+        return render_stats(db.execute(stmt).all(), limit, response_format)
 
-    stats = query.offset(skip).limit(limit).all()
-    return stats
+    key = ("stats", station_id, year, skip, limit, cursor, response_format)
+    return cached_json_response(request, db, key, render)
+
+
+@router.get("/weather/stats/monthly", response_model=List[weather_schema.WeatherMonthlyStats])
+def read_weather_monthly_stats(
+    request: Request,
+    station_id: str = Query(None, description="Filter by station ID"),
+    year: int = Query(None, description="Filter by a specific year"),
+    month: int = Query(None, ge=1, le=12, description="Filter by a month of the year (1-12)"),
+    skip: int = Query(
+        0, description="Number of records to skip for pagination"),
+    limit: int = Query(100, description="Maximum number of records to return"),
+    cursor: str = Query(
+        None, description=f"Opaque cursor from the `{NEXT_CURSOR_HEADER}` header of the previous page"),
+    db: Session = Depends(get_db),
+):
+    """
+    Retrieve calculated monthly weather statistics, ordered by station, year and
+    month. Precomputed by the analysis job alongside the yearly statistics, with
+    the same pagination and caching as `/weather/stats`. Empty until the
+    monthly statistics table exists.
+    """
+    def render():
+        if not table_exists(db.connection(), models.WeatherMonthlyStats.__table__):
+            return dumps([]), {}
+        stmt = monthly_stats_statement(station_id, year, month, skip, limit, cursor)
+        return render_page(db.execute(stmt).all(), limit,
+                           lambda last: (last["station_id"], last["year"], last["month"]))
+
+    key = ("monthly", station_id, year, month, skip, limit, cursor)
+    return cached_json_response(request, db, key, render)
+
+
+@router.get("/weather/climatology", response_model=List[weather_schema.WeatherClimatology])
+def read_weather_climatology(
+    request: Request,
+    station_id: str = Query(None, description="Filter by station ID"),
+    day_of_year: int = Query(
+        None, ge=1, le=366, description="Filter by a day of the leap-year calendar (1-366)"),
+    skip: int = Query(
+        0, description="Number of records to skip for pagination"),
+    limit: int = Query(366, description="Maximum number of records to return"),
+    cursor: str = Query(
+        None, description=f"Opaque cursor from the `{NEXT_CURSOR_HEADER}` header of the previous page"),
+    db: Session = Depends(get_db),
+):
+    """
+    Retrieve the day-of-year climatology: per station and calendar day, the mean,
+    minimum and maximum of each daily value over the 1985-2014 baseline.
+    Days are numbered on a leap-year calendar, so March 1 is always day 61.
+    The default `limit` returns a station's whole year in one page. Empty until
+    the climatology table exists.
+    """
+    def render():
+        if not table_exists(db.connection(), models.WeatherClimatology.__table__):
+            return dumps([]), {}
+        stmt = climatology_statement(station_id, day_of_year, skip, limit, cursor)
+        return render_page(db.execute(stmt).all(), limit,
+                           lambda last: (last["station_id"], last["day_of_year"]))
+
+    key = ("climatology", station_id, day_of_year, skip, limit, cursor)
+    return cached_json_response(request, db, key, render)
+
+
+@router.get("/weather/anomalies", response_model=List[weather_schema.WeatherAnomaly])
+def read_weather_anomalies(
+    station_id: str = Query(..., description="Station ID"),
+    start_date: date = Query(
+        None, description="Start date for filtering (YYYY-MM-DD)"),
+    end_date: date = Query(
+        None, description="End date for filtering (YYYY-MM-DD)"),
+    skip: int = Query(
+        0, description="Number of records to skip for pagination"),
+    limit: int = Query(100, description="Maximum number of records to return"),
+    cursor: str = Query(
+        None, description=f"Opaque cursor from the `{NEXT_CURSOR_HEADER}` header of the previous page"),
+    db: Session = Depends(get_db),
+):
+    """
+    Retrieve a station's daily records with their departure from the day's
+    normal (the climatology mean), paginated like `/weather`.
+
+    Each record is compared with one precomputed climatology row rather than
+    with the decades of records behind it. Anomalies are null where the record
+    or the normal has no value, and everywhere until the climatology table
+    exists.
+    """
+    records = partitions.records_source(db.connection(), start_date, end_date)
+    with_normals = table_exists(db.connection(), models.WeatherClimatology.__table__)
+    stmt = anomalies_statement(station_id, start_date, end_date, skip, limit, cursor, records,
+                               with_normals)
+    body, headers = render_page(db.execute(stmt).all(), limit,
+                                lambda last: (last["station_id"], last["date"].isoformat()))
+    return Response(body, media_type="application/json", headers=headers)
 
 
 @router.get("/weather/stations", response_model=List[str])
-def read_station_ids(db: Session = Depends(get_db)):
+def read_station_ids(
+    request: Request,
+    start_date: date = Query(
+        None, description="Only stations with records on or after this date (YYYY-MM-DD)"),
+    end_date: date = Query(
+        None, description="Only stations with records on or before this date (YYYY-MM-DD)"),
+    min_records: int = Query(None, ge=1, description="Only stations with at least this many records"),
+    db: Session = Depends(get_db),
+):
     """
     Retrieves a list of all unique weather station IDs available in the dataset.
     This is a useful utility endpoint for clients that need to know which
     stations they can query for.
+    The IDs are read from the `stations` catalog maintained by ingestion, and
+    can be filtered by coverage like `/weather/stations/catalog`.
+    The list is cached until the next ingestion run, with the same `ETag`
+    revalidation as `/weather/stats`.
+    """
+    def render():
+        stmt = station_ids_statement(catalog.catalog_built(db.connection()),
+                                     start_date, end_date, min_records,
+                                     partitions.records_source(db.connection()))
+        return render_stations(db.execute(stmt))
+
+    key = ("stations", start_date, end_date, min_records)
+    return cached_json_response(request, db, key, render)
+
+
+@router.get("/weather/stations/catalog", response_model=List[weather_schema.StationCoverage])
+def read_station_catalog(
+    request: Request,
+    start_date: date = Query(
+        None, description="Only stations with records on or after this date (YYYY-MM-DD)"),
+    end_date: date = Query(
+        None, description="Only stations with records on or before this date (YYYY-MM-DD)"),
+    min_records: int = Query(None, ge=1, description="Only stations with at least this many records"),
+    db: Session = Depends(get_db),
+):
+    """
+    Retrieves the station catalog: each station's first and last record date,
+    record count and missing values per variable, so that clients can skip
+    ranges without data before querying them. `start_date` and `end_date` keep
+    the stations whose coverage overlaps that range.
+    Cached like `/weather/stations`.
     """
-    # The `distinct()` method ensures that each station ID is returned only once.
-    stations = db.query(models.WeatherRecord.station_id).distinct().all()
-    # The result from the query is a list of tuples, so we flatten it into a simple list of strings.
-    return [station[0] for station in stations]
+    def render():
+        stmt = stations_statement(catalog.catalog_built(db.connection()),
+                                  start_date, end_date, min_records,
+                                  partitions.records_source(db.connection()))
+        return dumps(row_dicts(db.execute(stmt))), {}
+
+    key = ("catalog", start_date, end_date, min_records)
+    return cached_json_response(request, db, key, render)
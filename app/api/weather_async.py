@@ -0,0 +1,110 @@
+from datetime import date
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from typing import List
+from app.schemas import weather as weather_schema
+from app.core.cache import cached_json_response_async
+from app.core.database import get_async_db
+from app.core.generation import RECORDS_GENERATION_ROW_ID, current_generation
+from app.api.pagination import NEXT_CURSOR_HEADER
+from app import models
+from app.services import catalog, columnar, partitions
+from app.api.weather import (
+    RECORDS, columnar_page, records_statement, render_records, render_stations, render_stats,
+    station_ids_statement, stats_statement, table_exists,
+)
+
+# Async versions of the read endpoints of `app.api.weather`, served when
+# `ASYNC_DB` is enabled. They build the same statements and share the response
+# cache; only the execution goes through an `AsyncSession`, so slow queries wait
+# on the event loop instead of holding one of the threadpool's workers. Pages are
+# rendered on the threadpool, so encoding a large one does not stall every other
+# request in flight on the loop.
+router = APIRouter()
+
+
+@router.get("/weather", response_model=List[weather_schema.WeatherRecord])
+async def read_weather_records(
+    station_id: str = Query(None, description="Filter by station ID"),
+    start_date: date = Query(
+        None, description="Start date for filtering (YYYY-MM-DD)"),
+    end_date: date = Query(
+        None, description="End date for filtering (YYYY-MM-DD)"),
+    skip: int = Query(
+        0, description="Number of records to skip for pagination"),
+    limit: int = Query(100, description="Maximum number of records to return"),
+    cursor: str = Query(
+        None, description=f"Opaque cursor from the `{NEXT_CURSOR_HEADER}` header of the previous page"),
+    response_format: str = Query(
+        "json", alias="format", pattern="^(json|columnar)$",
+        description="Response encoding: json (one object per row) or columnar (one array per field)"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Async version of `app.api.weather.read_weather_records`."""
+    if columnar.columnar_store is not None:
+        records_generation, _ = await db.run_sync(
+            current_generation, RECORDS_GENERATION_ROW_ID)
+        page = await run_in_threadpool(
+            columnar_page, station_id, start_date, end_date, skip, limit, cursor,
+            response_format, lambda: records_generation)
+        if page is not None:
+            return page
+
+    records = RECORDS
+    if partitions.PARTITIONED_STORAGE:
+        records = await db.run_sync(lambda session: partitions.records_source(
+            session.connection(), start_date, end_date))
+    stmt = records_statement(station_id, start_date, end_date, skip, limit, cursor, records)
+    rows = (await db.execute(stmt)).all()
+    return await run_in_threadpool(render_records, rows, limit, response_format)
+
+
+@router.get("/weather/stats", response_model=List[weather_schema.WeatherStats])
+async def read_weather_stats(
+    request: Request,
+    station_id: str = Query(None, description="Filter by station ID"),
+    year: int = Query(None, description="Filter by a specific year"),
+    skip: int = Query(
+        0, description="Number of records to skip for pagination"),
+    limit: int = Query(100, description="Maximum number of records to return"),
+    cursor: str = Query(
+        None, description=f"Opaque cursor from the `{NEXT_CURSOR_HEADER}` header of the previous page"),
+    response_format: str = Query(
+        "json", alias="format", pattern="^(json|columnar)$",
+        description="Response encoding: json (one object per row) or columnar (one array per field)"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Async version of `app.api.weather.read_weather_stats`."""
+    async def render():
+        with_extremes = await db.run_sync(lambda session: table_exists(
+            session.connection(), models.WeatherStatsExtremes.__table__))
+        stmt = stats_statement(station_id, year, skip, limit, cursor, with_extremes)
+        rows = (await db.execute(stmt)).all()
+        return await run_in_threadpool(render_stats, rows, limit, response_format)
+
+    key = ("stats", station_id, year, skip, limit, cursor, response_format)
+    return await cached_json_response_async(request, db, key, render)
+
+
+@router.get("/weather/stations", response_model=List[str])
+async def read_station_ids(
+    request: Request,
+    start_date: date = Query(
+        None, description="Only stations with records on or after this date (YYYY-MM-DD)"),
+    end_date: date = Query(
+        None, description="Only stations with records on or before this date (YYYY-MM-DD)"),
+    min_records: int = Query(None, ge=1, description="Only stations with at least this many records"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Async version of `app.api.weather.read_station_ids`."""
+    async def render():
+        use_catalog, records = await db.run_sync(lambda session: (
+            catalog.catalog_built(session.connection()),
+            partitions.records_source(session.connection())))
+        stmt = station_ids_statement(use_catalog, start_date, end_date, min_records, records)
+        rows = (await db.execute(stmt)).all()
+        return await run_in_threadpool(render_stations, rows)
+
+    key = ("stations", start_date, end_date, min_records)
+    return await cached_json_response_async(request, db, key, render)
@@ -0,0 +1,123 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import timezone
+from email.utils import format_datetime
+from typing import Awaitable, Callable, NamedTuple
+from fastapi import Request, Response
+from app.core.generation import current_generation
+
+
+class CacheEntry(NamedTuple):
+    generation: int
+    expires_at: float
+    body: bytes
+    headers: dict
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of rendered responses with a time-to-live.
+
+    Entries are tagged with the data generation they were rendered for and are
+    ignored once the generation moves on, so ingestion and analysis runs
+    invalidate them without having to reach into the API process. The TTL bounds
+    staleness for changes made outside those jobs.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, generation: int) -> CacheEntry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.generation != generation or entry.expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, generation: int, body: bytes, headers: dict) -> CacheEntry:
+        entry = CacheEntry(generation, time.monotonic() + self.ttl, body, headers)
+        if self.maxsize <= 0:
+            return entry
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache(
+    maxsize=int(os.environ.get("RESPONSE_CACHE_SIZE", "512")),
+    ttl=float(os.environ.get("RESPONSE_CACHE_TTL", "300")),
+)
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison, as required for If-None-Match.
+    return "*" in candidates or etag in [tag.removeprefix("W/") for tag in candidates]
+
+
+def _store(key: tuple, generation: int, updated_at, body: bytes, headers: dict) -> CacheEntry:
+    digest = hashlib.sha1(body).hexdigest()[:16]
+    # `no-cache` makes browsers revalidate every time instead of guessing a
+    # freshness lifetime from Last-Modified.
+    headers = {**headers, "ETag": f'"{generation}-{digest}"', "Cache-Control": "no-cache"}
+    if updated_at is not None:
+        headers["Last-Modified"] = format_datetime(
+            updated_at.replace(tzinfo=timezone.utc), usegmt=True)
+    return response_cache.put(key, generation, body, headers)
+
+
+def _respond(request: Request, entry: CacheEntry) -> Response:
+    if _etag_matches(request.headers.get("if-none-match"), entry.headers["ETag"]):
+        validators = {name: value for name, value in entry.headers.items()
+                      if name in ("ETag", "Last-Modified", "Cache-Control")}
+        return Response(status_code=304, headers=validators)
+    return Response(content=entry.body, media_type="application/json", headers=entry.headers)
+
+
+def cached_json_response(request: Request, db, key: tuple,
+                         render: Callable[[], tuple[bytes, dict]]) -> Response:
+    """
+    Serves a JSON response from `response_cache`, rendering it with `render()`
+    (which returns the body and any extra headers) only on a miss.
+
+    Responses carry an `ETag` derived from the generation and body, and a
+    `Last-Modified` set to the last generation bump. A matching `If-None-Match`
+    is answered with 304 and no body, skipping the query and serialization.
+    """
+    generation, updated_at = current_generation(db)
+    entry = response_cache.get(key, generation)
+    if entry is None:
+        entry = _store(key, generation, updated_at, *render())
+    return _respond(request, entry)
+
+
+async def cached_json_response_async(request: Request, db, key: tuple,
+                                     render: Callable[[], Awaitable[tuple[bytes, dict]]]) -> Response:
+    """
+    `cached_json_response` for an `AsyncSession`, with an async `render()`.
+    Both share `response_cache`, so either router can serve the other's entries.
+    """
+    generation, updated_at = await db.run_sync(current_generation)
+    entry = response_cache.get(key, generation)
+    if entry is None:
+        entry = _store(key, generation, updated_at, *await render())
+    return _respond(request, entry)
@@ -0,0 +1,125 @@
+import os
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# On by default; set to false when a reverse proxy compresses responses instead.
+COMPRESSION_ENABLED = os.environ.get("RESPONSE_COMPRESSION", "true").lower() in ("1", "true", "yes")
+# Bodies smaller than this many bytes are sent as they are: compressing them
+# saves less than it costs.
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+# Past level 4, gzip takes twice as long on the API's JSON for a few percent
+# smaller bodies.
+GZIP_LEVEL = 4
+# Brotli's faster qualities compress JSON better than gzip at a similar cost;
+# the top ones are meant for static assets compressed once.
+BROTLI_QUALITY = 4
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """
+    Picks the content coding for an `Accept-Encoding` header: brotli when it is
+    installed and accepted, else gzip, honouring q-values and `*`. Returns None
+    when neither is acceptable.
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip().lower()] = weight
+    wildcard = weights.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    # `max` keeps the first of equally weighted codings, preferring brotli.
+    best = max(candidates, key=lambda coding: weights.get(coding, wildcard))
+    return best if weights.get(best, wildcard) > 0 else None
+
+
+def _compressor(encoding: str):
+    """Returns the (compress, finish) functions of a streaming compressor."""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return compressor.process, compressor.finish
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+    return compressor.compress, compressor.flush
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing response bodies with the coding negotiated on
+    `Accept-Encoding`. Bodies under `minimum_size` and responses that already
+    carry a `Content-Encoding` (e.g. `/weather/export?gzip=true`) pass through
+    untouched; streaming responses are compressed chunk by chunk. Compressed
+    responses get `Vary: Accept-Encoding` and a weak `ETag`, since their bytes
+    differ from the identity representation the tag was computed for.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start = None
+        compress = finish = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compress, finish, passthrough
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether to compress.
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compress is None:
+                headers = MutableHeaders(raw=start["headers"])
+                if "content-encoding" in headers or (len(body) < self.minimum_size and not more_body):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                headers.add_vary_header("Accept-Encoding")
+                if encoding is None:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compress, finish = _compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                if "content-length" in headers:
+                    del headers["content-length"]
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = f"W/{etag}"
+                if not more_body:
+                    body = compress(body) + finish()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start)
+
+            chunk = compress(body)
+            if not more_body:
+                chunk += finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
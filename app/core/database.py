@@ -1,16 +1,91 @@
-from sqlalchemy import create_engine
+import os
+from urllib.parse import parse_qsl, urlencode
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from app.core.metrics import METRICS_ENABLED, MetricsConnection, instrument_engine
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./weather.db"
+SQLALCHEMY_DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./weather.db")
+# Sync endpoints run on Starlette's threadpool (40 workers), and closing a
+# request's session needs a worker too. Keeping at least as many connections as
+# workers prevents requests from waiting on the pool while holding every worker.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "30"))
 
+# Read-only serving of a pre-built database: the file is opened immutable and
+# memory-mapped, writes are refused and the schema is never created.
+READ_ONLY_MODE = os.environ.get("READ_ONLY_MODE", "false").lower() in ("1", "true", "yes")
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(1024 ** 3)))
+
+
+def read_only_database_url(url: str) -> str:
+    """
+    Rewrites a SQLite file URL to open the file with `mode=ro&immutable=1`.
+    Immutable databases skip all file locking and change detection, so the file
+    must not be modified while it is served.
+    """
+    if not url.startswith("sqlite:///") or ":memory:" in url:
+        return url
+    path, _, query = url.removeprefix("sqlite:///").partition("?")
+    # Existing parameters such as `timeout` are kept: SQLAlchemy passes the
+    # ones it does not handle itself on to SQLite as URI parameters.
+    params = dict(parse_qsl(query))
+    params.update(mode="ro", immutable="1", uri="true")
+    if not path.startswith("file:"):
+        path = f"file:{path}"
+    return f"sqlite:///{path}?{urlencode(params)}"
+
+
+def pool_options(url: str, pool_size: int, max_overflow: int) -> dict:
+    """
+    The sizing arguments for the pool of `url`. In-memory SQLite databases get
+    a single-connection pool, which takes no sizing arguments.
+    """
+    parsed = make_url(url)
+    if not issubclass(parsed.get_dialect().get_pool_class(parsed), QueuePool):
+        return {}
+    return {"pool_size": pool_size, "max_overflow": max_overflow}
+
+
+def configure_read_only(sync_engine):
+    """Sets `mmap_size` and `query_only` on every new connection of `sync_engine`."""
+    @event.listens_for(sync_engine, "connect")
+    def _set_read_only_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+
+connect_args = {"check_same_thread": False}
+if METRICS_ENABLED:
+    # Counts the rows fetched by each statement.
+    connect_args["factory"] = MetricsConnection
+
+_engine_url = (read_only_database_url(SQLALCHEMY_DATABASE_URL) if READ_ONLY_MODE
+               else SQLALCHEMY_DATABASE_URL)
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    _engine_url, connect_args=connect_args,
+    **pool_options(_engine_url, DB_POOL_SIZE, DB_MAX_OVERFLOW),
 )
+if READ_ONLY_MODE:
+    configure_read_only(engine)
+if METRICS_ENABLED:
+    instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Opt-in async path for the read endpoints (requires `aiosqlite`).
+ASYNC_DB_ENABLED = os.environ.get("ASYNC_DB", "false").lower() in ("1", "true", "yes")
+# Connections kept open by the async pool, and extra ones allowed under bursts.
+ASYNC_DB_POOL_SIZE = int(os.environ.get("ASYNC_DB_POOL_SIZE", "10"))
+ASYNC_DB_MAX_OVERFLOW = int(os.environ.get("ASYNC_DB_MAX_OVERFLOW", "20"))
+
+_async_session_factory = None
+
 
 def get_db():
     db = SessionLocal()
@@ -18,3 +93,45 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def async_database_url(url: str) -> str:
+    """Maps a sync SQLite URL onto the aiosqlite driver."""
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url.removeprefix("sqlite://")
+    return url
+
+
+def create_async_session_factory(url: str):
+    """
+    Creates an async engine for `url` and returns its session factory.
+
+    File databases get a queue pool of `ASYNC_DB_POOL_SIZE` connections plus
+    `ASYNC_DB_MAX_OVERFLOW`; each aiosqlite connection runs its queries on its
+    own thread, so the pool size bounds how many queries run concurrently.
+    """
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        url, **pool_options(url, ASYNC_DB_POOL_SIZE, ASYNC_DB_MAX_OVERFLOW))
+    if READ_ONLY_MODE:
+        configure_read_only(async_engine.sync_engine)
+    if METRICS_ENABLED:
+        # Statement timings only: aiosqlite fetches rows on its own cursors.
+        instrument_engine(async_engine.sync_engine)
+    return async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    """
+    Async counterpart of `get_db`. The engine is created on first use, so the
+    async driver is only imported when the async path is enabled.
+    """
+    global _async_session_factory
+    if _async_session_factory is None:
+        url = SQLALCHEMY_DATABASE_URL
+        if READ_ONLY_MODE:
+            url = read_only_database_url(url)
+        _async_session_factory = create_async_session_factory(async_database_url(url))
+    async with _async_session_factory() as db:
+        yield db
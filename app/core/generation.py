@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.dialects.sqlite import insert
+from app.models import DataGeneration
+
+# The row of `data_generation` holding the counter.
+GENERATION_ROW_ID = 1
+# The row counting changes to the records alone, bumped by ingestion but not by
+# the statistics jobs. Builds of the columnar store are stamped with it.
+RECORDS_GENERATION_ROW_ID = 2
+
+
+def bump_generation(connection, row_id: int = GENERATION_ROW_ID):
+    """
+    Increments the data generation, invalidating every cached API response.
+    Runs inside the caller's transaction (a Session or a Connection).
+    """
+    stmt = insert(DataGeneration.__table__).values(
+        id=row_id, generation=1,
+        updated_at=datetime.now(timezone.utc).replace(tzinfo=None))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["id"],
+        set_={
+            "generation": DataGeneration.__table__.c.generation + 1,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    connection.execute(stmt)
+
+
+def current_generation(connection,
+                       row_id: int = GENERATION_ROW_ID) -> tuple[int, datetime | None]:
+    """
+    Returns the data generation and the UTC time it was last bumped. Databases
+    built before the counter existed (and served read-only, so the table is
+    never created) report generation 0.
+    """
+    try:
+        row = connection.execute(
+            select(DataGeneration.generation, DataGeneration.updated_at)
+            .where(DataGeneration.id == row_id)).first()
+    except OperationalError as e:
+        if "no such table" not in str(e.orig):
+            raise
+        return 0, None
+    if row is None:
+        return 0, None
+    return row.generation, row.updated_at
@@ -0,0 +1,260 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+from bisect import bisect_left
+from functools import lru_cache
+from fastapi import Response
+from sqlalchemy import event
+
+# Opt-in: with metrics disabled no middleware, hook or cursor wrapper is installed.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PHASE_BUCKETS = (0.01, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"'
+                          for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """A monotonically increasing value per label set."""
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount: float = 1.0):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labelvalues, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}"
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """Observation counts per bucket, plus their sum and count, per label set."""
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (),
+                 buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._values = {}  # label values -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labelvalues)
+            if state is None:
+                state = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def samples(self):
+        with self._lock:
+            values = sorted((labels, (list(counts), total))
+                            for labels, (counts, total) in self._values.items())
+        for labelvalues, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labelnames + ("le",), labelvalues + (le,))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class MetricsRegistry:
+    """The metrics of the process, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (),
+                  buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        for metric in self._metrics:
+            metric.clear()
+
+
+registry = MetricsRegistry()
+REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.",
+    ("method", "route", "status"))
+QUERY_DURATION = registry.histogram(
+    "db_query_duration_seconds", "SQL statement execution time by statement kind and table.",
+    ("statement",))
+QUERY_ROWS = registry.counter(
+    "db_rows_returned_total", "Rows fetched by SQL statements, by statement kind and table.",
+    ("statement",))
+PHASE_DURATION = registry.histogram(
+    "job_phase_duration_seconds", "Duration of the ingestion and analysis phases.",
+    ("job", "phase"), buckets=PHASE_BUCKETS)
+
+
+def record_phase(job: str, phase: str, seconds: float):
+    """Records the duration of one phase of a batch job, when metrics are enabled."""
+    if METRICS_ENABLED:
+        PHASE_DURATION.observe(seconds, job, phase)
+
+
+_STATEMENT_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE|TABLE)\s+"?(\w+)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def statement_label(statement: str) -> str:
+    """
+    Reduces a SQL statement to its verb and first table, e.g. "SELECT weather_records",
+    keeping the label cardinality bounded.
+    """
+    words = statement.split(None, 1)
+    verb = words[0].upper() if words else ""
+    match = _STATEMENT_TABLE.search(statement)
+    return f"{verb} {match.group(1)}" if match else verb
+
+
+class MetricsCursor(sqlite3.Cursor):
+    """
+    sqlite3 cursor counting the rows fetched through it, under the statement
+    label the engine hooks attach after each execution.
+    """
+    metrics_label = None
+
+    def _count(self, rows: int):
+        if rows and self.metrics_label:
+            QUERY_ROWS.inc(self.metrics_label, amount=rows)
+
+    def fetchone(self):
+        row = super().fetchone()
+        self._count(0 if row is None else 1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = super().fetchmany(*args, **kwargs)
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        self._count(len(rows))
+        return rows
+
+
+class MetricsConnection(sqlite3.Connection):
+    """sqlite3 connection handing out `MetricsCursor`s; pass it as `factory`."""
+
+    def cursor(self, factory=MetricsCursor):
+        return super().cursor(factory)
+
+
+def instrument_engine(sync_engine):
+    """
+    Times every statement executed on `sync_engine` into `db_query_duration_seconds`
+    and labels `MetricsCursor`s so that their fetched rows are counted.
+    """
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+        label = statement_label(statement)
+        QUERY_DURATION.observe(elapsed, label)
+        if isinstance(cursor, MetricsCursor):
+            cursor.metrics_label = label
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _discard_timer(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("metrics_started"):
+            connection.info["metrics_started"].pop()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency of each HTTP request, labelled by the
+    matched route's path template (or "unmatched") rather than the raw path.
+    Streaming responses are timed until their last chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_DURATION.observe(time.perf_counter() - started,
+                                     scope["method"], route, str(status))
+
+
+def metrics_response() -> Response:
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,33 @@
+import json
+from datetime import date
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised by monkeypatching in the tests
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    """
+    Encodes `content` to the same bytes `JSONResponse` produces for the
+    equivalent response model (compact separators, UTF-8, dates as ISO strings),
+    using orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """`JSONResponse` rendered with `dumps`, for content that is already plain data."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
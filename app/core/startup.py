@@ -0,0 +1,85 @@
+import os
+import time
+import logging
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from app.models import WeatherRecord
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Read the hot indexes and the stats table into the page cache at startup.
+WARMUP_ON_START = os.environ.get("WARMUP_ON_START", "false").lower() in ("1", "true", "yes")
+
+
+def _seconds_since_process_start() -> float | None:
+    """Age of the current process, where /proc exposes it (Linux)."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 is the start time in clock ticks after boot; the fields
+            # after the parenthesised command name start at field 3.
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+
+
+class StartupTimer:
+    """
+    Records how long each startup phase took, starting from `started` (a
+    `time.perf_counter()` value taken before the app's imports). When the process
+    age is known, the time spent before that point, starting the interpreter and
+    the server, is reported as the `interpreter` phase.
+    """
+
+    def __init__(self, started: float):
+        self.phases = []
+        self._last = started
+        age = _seconds_since_process_start()
+        if age is not None:
+            before_import = age - (time.perf_counter() - started)
+            self.phases.append(("interpreter", max(before_import, 0.0)))
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def report(self) -> str:
+        total = sum(seconds for _, seconds in self.phases)
+        phases = ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in self.phases)
+        return f"Startup took {total:.3f}s: {phases}"
+
+
+def _warmup_statements() -> list[str]:
+    table = WeatherRecord.__tablename__
+    statements = [
+        # Walks the (station_id, date) unique index used by `/weather` and the
+        # statistics range queries.
+        f"SELECT count(*) FROM (SELECT station_id, date FROM {table} ORDER BY station_id, date)",
+        # The stats table and its (station_id, year) index, read as `/weather/stats` does.
+        "SELECT count(*) FROM (SELECT * FROM weather_stats ORDER BY station_id, year)",
+    ]
+    statements += [f"SELECT count(*) FROM {table} INDEXED BY {index.name}"
+                   for index in sorted(WeatherRecord.__table__.indexes, key=lambda i: i.name)]
+    return statements
+
+
+def warm_up(bind: Engine):
+    """
+    Reads the hot indexes and the stats table once, so that the first requests
+    after a cold start hit the page cache instead of the disk. Meant to run in a
+    background thread; statements the database cannot run (e.g. an index missing
+    from an older database) are skipped.
+    """
+    started = time.perf_counter()
+    with bind.connect() as connection:
+        for statement in _warmup_statements():
+            try:
+                connection.execute(text(statement)).scalar()
+            except OperationalError as e:
+                logger.warning(f"Warm-up statement skipped ({e.orig}): {statement}")
+    logger.info(f"Warm-up finished in {time.perf_counter() - started:.3f}s")
@@ -1,28 +1,48 @@
+import io
 import os
-import glob
+import queue
 import logging
+import threading
 import multiprocessing
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
-from sqlalchemy.orm import Session
-from app.core.database import SessionLocal, engine
-from app.models import WeatherRecord, Base
+from itertools import repeat
+import numpy as np
+from app.core.database import engine
+from app.core.generation import RECORDS_GENERATION_ROW_ID, bump_generation, current_generation
+from app.core.metrics import record_phase
+from app.models import Base
+from app.services import catalog, columnar, manifest, sources
+from app.services.bulk_writer import BulkWriter
+from app.services.manifest import FilePlan
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
 
+# Number of rows the streaming writer accumulates before each commit.
+DEFAULT_BATCH_SIZE = 10000
+# Number of parsed files that may wait for the writer before parsing pauses.
+DEFAULT_QUEUE_SIZE = 8
+# Sentinel the raw files use for a missing observation.
+MISSING_VALUE = -9999
 
-def process_file(file_path: str) -> list[dict]:
+
+def process_file(file_path: str, offset: int = 0, content: bytes | None = None) -> list[dict]:
     """
     Parses a single weather data file and returns a list of record dictionaries.
 
     This function is designed to be run in parallel.It handles reading the file,
     parsing lines, converting data types, and handling missing values (-9999).
     It does NOT interact with the database to avoid locking issues.
+    A non-zero `offset` starts parsing at that byte, which must be a line boundary.
+
+    `.gz`/`.zst` files are decompressed as they are read. Archive members are
+    passed as `content`, with `file_path` naming the member (`archive::member`).
     """
-    station_id = os.path.basename(file_path).replace(".txt", "")
+    station_id = sources.station_id(file_path)
     records_to_insert = []
-    with open(file_path, 'r') as f:
+    with io.TextIOWrapper(sources.open_source(file_path, offset, content)) as f:
         for line in f:
             parts = line.strip().split('\t')
             if len(parts) != 4:
@@ -57,82 +77,530 @@ def process_file(file_path: str) -> list[dict]:
     return records_to_insert
 
 
-def ingest_data(data_dir: str):
+class ColumnBatch:
     """
-    Orchestrates the ingestion of weather data.
+    Column-oriented parse result for a single station file.
 
-    Steps:
-    1.  **Parallel Processing**: Uses a ProcessPoolExecutor to parse text files concurrently.
-        This significantly speeds up reading and data conversion.
-    2.  **Aggregation**: Collects all parsed records from the worker processes.
-    3.  **Database Insertion**: Performs a bulk insert of new records into the database.
-        Checks for existing records to maintain idempotency and avoids duplicates.
+    Dates are held as a `datetime64[D]` array and the measurements as float64
+    arrays in converted units, with NaN marking a missing (-9999) observation.
     """
-    start_time = datetime.now()
-    logger.info(f"Ingestion started at {start_time}")
+    __slots__ = ("station_id", "dates", "max_temp", "min_temp", "precip")
 
-    Base.metadata.create_all(bind=engine)
+    def __init__(self, station_id: str, dates: np.ndarray, max_temp: np.ndarray,
+                 min_temp: np.ndarray, precip: np.ndarray):
+        self.station_id = station_id
+        self.dates = dates
+        self.max_temp = max_temp
+        self.min_temp = min_temp
+        self.precip = precip
 
-    files = glob.glob(os.path.join(data_dir, "*.txt"))
-    all_records = []
+    def __len__(self) -> int:
+        return len(self.dates)
 
-    # Check for sequential mode (useful for Cloud Run/Serverless where /dev/shm is limited)
-    if os.environ.get('SEQUENTIAL_INGEST', 'false').lower() == 'true':
+    @classmethod
+    def from_records(cls, station_id: str, records: list[dict]) -> "ColumnBatch":
+        def column(name):
+            return np.array([np.nan if rec[name] is None else rec[name]
+                             for rec in records], dtype=np.float64)
+
+        return cls(
+            station_id,
+            np.array([rec['date'] for rec in records], dtype="datetime64[D]"),
+            column('max_temp'), column('min_temp'), column('precip'),
+        )
+
+    def to_records(self) -> list[dict]:
+        """Returns the rows in the same shape as `process_file`."""
+        def column(values):
+            return np.where(np.isnan(values), None, values).tolist()
+
+        return [
+            {
+                'station_id': self.station_id,
+                'date': record_date,
+                'max_temp': max_temp,
+                'min_temp': min_temp,
+                'precip': precip
+            }
+            for record_date, max_temp, min_temp, precip in zip(
+                self.dates.tolist(), column(self.max_temp),
+                column(self.min_temp), column(self.precip))
+        ]
+
+    def station_year_rows(self) -> list[tuple[tuple[str, int], list[tuple]]]:
+        """
+        Returns the rows as `BulkWriter` parameter tuples grouped by
+        (station_id, year), zipped straight from the column arrays.
+        """
+        def column(values):
+            return np.where(np.isnan(values), None, values).tolist()
+
+        rows = list(zip(repeat(self.station_id), np.datetime_as_string(self.dates).tolist(),
+                        column(self.max_temp), column(self.min_temp), column(self.precip)))
+        years = self.dates.astype("datetime64[Y]").astype(np.int64) + 1970
+        bounds = [0, *(np.flatnonzero(np.diff(years)) + 1).tolist(), len(rows)]
+        return [((self.station_id, int(years[lo])), rows[lo:hi])
+                for lo, hi in zip(bounds, bounds[1:]) if hi > lo]
+
+
+def _decode_dates(raw_dates: np.ndarray) -> np.ndarray | None:
+    """
+    Converts YYYYMMDD integers to `datetime64[D]`, or returns None if any of them
+    is not a valid calendar date.
+    """
+    years = raw_dates // 10000
+    months = raw_dates // 100 % 100
+    days = raw_dates % 100
+    if not (np.all((years >= 1000) & (years <= 9999))
+            and np.all((months >= 1) & (months <= 12)) and np.all(days >= 1)):
+        return None
+    month_starts = ((years - 1970).astype("datetime64[Y]").astype("datetime64[M]")
+                    + (months - 1))
+    dates = month_starts.astype("datetime64[D]") + (days - 1)
+    # Days past the end of the month roll over into the next one.
+    if np.any(dates.astype("datetime64[M]") != month_starts):
+        return None
+    return dates
+
+
+def process_file_vectorized(file_path: str, offset: int = 0,
+                            content: bytes | None = None) -> ColumnBatch:
+    """
+    NumPy implementation of `process_file` that returns a `ColumnBatch`.
+
+    The whole file is read at once and parsed into an integer matrix, after which
+    the date decoding, missing value masking and unit conversion are done as array
+    operations. Files the fast path cannot prove to be well formed (wrong field
+    counts, invalid dates) are handed to `process_file`, so both parsers always
+    produce the same rows.
+    """
+    station_id = sources.station_id(file_path)
+    source_content = content
+    with sources.open_source(file_path, offset, content) as f:
+        content = f.read()
+
+    n_lines = content.count(b'\n')
+    if content and not content.endswith(b'\n'):
+        n_lines += 1
+    try:
+        values = np.fromstring(content, dtype=np.int64, sep=' ')
+    except ValueError:
+        values = np.empty(0, dtype=np.int64)
+    dates = None
+    if values.size == 4 * n_lines and content.count(b'\t') == 3 * n_lines:
+        values = values.reshape(n_lines, 4)
+        dates = _decode_dates(values[:, 0])
+    if dates is None:
+        return ColumnBatch.from_records(
+            station_id, process_file(file_path, offset, source_content))
+
+    measurements = values[:, 1:] / 10.0
+    measurements[values[:, 1:] == MISSING_VALUE] = np.nan
+    return ColumnBatch(station_id, dates, measurements[:, 0].copy(),
+                       measurements[:, 1].copy(), measurements[:, 2].copy())
+
+
+# Parser backends selectable through `ingest_data(parser=...)`.
+PARSERS = {
+    "python": process_file,
+    "numpy": process_file_vectorized,
+}
+
+
+def _conflict_action(plan: FilePlan, on_conflict: str) -> str:
+    # A file re-read in full may have been edited in place, and a line that was
+    # incomplete may have been stored truncated, so their rows overwrite the
+    # stored ones; rows appended to a file use the run's action.
+    if plan.action == manifest.FULL or plan.rereads_partial_line:
+        return "update"
+    return on_conflict
+
+
+def _iter_parsed_files(plans: list[FilePlan], sequential: bool, parser: str = "python"):
+    """
+    Yields `(plan, complete, parsed records)` for each parsed file as soon as
+    it is available. Archives are parsed member by member; `complete` is only
+    true with the last of a plan's results, so that the plan is recorded once
+    all of the file's rows are.
+
+    At most two parse tasks per CPU are in flight at any time. The generator only
+    submits new work when the consumer asks for the next result, so a slow consumer
+    pauses parsing instead of letting finished results pile up in memory.
+    """
+    parse = PARSERS[parser]
+    tasks = sources.parse_tasks(plans)
+    if sequential:
+        for plan, task in tasks:
+            yield plan, task.last, parse(task.source, task.offset, task.content)
+        return
+
+    max_in_flight = multiprocessing.cpu_count() * 2
+    outstanding = Counter()  # Submitted tasks not yielded yet, per file
+    fully_submitted = set()
+
+    def submit(executor, plan, task):
+        outstanding[plan.file_name] += 1
+        if task.last:
+            fully_submitted.add(plan.file_name)
+        in_flight[executor.submit(parse, task.source, task.offset, task.content)] = plan
+
+    with ProcessPoolExecutor(mp_context=multiprocessing.get_context('spawn')) as executor:
+        in_flight = {}
+        for plan, task in tasks:
+            submit(executor, plan, task)
+            if len(in_flight) >= max_in_flight:
+                break
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                plan = in_flight.pop(future)
+                outstanding[plan.file_name] -= 1
+                complete = (not outstanding[plan.file_name]
+                            and plan.file_name in fully_submitted)
+                yield plan, complete, future.result()
+                next_task = next(tasks, None)
+                if next_task is not None:
+                    submit(executor, *next_task)
+
+
+class _StreamWriter(threading.Thread):
+    """
+    Consumes parsed files from a bounded queue and writes them to the database.
+
+    Rows are buffered and committed through a `BulkWriter` every `batch_size`
+    rows, so a single transaction never holds more than one batch. A file's
+    manifest entry is committed together with the batch holding its last rows.
+    The station-years changed by the committed batches are collected in the
+    writer's `station_years`.
+    """
+
+    def __init__(self, records_queue: queue.Queue, batch_size: int, writer: BulkWriter):
+        super().__init__(name="ingest-writer", daemon=True)
+        self.records_queue = records_queue
+        self.batch_size = batch_size
+        self.writer = writer
+        self.rows_written = 0
+        self.write_seconds = 0.0
+        self.error = None
+
+    def run(self):
+        buffers = {}  # Buffered parse results per conflict action
+        buffered = 0
+        plans = []
+        try:
+            with self.writer:
+                while True:
+                    item = self.records_queue.get()
+                    if item is None:
+                        break
+                    if self.error is not None:
+                        # Keep draining so the producer never blocks on a dead writer.
+                        continue
+                    plan, complete, records = item
+                    try:
+                        buffers.setdefault(
+                            _conflict_action(plan, self.writer.on_conflict), []).append(records)
+                        buffered += len(records)
+                        if complete:
+                            plans.append(plan)
+                        if buffered >= self.batch_size:
+                            self._flush(buffers, plans)
+                            buffers, buffered, plans = {}, 0, []
+                    except Exception as e:
+                        self.error = e
+                if self.error is None and (buffered or plans):
+                    self._flush(buffers, plans)
+        except Exception as e:
+            self.error = e
+
+    def _flush(self, buffers: dict, plans: list[FilePlan]):
+        started = datetime.now()
+        batch = [(on_conflict, records) for on_conflict, parsed in buffers.items() for records in parsed]
+        written = sum(self.writer.write(records, on_conflict) for on_conflict, records in batch)
+        manifest.record_files(self.writer.connection, plans)
+        self.writer.commit()
+        self.write_seconds += (datetime.now() - started).total_seconds()
+        self.rows_written += written
+        logger.info(f"Committed batch of {sum(len(records) for _, records in batch)} records "
+                    f"({self.rows_written} new records written so far)")
+
+
+def _rate(rows: int, seconds: float) -> float:
+    return rows / seconds if seconds > 0 else 0.0
+
+
+def _ingest_streaming(plans: list[FilePlan], sequential: bool, parser: str,
+                      batch_size: int, queue_size: int,
+                      writer: BulkWriter) -> tuple[int, set[tuple[str, int]]]:
+    """
+    Streams parsed files through a bounded queue to a dedicated writer thread.
+
+    Parsing and writing overlap, and `queue.put` blocks once `queue_size` parsed
+    files are waiting, which pauses parsing until the writer catches up. Peak
+    memory is therefore bounded by the queue and batch sizes rather than by the
+    size of the dataset.
+
+    Returns the number of new records and the (station_id, year) pairs written.
+    """
+    records_queue = queue.Queue(maxsize=queue_size)
+    writer = _StreamWriter(records_queue, batch_size, writer)
+    writer.start()
+
+    parse_started = datetime.now()
+    rows_parsed = 0
+    files_parsed = 0
+    try:
+        for plan, complete, records in _iter_parsed_files(plans, sequential, parser):
+            rows_parsed += len(records)
+            records_queue.put((plan, complete, records))
+            if complete:
+                files_parsed += 1
+                logger.info(f"Processed file {files_parsed}/{len(plans)}")
+            if writer.error is not None:
+                break
+    finally:
+        parse_seconds = (datetime.now() - parse_started).total_seconds()
+        records_queue.put(None)
+        writer.join()
+
+    if writer.error is not None:
+        logger.error(f"Error during streaming insert: {writer.error}")
+
+    logger.info(f"Parse phase: {rows_parsed} rows in {parse_seconds:.2f}s "
+                f"({_rate(rows_parsed, parse_seconds):.0f} rows/s)")
+    logger.info(f"Write phase: {writer.rows_written} rows in {writer.write_seconds:.2f}s "
+                f"({_rate(writer.rows_written, writer.write_seconds):.0f} rows/s)")
+    record_phase("ingest", "parse", parse_seconds)
+    record_phase("ingest", "insert", writer.write_seconds)
+    return writer.rows_written, writer.writer.station_years
+
+
+def _ingest_batch(plans: list[FilePlan], sequential: bool, parser: str,
+                  batch_size: int, writer: BulkWriter) -> tuple[int, set[tuple[str, int]]]:
+    """
+    Parses every file up front, then upserts all records in a single
+    transaction, together with the files' manifest entries.
+
+    Returns the number of new records and the (station_id, year) pairs written.
+    """
+    parse = PARSERS[parser]
+    parsed_by_action = {}  # Parse results per conflict action
+
+    def collect(plan, parsed):
+        parsed_by_action.setdefault(
+            _conflict_action(plan, writer.on_conflict), []).append(parsed)
+
+    parse_started = datetime.now()
+    if sequential:
         logger.info("Running in sequential mode (SEQUENTIAL_INGEST=true)")
-        for i, file_path in enumerate(files):
-            all_records.extend(process_file(file_path))
-            logger.info(f"Processed file {i + 1}/{len(files)}")
+        for i, (plan, task) in enumerate(sources.parse_tasks(plans)):
+            collect(plan, parse(task.source, task.offset, task.content))
+            logger.info(f"Processed file {i + 1}")
     else:
+        tasks = list(sources.parse_tasks(plans))
         # Calculate an optimal chunk size for the process pool
-        chunksize = max(1, len(files) // (multiprocessing.cpu_count() * 2))
+        chunksize = max(1, len(tasks) // (multiprocessing.cpu_count() * 2))
 
         # Use 'spawn' context for better compatibility across OS (especially Windows)
         with ProcessPoolExecutor(mp_context=multiprocessing.get_context('spawn')) as executor:
-            results = executor.map(process_file, files, chunksize=chunksize)
-            for i, result in enumerate(results):
-                all_records.extend(result)
-                logger.info(f"Processed file {i + 1}/{len(files)}")
+            results = executor.map(
+                parse, [task.source for _, task in tasks], [task.offset for _, task in tasks],
+                [task.content for _, task in tasks], chunksize=chunksize)
+            for i, ((plan, _), result) in enumerate(zip(tasks, results)):
+                collect(plan, result)
+                logger.info(f"Processed file {i + 1}/{len(tasks)}")
+
+    rows_parsed = sum(len(records) for parsed in parsed_by_action.values() for records in parsed)
+    parse_seconds = (datetime.now() - parse_started).total_seconds()
+    logger.info(f"Parse phase: {rows_parsed} rows in {parse_seconds:.2f}s "
+                f"({_rate(rows_parsed, parse_seconds):.0f} rows/s)")
+    record_phase("ingest", "parse", parse_seconds)
 
-    session = SessionLocal()
     total_new_records = 0
+    station_years = set()
+    insert_started = datetime.now()
     try:
         logger.info("Starting database insertion...")
-        station_ids = sorted(list({rec['station_id'] for rec in all_records}))
-        total_stations = len(station_ids)
+        with writer:
+            rows_written = 0
+            for on_conflict, parsed in parsed_by_action.items():
+                for records in parsed:
+                    total_new_records += writer.write(records, on_conflict)
+                    logged = rows_written // batch_size
+                    rows_written += len(records)
+                    if rows_written // batch_size > logged or rows_written == rows_parsed:
+                        logger.info(f"Processed {rows_written}/{rows_parsed} records")
+            manifest.record_files(writer.connection, plans)
+            writer.commit()
+        station_years = writer.station_years
+    except Exception as e:
+        logger.error(f"Error during bulk insert: {e}")
+        total_new_records = 0
 
-        for i, station_id in enumerate(station_ids):
-            existing_dates = session.query(WeatherRecord.date).filter(
-                WeatherRecord.station_id == station_id).all()
-            existing_dates_set = {d[0] for d in existing_dates}
+    insert_seconds = (datetime.now() - insert_started).total_seconds()
+    logger.info(f"Write phase: {total_new_records} rows in {insert_seconds:.2f}s "
+                f"({_rate(total_new_records, insert_seconds):.0f} rows/s)")
+    record_phase("ingest", "insert", insert_seconds)
+    return total_new_records, station_years
 
-            records_for_station = [
-                rec for rec in all_records if rec['station_id'] == station_id]
 
-            # Use dictionaries directly for bulk_insert_mappings
-            new_records_dicts = [
-                rec for rec in records_for_station if rec['date'] not in existing_dates_set
-            ]
+def _plan_files(files: list[str], data_dir: str, incremental: bool) -> list[FilePlan]:
+    """
+    Compares each file with the ingestion manifest and returns the plans of the
+    files that need parsing. Files that were only touched get their new mtime
+    recorded straight away so the next run skips them without reading them.
+    """
+    started = datetime.now()
+    with engine.begin() as connection:
+        entries = manifest.load_manifest(connection) if incremental else {}
+        plans = [manifest.plan_file(file_path, data_dir, entries.get(
+            os.path.relpath(file_path, data_dir))) for file_path in files]
+        touched = [plan for plan in plans if plan.action == manifest.SKIP
+                   and plan.mtime != entries[plan.file_name].mtime]
+        manifest.record_files(connection, touched)
 
-            if new_records_dicts:
-                session.bulk_insert_mappings(WeatherRecord, new_records_dicts)
-                total_new_records += len(new_records_dicts)
+    # Deciding which files and bytes are new is the file-level dedupe; rows
+    # are deduplicated by the `uix_station_date` constraint during the insert.
+    record_phase("ingest", "dedupe", (datetime.now() - started).total_seconds())
+    counts = {action: sum(plan.action == action for plan in plans)
+              for action in (manifest.SKIP, manifest.APPEND, manifest.FULL)}
+    logger.info(f"Manifest: {counts[manifest.SKIP]} unchanged, "
+                f"{counts[manifest.APPEND]} appended, {counts[manifest.FULL]} to re-read")
+    return [plan for plan in plans if plan.action != manifest.SKIP]
 
-            if (i + 1) % 10 == 0 or (i + 1) == total_stations:
-                logger.info(
-                    f"Processed station {i + 1}/{total_stations}")
 
-        session.commit()
-    except Exception as e:
-        logger.error(f"Error during bulk insert: {e}")
-        session.rollback()
-    finally:
-        session.close()
+def ingest_data(data_dir: str, streaming: bool | None = None,
+                batch_size: int = DEFAULT_BATCH_SIZE,
+                queue_size: int = DEFAULT_QUEUE_SIZE,
+                parser: str | None = None, incremental: bool = True,
+                on_conflict: str = "nothing", rebuild_indexes: bool | None = None,
+                build_columnar: bool | None = None):
+    """
+    Orchestrates the ingestion of weather data.
+
+    Steps:
+    1.  **Parallel Processing**: Uses a ProcessPoolExecutor to parse text files concurrently.
+        This significantly speeds up reading and data conversion.
+    2.  **Aggregation**: Collects all parsed records from the worker processes.
+    3.  **Database Insertion**: Upserts the records through a `BulkWriter`, letting the
+        `uix_station_date` constraint skip existing rows to maintain idempotency.
+        `on_conflict="update"` overwrites existing rows instead. Files re-read in
+        full (new, edited in place or `incremental=False`) are always written
+        with `"update"`, so edited values replace the stored ones; `on_conflict`
+        applies to rows appended to known files. Also,
+        `rebuild_indexes` controls dropping the secondary indexes during the load
+        (by default only when the table is empty).
+
+    With `streaming=True` (or `STREAMING_INGEST=true`) the records are never
+    aggregated. Parsed files flow through a bounded queue of `queue_size` files to
+    a writer thread that commits every `batch_size` rows, keeping memory flat
+    regardless of the dataset size.
+
+    `parser` selects the parsing backend: "python" (default, `process_file`) or
+    "numpy" (`process_file_vectorized`). It can also be set with `INGEST_PARSER`.
+
+    Besides `*.txt` station files, `data_dir` may hold `.txt.gz`/`.txt.zst`
+    files and tar archives (optionally gzip/zstd compressed) of station files.
+    They are decompressed as streams, never extracted to disk: compressed files
+    in the parse workers, archives in a single forward pass whose members are
+    handed to the workers. Station IDs come from the file or member names.
+
+    With `incremental=True` the `ingest_manifest` table is consulted first:
+    unchanged files are skipped, appended files are parsed from their last
+    ingested byte offset and any other change re-reads just that file.
+    Compressed files and archives cannot be read from an offset, so any change
+    to them re-reads the whole file. `incremental=False` re-reads every file.
+
+    With `build_columnar=True` (by default when `COLUMNAR_READS` is enabled) the
+    memory-mapped columnar store serving `/weather` is brought up to date at the
+    end of the run, re-reading only the stations that received new records. A
+    store left behind by earlier runs without it is rebuilt in full; until then
+    the API serves those stations from SQL.
+
+    The `stations` catalog is refreshed for the stations that received new
+    records (or built in full when it is empty).
+
+    With `PARTITIONED_STORAGE` enabled, records are written to one attached
+    SQLite file per `PARTITION_YEARS` span of years (see
+    `app.services.partitions`), created as the data reaches them. Records for
+    a frozen partition are refused like any other write error.
+
+    Returns the set of (station_id, year) pairs whose records this run inserted
+    or changed, which is the dirty set `calculate_and_store_stats` needs to
+    recompute. Re-read rows whose values did not change are not included.
+    """
+    if parser is None:
+        parser = os.environ.get('INGEST_PARSER', 'python').lower()
+    if parser not in PARSERS:
+        raise ValueError(
+            f"Unknown parser '{parser}', expected one of {sorted(PARSERS)}")
+
+    start_time = datetime.now()
+    logger.info(f"Ingestion started at {start_time}")
+
+    Base.metadata.create_all(bind=engine)
+
+    files = sources.discover(data_dir)
+    plans = _plan_files(files, data_dir, incremental)
+
+    # Check for sequential mode (useful for Cloud Run/Serverless where /dev/shm is limited)
+    sequential = os.environ.get('SEQUENTIAL_INGEST', 'false').lower() == 'true'
+    if streaming is None:
+        streaming = os.environ.get('STREAMING_INGEST', 'false').lower() == 'true'
+    if build_columnar is None:
+        build_columnar = columnar.COLUMNAR_READS_ENABLED
+
+    writer = BulkWriter(engine, on_conflict=on_conflict,
+                        rebuild_indexes=rebuild_indexes)
+    if not plans:
+        total_new_records, station_years = 0, set()
+    elif streaming:
+        logger.info(f"Running in streaming mode (batch_size={batch_size}, "
+                    f"queue_size={queue_size})")
+        total_new_records, station_years = _ingest_streaming(
+            plans, sequential, parser, batch_size, queue_size, writer)
+    else:
+        total_new_records, station_years = _ingest_batch(
+            plans, sequential, parser, batch_size, writer)
+
+    catalog_started = datetime.now()
+    with engine.begin() as connection:
+        if not catalog.catalog_built(connection):
+            # First run, or a database ingested before the catalog existed.
+            catalog_changed = catalog.refresh_catalog(connection) > 0
+        elif total_new_records:
+            catalog.refresh_catalog(connection, {station_id for station_id, _ in station_years})
+            catalog_changed = True
+        else:
+            catalog_changed = False
+        if total_new_records or catalog_changed:
+            # Invalidates the API's cached responses.
+            bump_generation(connection)
+        if total_new_records:
+            # Marks the columnar store stale until it is rebuilt.
+            bump_generation(connection, RECORDS_GENERATION_ROW_ID)
+        records_generation, _ = current_generation(connection, RECORDS_GENERATION_ROW_ID)
+    record_phase("ingest", "catalog", (datetime.now() - catalog_started).total_seconds())
+
+    built_generation = columnar.store_generation() if build_columnar else None
+    if build_columnar and built_generation != records_generation:
+        columnar_started = datetime.now()
+        station_ids = None
+        if total_new_records and built_generation == records_generation - 1:
+            # The store was current before this run: only its stations changed.
+            station_ids = {station_id for station_id, _ in station_years}
+        columnar.build_store(engine, station_ids=station_ids)
+        record_phase("ingest", "columnar", (datetime.now() - columnar_started).total_seconds())
 
     end_time = datetime.now()
+    record_phase("ingest", "total", (end_time - start_time).total_seconds())
     logger.info(f"Ingestion finished at {end_time}")
     logger.info(f"Total new records ingested: {total_new_records}")
     logger.info(f"Total time taken: {end_time - start_time}")
+    return station_years
 
 
 if __name__ == "__main__":
-    ingest_data("app/artifacts/wx_data")
+    from app.services.analysis import calculate_and_store_stats
+
+    calculate_and_store_stats(ingest_data("app/artifacts/wx_data"))
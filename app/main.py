@@ -1,27 +1,54 @@
+import time
+
+# Taken before the other imports, so that the startup report includes them.
+IMPORT_STARTED = time.perf_counter()
+
+import threading
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from app.api import weather
-from app.core.database import engine
+from app.core.database import ASYNC_DB_ENABLED, READ_ONLY_MODE, engine
+from app.core.compression import COMPRESSION_ENABLED, CompressionMiddleware
+from app.core.metrics import METRICS_ENABLED, MetricsMiddleware, metrics_response
+from app.core.startup import WARMUP_ON_START, StartupTimer, logger, warm_up
 from app.models import Base
 
 # This is the main entry point for the FastAPI application.
 # It brings together the API router, database initialization, and the frontend dashboard.
 
+startup_timer = StartupTimer(IMPORT_STARTED)
+startup_timer.mark("imports")
+
 
 # Database table initialization.
 # `Base.metadata.create_all(bind=engine)` checks for the existence of tables
 # before creating them, making it safe to run on every application startup.
 # For production environments, a more robust migration tool like Alembic
 # would be used to manage schema changes over time.
-Base.metadata.create_all(bind=engine)
+# In `READ_ONLY_MODE` the database is served as shipped and never altered.
+if not READ_ONLY_MODE:
+    Base.metadata.create_all(bind=engine)
+startup_timer.mark("schema")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup_timer.mark("startup")
+    if WARMUP_ON_START:
+        # In the background, so the first requests are not held back by it.
+        threading.Thread(target=warm_up, args=(engine,), name="warm-up", daemon=True).start()
+    logger.info(startup_timer.report())
+    yield
 
 
 # Initialize the FastAPI app with metadata for the OpenAPI documentation.
 app = FastAPI(
     title="Weather Data API",
     description="An API for accessing and analyzing weather data records.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Setup for the HTML template rendering for the root dashboard page.
@@ -30,8 +57,28 @@ templates = Jinja2Templates(directory="app/templates")
 
 # The API router is included with a prefix, organizing all weather-related
 # endpoints under `/api`. This is a good practice for versioning and clarity.
+# With `ASYNC_DB` enabled, the async versions of the read endpoints are registered
+# first so they take precedence; the sync router still serves the rest. They are
+# kept out of the schema, which the sync endpoints already document identically.
+if ASYNC_DB_ENABLED:
+    from app.api import weather_async
+    app.include_router(weather_async.router, prefix="/api", tags=["Weather"],
+                       include_in_schema=False)
 app.include_router(weather.router, prefix="/api", tags=["Weather"])
 
+# Responses are compressed with gzip, or brotli when it is installed, as
+# negotiated on `Accept-Encoding`. Added before the metrics middleware so that
+# request latencies include the compression time.
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# With `METRICS_ENABLED`, request latencies, SQL statement timings and job
+# phase durations are exposed in the Prometheus text format at `/metrics`.
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.add_api_route("/metrics", metrics_response, include_in_schema=False)
+startup_timer.mark("app")
+
 
 @app.get("/", response_class=HTMLResponse, tags=["Root"])
 async def read_root(request: Request):
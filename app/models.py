@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Float, UniqueConstraint
+from sqlalchemy import Boolean, Column, Integer, String, Date, DateTime, Float, UniqueConstraint
 from app.core.database import Base
 
 
@@ -44,3 +44,146 @@ class WeatherStats(Base):
         # per station per year.
         UniqueConstraint('station_id', 'year', name='uix_station_year'),
     )
+
+
+class WeatherStatsExtremes(Base):
+    """
+    Threshold counts, dry spells and temperature percentiles per station and
+    year, maintained by the analysis job next to `WeatherStats` and served with
+    it by the stats endpoint.
+    """
+    __tablename__ = "weather_stats_extremes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    station_id = Column(String, nullable=False)
+    year = Column(Integer, nullable=False)
+    heat_days = Column(Integer, nullable=True)  # Days with a maximum of 30 °C or more
+    frost_days = Column(Integer, nullable=True)  # Days with a minimum below 0 °C
+    longest_dry_spell = Column(Integer, nullable=True)  # Consecutive days under 1 mm
+    max_temp_p10 = Column(Float, nullable=True)  # Degrees Celsius
+    max_temp_p50 = Column(Float, nullable=True)
+    max_temp_p90 = Column(Float, nullable=True)
+    min_temp_p10 = Column(Float, nullable=True)  # Degrees Celsius
+    min_temp_p50 = Column(Float, nullable=True)
+    min_temp_p90 = Column(Float, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint('station_id', 'year', name='uix_extremes_station_year'),
+    )
+
+
+class WeatherMonthlyStats(Base):
+    """
+    Monthly counterpart of `WeatherStats`, maintained by the same analysis job.
+    """
+    __tablename__ = "weather_stats_monthly"
+
+    id = Column(Integer, primary_key=True, index=True)
+    station_id = Column(String, nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)  # 1-12
+    avg_max_temp = Column(Float, nullable=True)  # Degrees Celsius
+    avg_min_temp = Column(Float, nullable=True)  # Degrees Celsius
+    total_precip = Column(Float, nullable=True)  # Stored in cm
+    days = Column(Integer, nullable=False)  # Daily records aggregated
+
+    __table_args__ = (
+        # Also serves station and station/year lookups, ordered by month.
+        UniqueConstraint('station_id', 'year', 'month', name='uix_station_year_month'),
+    )
+
+
+class WeatherClimatology(Base):
+    """
+    Per-station normals for each calendar day over the baseline period, so that
+    an observation can be compared to its day's normal without scanning decades
+    of daily records. Days are numbered on a leap-year calendar (February 29 is
+    day 60, March 1 always day 61).
+    """
+    __tablename__ = "weather_climatology"
+
+    id = Column(Integer, primary_key=True, index=True)
+    station_id = Column(String, nullable=False)
+    day_of_year = Column(Integer, nullable=False)  # 1-366
+    max_temp_mean = Column(Float, nullable=True)  # Degrees Celsius
+    max_temp_min = Column(Float, nullable=True)
+    max_temp_max = Column(Float, nullable=True)
+    min_temp_mean = Column(Float, nullable=True)  # Degrees Celsius
+    min_temp_min = Column(Float, nullable=True)
+    min_temp_max = Column(Float, nullable=True)
+    precip_mean = Column(Float, nullable=True)  # mm, like the daily records
+    precip_min = Column(Float, nullable=True)
+    precip_max = Column(Float, nullable=True)
+    years = Column(Integer, nullable=False)  # Baseline years with a record for the day
+
+    __table_args__ = (
+        UniqueConstraint('station_id', 'day_of_year', name='uix_station_day_of_year'),
+    )
+
+
+class Station(Base):
+    """
+    Catalog of the stations in `weather_records` with their coverage, kept up
+    to date by ingestion for the stations each run touches. Lets clients see
+    which ranges hold data without scanning the records.
+    """
+    __tablename__ = "stations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    station_id = Column(String, unique=True, nullable=False)
+    first_date = Column(Date, nullable=False)
+    last_date = Column(Date, nullable=False)
+    record_count = Column(Integer, nullable=False)
+    # Records with a missing (-9999) value, per variable.
+    missing_max_temp = Column(Integer, nullable=False)
+    missing_min_temp = Column(Integer, nullable=False)
+    missing_precip = Column(Integer, nullable=False)
+
+
+class RecordPartition(Base):
+    """
+    Registry of the partition files holding the weather records when
+    partitioned storage is enabled: one SQLite file per span of years, attached
+    to the main database on demand. Frozen partitions are attached read-only
+    and refused by ingestion.
+    """
+    __tablename__ = "record_partitions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    first_year = Column(Integer, unique=True, nullable=False)
+    last_year = Column(Integer, nullable=False)  # Inclusive
+    file_name = Column(String, nullable=False)  # Relative to PARTITION_DIR
+    frozen = Column(Boolean, nullable=False, default=False)
+
+
+class IngestManifest(Base):
+    """
+    Records the state of each source file as of its last successful ingestion.
+    Comparing a file against its entry lets ingestion skip unchanged files and
+    read appended files from the last ingested byte offset.
+    """
+    __tablename__ = "ingest_manifest"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Path relative to the data directory, so the manifest survives a move.
+    file_name = Column(String, unique=True, nullable=False)
+    size = Column(Integer, nullable=False)  # Bytes
+    mtime = Column(Float, nullable=False)  # Seconds since the epoch
+    # SHA-256 of the first `byte_offset` bytes, i.e. the ingested content.
+    content_hash = Column(String, nullable=False)
+    byte_offset = Column(Integer, nullable=False)
+    ingested_at = Column(DateTime, nullable=False)
+
+
+class DataGeneration(Base):
+    """
+    Counter bumped by every job that changes the served data (ingestion,
+    statistics). API response caches are keyed on its value, so a bump
+    invalidates them even when the job runs in another process. A second row
+    counts ingestion runs that changed the records, for the columnar store.
+    """
+    __tablename__ = "data_generation"
+
+    id = Column(Integer, primary_key=True)
+    generation = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False)  # UTC
@@ -1,5 +1,5 @@
 from datetime import date
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 
 
 class WeatherRecordBase(BaseModel):
@@ -31,6 +31,107 @@ class WeatherStatsBase(BaseModel):
 
 class WeatherStats(WeatherStatsBase):
     id: int
+    # From `weather_stats_extremes`; null until the analysis job has computed them.
+    heat_days: int | None = None  # Days with a maximum of 30 °C or more
+    frost_days: int | None = None  # Days with a minimum below 0 °C
+    longest_dry_spell: int | None = None  # Consecutive days with less than 1 mm
+    max_temp_p10: float | None = None
+    max_temp_p50: float | None = None
+    max_temp_p90: float | None = None
+    min_temp_p10: float | None = None
+    min_temp_p50: float | None = None
+    min_temp_p90: float | None = None
 
     class Config:
         orm_mode = True
+
+
+class WeatherMonthlyStats(BaseModel):
+    station_id: str
+    year: int
+    month: int
+    avg_max_temp: float | None
+    avg_min_temp: float | None
+    total_precip: float | None  # cm, like the yearly statistics
+    days: int  # Daily records aggregated
+    id: int
+
+    class Config:
+        orm_mode = True
+
+
+class WeatherClimatology(BaseModel):
+    station_id: str
+    day_of_year: int  # 1-366 on a leap-year calendar
+    max_temp_mean: float | None
+    max_temp_min: float | None
+    max_temp_max: float | None
+    min_temp_mean: float | None
+    min_temp_min: float | None
+    min_temp_max: float | None
+    precip_mean: float | None  # mm
+    precip_min: float | None
+    precip_max: float | None
+    years: int  # Baseline years with a record for the day
+    id: int
+
+    class Config:
+        orm_mode = True
+
+
+class WeatherAnomaly(WeatherRecordBase):
+    # Departures from the station's normal (climatology mean) for the day.
+    max_temp_anomaly: float | None
+    min_temp_anomaly: float | None
+    precip_anomaly: float | None  # mm
+
+
+class StationCoverage(BaseModel):
+    station_id: str
+    first_date: date
+    last_date: date
+    record_count: int
+    # Records with a missing value, per variable.
+    missing_max_temp: int
+    missing_min_temp: int
+    missing_precip: int
+
+    class Config:
+        orm_mode = True
+
+
+class WeatherSeriesPoint(BaseModel):
+    date: date  # First day of the bucket
+    max_temp: float | None  # Average daily maximum
+    min_temp: float | None  # Average daily minimum
+    precip: float | None  # Total precipitation per station, in mm
+    days: int  # Station-days aggregated into the point
+
+
+class WeatherBatchWindow(BaseModel):
+    station_id: str
+    start_date: date | None = None
+    end_date: date | None = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def from_tuple(cls, value):
+        # Windows may also be sent as [station_id, start_date, end_date] arrays.
+        if isinstance(value, (list, tuple)):
+            return dict(zip(("station_id", "start_date", "end_date"), value))
+        return value
+
+
+class WeatherBatchRequest(BaseModel):
+    station_ids: list[str] = Field([], max_length=1000)  # Share start_date and end_date
+    start_date: date | None = None
+    end_date: date | None = None
+    # One date range each; bounded as SQLite nests each OR term one level deeper.
+    windows: list[WeatherBatchWindow] = Field([], max_length=200)
+    max_rows: int = Field(10000, ge=1, le=100000)  # Cap on the rows of the whole batch
+
+    @model_validator(mode="after")
+    def not_empty(self):
+        if not self.station_ids and not self.windows:
+            raise ValueError("station_ids or windows must list at least one station")
+        return self
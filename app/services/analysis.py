@@ -1,77 +1,262 @@
+import time
 import logging
+from datetime import date
+from itertools import chain, groupby
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import String, cast, delete, func, select
+from sqlalchemy.dialects.sqlite import insert
 from app.core.database import SessionLocal
-from app.models import WeatherRecord, WeatherStats
+from app.core.generation import bump_generation
+from app.core.metrics import record_phase
+from app.models import (
+    WeatherClimatology, WeatherMonthlyStats, WeatherRecord, WeatherStats, WeatherStatsExtremes)
+from app.services import partitions
+from app.services.climatology import BASELINE_END_YEAR, BASELINE_START_YEAR, compute_climatology
+from app.services.extremes import station_year_extremes
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Rows fetched per round trip while streaming the records for the extremes.
+EXTREMES_FETCH_SIZE = 50000
 
-def calculate_and_store_stats():
+
+def _stats_query(records=WeatherRecord.__table__):
+    """
+    Builds the aggregate query computing the yearly statistics per station.
+
+    Using `func.avg` and `func.sum` offloads the heavy computation to the database engine,
+    which is much faster than pulling raw data into Python and calculating manually.
+    """
+    year = func.extract("year", records.c.date).label("year")
+    return (
+        select(
+            records.c.station_id,
+            year,
+            func.avg(records.c.max_temp).label("avg_max_temp"),
+            func.avg(records.c.min_temp).label("avg_min_temp"),
+            func.sum(records.c.precip).label("total_precip"),
+        )
+        .group_by(records.c.station_id, year)
+    )
+
+
+def _monthly_stats_query(records=WeatherRecord.__table__):
+    """Builds the aggregate query computing the monthly statistics per station."""
+    year = func.extract("year", records.c.date).label("year")
+    month = func.extract("month", records.c.date).label("month")
+    return (
+        select(
+            records.c.station_id,
+            year,
+            month,
+            func.avg(records.c.max_temp).label("avg_max_temp"),
+            func.avg(records.c.min_temp).label("avg_min_temp"),
+            func.sum(records.c.precip).label("total_precip"),
+            func.count().label("days"),
+        )
+        .group_by(records.c.station_id, year, month)
+    )
+
+
+def _year_runs(years: list[int]):
+    """Splits sorted years into runs of consecutive years."""
+    for _, run in groupby(enumerate(years), key=lambda item: item[1] - item[0]):
+        run = [year for _, year in run]
+        yield run[0], run[-1]
+
+
+def _dirty_ranges(session: Session, station_years: set[tuple[str, int]]):
+    """
+    Yields the records table and `station_id = ? AND date` range conditions
+    covering the dirty station-years, one per run of consecutive years of a
+    station and partition holding them.
+    """
+    by_station = groupby(sorted(station_years), key=lambda pair: pair[0])
+    for station_id, pairs in by_station:
+        for first_year, last_year in _year_runs([year for _, year in pairs]):
+            for records in partitions.record_tables(session.connection(), first_year, last_year):
+                yield records, (
+                    records.c.station_id == station_id,
+                    records.c.date >= date(first_year, 1, 1),
+                    records.c.date < date(last_year + 1, 1, 1),
+                )
+
+
+def _aggregate_groups(session: Session, station_years: set[tuple[str, int]] | None,
+                      query=_stats_query):
+    """
+    Returns the rows of the aggregate `query` (yearly by default) for the
+    requested (station_id, year) groups, or for every group when `station_years`
+    is None.
+
+    For a dirty set, each station's touched years are grouped into consecutive
+    runs and each run is aggregated with a single `station_id = ? AND date` range
+    query, which the `uix_station_date` index answers without a table scan.
+
+    With partitioned storage, each partition is aggregated on its own and only
+    the partitions holding dirty years are read: partitions are whole years,
+    so no group spans two of them.
+    """
+    if station_years is None:
+        return [row for records in partitions.record_tables(session.connection())
+                for row in session.execute(query(records)).all()]
+
+    rows = []
+    for records, conditions in _dirty_ranges(session, station_years):
+        rows.extend(session.execute(query(records).where(*conditions)).all())
+    return rows
+
+
+def _upsert(session: Session, table, key_columns: list[str], rows: list[dict]):
+    """
+    Writes the rows with a single `INSERT ... ON CONFLICT(<key_columns>) DO UPDATE`
+    statement, relying on the table's unique constraint over `key_columns`.
+    """
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={column: stmt.excluded[column] for column in rows[0] if column not in key_columns},
+    )
+    session.execute(stmt, rows)
+
+
+def _precip_cm(total_precip: float | None) -> float | None:
+    # Perform unit conversion for precipitation from mm to cm as required.
+    return total_precip / 10.0 if total_precip is not None else None
+
+
+def _store_monthly_stats(session: Session, station_years: set[tuple[str, int]] | None) -> int:
+    """Recomputes the monthly statistics of the dirty station-years (default: all)."""
+    rows = [
+        {
+            "station_id": row.station_id,
+            "year": int(row.year),
+            "month": int(row.month),
+            "avg_max_temp": row.avg_max_temp,
+            "avg_min_temp": row.avg_min_temp,
+            "total_precip": _precip_cm(row.total_precip),
+            "days": row.days,
+        }
+        for row in _aggregate_groups(session, station_years, _monthly_stats_query)
+    ]
+    if rows:
+        _upsert(session, WeatherMonthlyStats.__table__, ["station_id", "year", "month"], rows)
+    return len(rows)
+
+
+def _store_extremes(session: Session, station_years: set[tuple[str, int]] | None) -> int:
+    """
+    Recomputes the extremes of the dirty station-years (default: all). The
+    records are streamed in (station_id, date) index order, partition by
+    partition, and each station-year is reduced as soon as its last row has
+    been read.
+    """
+    def statement(records):
+        return select(records.c.station_id, cast(records.c.date, String), records.c.max_temp,
+                      records.c.min_temp, records.c.precip
+                      ).order_by(records.c.station_id, records.c.date)
+
+    connection = session.connection().execution_options(yield_per=EXTREMES_FETCH_SIZE)
+    if station_years is None:
+        statements = [statement(records)
+                      for records in partitions.record_tables(session.connection())]
+    else:
+        statements = (statement(records).where(*conditions)
+                      for records, conditions in _dirty_ranges(session, station_years))
+    # Iterating whole partitions avoids the result's per-row fetch overhead.
+    rows = chain.from_iterable(partition for statement in statements
+                               for partition in connection.execute(statement).partitions())
+    extremes = list(station_year_extremes(rows))
+    if extremes:
+        _upsert(session, WeatherStatsExtremes.__table__, ["station_id", "year"], extremes)
+    return len(extremes)
+
+
+def _store_climatology(session: Session, station_years: set[tuple[str, int]] | None) -> int:
+    """
+    Recomputes the day-of-year normals of every station with a dirty baseline
+    year (default: all stations). A station's normals depend on all of its
+    baseline years, so they are replaced as a whole.
+    """
+    if station_years is None:
+        station_ids = None
+    else:
+        station_ids = {station_id for station_id, year in station_years
+                       if BASELINE_START_YEAR <= year <= BASELINE_END_YEAR}
+        if not station_ids:
+            return 0
+    normals = compute_climatology(session, station_ids)
+    stmt = delete(WeatherClimatology)
+    if station_ids is not None:
+        stmt = stmt.where(WeatherClimatology.station_id.in_(station_ids))
+    session.execute(stmt)
+    if normals:
+        session.execute(insert(WeatherClimatology.__table__), normals)
+    return len(normals)
+
+
+def calculate_and_store_stats(station_years: set[tuple[str, int]] | None = None):
     """
     Calculates yearly weather statistics and upserts them into the `weather_stats` table.
+    The extremes (`weather_stats_extremes`), the monthly statistics
+    (`weather_stats_monthly`) and the day-of-year climatology
+    (`weather_climatology`) are refreshed in the same transaction.
 
     This function aggregates the raw weather data to compute yearly averages for
     temperatures and total precipitation. It's designed to be run periodically
     (e.g., after new data ingestion) to keep the statistical summary up-to-date.
     The use of a separate stats table (materialized view pattern) is a key
     performance optimization for the API.
+
+    `station_years` is the dirty set of (station_id, year) pairs touched by an
+    ingestion run: only those groups are recomputed. Leaving it as None rebuilds
+    the statistics for the whole table.
     """
+    if station_years is not None and not station_years:
+        logger.info("No station-years changed, statistics are up to date.")
+        return
+
     session = SessionLocal()
     try:
-        # This single query efficiently calculates all required statistics at the database level.
-        # Using `func.avg` and `func.sum` offloads the heavy computation to the database engine,
-        # which is much faster than pulling raw data into Python and calculating manually.
-        results = (
-            session.query(
-                WeatherRecord.station_id,
-                func.extract("year", WeatherRecord.date).label("year"),
-                func.avg(WeatherRecord.max_temp).label("avg_max_temp"),
-                func.avg(WeatherRecord.min_temp).label("avg_min_temp"),
-                func.sum(WeatherRecord.precip).label("total_precip"),
-            )
-            .group_by(WeatherRecord.station_id, "year")
-            .all()
-        )
+        started = time.perf_counter()
+        results = _aggregate_groups(session, station_years)
+        record_phase("analysis", "aggregate", time.perf_counter() - started)
 
         stats_to_upsert = []
         for row in results:
-            # Perform unit conversion for precipitation from mm to cm as required.
-            total_precip_cm = (row.total_precip /
-                               10.0) if row.total_precip is not None else None
-
             stats_to_upsert.append({
                 "station_id": row.station_id,
                 "year": int(row.year),
                 "avg_max_temp": row.avg_max_temp,
                 "avg_min_temp": row.avg_min_temp,
-                "total_precip": total_precip_cm,
+                "total_precip": _precip_cm(row.total_precip),
             })
 
-        # For idempotency, we perform an "upsert" operation.
-        # Since SQLite has limited support for `INSERT ... ON CONFLICT`, the chosen strategy
-        # is to delete any existing records for the station-year pairs and then bulk insert
-        # the newly calculated stats. This is a simple and effective approach for this context.
-        # For databases like PostgreSQL, a more direct `ON CONFLICT DO UPDATE` would be preferable.
+        started = time.perf_counter()
         if stats_to_upsert:
-            # Extract station-year pairs to delete existing records.
-            station_year_pairs = [(s['station_id'], s['year'])
-                                  for s in stats_to_upsert]
+            _upsert(session, WeatherStats.__table__, ["station_id", "year"], stats_to_upsert)
+        record_phase("analysis", "upsert", time.perf_counter() - started)
+
+        started = time.perf_counter()
+        monthly = _store_monthly_stats(session, station_years)
+        record_phase("analysis", "monthly", time.perf_counter() - started)
 
-            # Delete all existing stats records that are about to be replaced.
-            # This is done in a single delete operation for efficiency.
-            for station_id, year in station_year_pairs:
-                session.query(WeatherStats).filter_by(
-                    station_id=station_id, year=year
-                ).delete(synchronize_session=False)
+        started = time.perf_counter()
+        extremes = _store_extremes(session, station_years)
+        record_phase("analysis", "extremes", time.perf_counter() - started)
 
-            # Bulk insert the new statistics.
-            session.bulk_insert_mappings(WeatherStats, stats_to_upsert)
+        started = time.perf_counter()
+        normals = _store_climatology(session, station_years)
+        record_phase("analysis", "climatology", time.perf_counter() - started)
 
+        if stats_to_upsert or monthly or extremes or normals:
+            bump_generation(session)
         session.commit()
         logger.info(
-            f"Successfully calculated and stored stats for {len(stats_to_upsert)} records.")
+            f"Successfully calculated and stored stats for {len(stats_to_upsert)} records, "
+            f"{extremes} station-year extremes, {monthly} station-months "
+            f"and {normals} day-of-year normals.")
 
     except Exception as e:
         logger.error(f"An error occurred during statistics calculation: {e}")
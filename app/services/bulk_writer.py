@@ -0,0 +1,249 @@
+import logging
+from itertools import groupby
+from sqlalchemy import inspect, or_, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Connection, Engine
+from app.models import WeatherRecord
+from app.services import partitions
+
+logger = logging.getLogger(__name__)
+
+# Rows sent to the database per `executemany` call.
+DEFAULT_CHUNK_SIZE = 5000
+
+# Connection settings applied for the duration of a bulk load. WAL with relaxed
+# synchronous keeps durability across application crashes (only an OS crash can
+# lose the last commits), and the larger page cache (in KiB when negative) keeps
+# the index B-trees in memory while they are being written.
+INGEST_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -262144,
+    "temp_store": "MEMORY",
+}
+
+ON_CONFLICT_ACTIONS = ("nothing", "update")
+# Measurement columns overwritten by `on_conflict="update"`.
+VALUE_COLUMNS = ("max_temp", "min_temp", "precip")
+# Columns of the parameter rows passed to the upsert, in order.
+ROW_COLUMNS = ("station_id", "date", *VALUE_COLUMNS)
+
+
+def _upsert_statement(table, on_conflict: str):
+    stmt = insert(table)
+    if on_conflict == "update":
+        # Rows whose values are unchanged are left alone, so they are neither
+        # rewritten nor counted as written.
+        return stmt.on_conflict_do_update(
+            index_elements=["station_id", "date"],
+            set_={column: stmt.excluded[column] for column in VALUE_COLUMNS},
+            where=or_(*(table.c[column].is_distinct_from(stmt.excluded[column])
+                        for column in VALUE_COLUMNS)),
+        )
+    return stmt.on_conflict_do_nothing(index_elements=["station_id", "date"])
+
+
+def _station_year(record: dict) -> tuple[str, int]:
+    return record["station_id"], record["date"].year
+
+
+def record_rows(records: list[dict]) -> list[tuple[tuple[str, int], list[tuple]]]:
+    """
+    Groups `records` by (station_id, year) into parameter rows in `ROW_COLUMNS`
+    order, with dates as the ISO strings SQLite stores. Parsed files come
+    ordered by date, so each station-year is one run.
+    """
+    return [
+        (station_year, [(rec["station_id"], rec["date"].isoformat(), rec["max_temp"],
+                         rec["min_temp"], rec["precip"]) for rec in group])
+        for station_year, group in groupby(records, key=_station_year)
+    ]
+
+
+class BulkWriter:
+    """
+    Writes weather records through a native SQLite upsert.
+
+    Rows are sent as chunked `executemany` calls of
+    `INSERT ... ON CONFLICT(station_id, date) DO NOTHING` (or `DO UPDATE` to
+    overwrite the measurements of existing rows that differ), relying on the
+    `uix_station_date` constraint for duplicate detection instead of looking up
+    existing dates per station. Rows are sent one station-year at a time, so
+    that `station_years` holds exactly the (station_id, year) pairs whose rows
+    were inserted or changed by committed writes.
+
+    The statement is compiled once per table and executed on the driver with
+    positional tuples, skipping SQLAlchemy's per-row parameter processing.
+    Column batches from the vectorized parser are zipped straight into those
+    tuples, without building a dict per row.
+
+    Used as a context manager, it owns a dedicated connection: the ingestion
+    PRAGMAs are applied on entry and the previous values restored on exit. With
+    `rebuild_indexes=True` the secondary indexes of `weather_records` are dropped
+    on entry and rebuilt on exit, which is much faster for initial loads. The
+    default (`None`) does so only when the table is empty. Otherwise, indexes
+    left missing by a load interrupted before its rebuild are recreated on entry.
+
+    Writes are not committed until `commit()` is called, so callers can store
+    related bookkeeping in the same transaction through `connection`.
+
+    With partitioned storage, each row goes to the partition of its year,
+    which is created on first use, and `rebuild_indexes` applies to each
+    partition as it is first written to. The main database is kept out of WAL
+    mode: SQLite only commits a transaction spanning several attached files
+    atomically with a rollback journal, and the manifest entries must commit
+    together with their rows.
+    """
+
+    def __init__(self, bind: Engine, on_conflict: str = "nothing",
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, rebuild_indexes: bool | None = None):
+        if on_conflict not in ON_CONFLICT_ACTIONS:
+            raise ValueError(
+                f"Unknown on_conflict action '{on_conflict}', expected one of {ON_CONFLICT_ACTIONS}")
+        self.bind = bind
+        self.on_conflict = on_conflict
+        self.chunk_size = chunk_size
+        self.rebuild_indexes = rebuild_indexes
+        self.connection: Connection | None = None
+        self._saved_pragmas = {}
+        self._dropped_indexes = []
+        self._statements = {}  # Compiled upsert per target table and conflict action
+        self._pending_station_years = set()
+        self.station_years = set()
+        self._configured_partitions = set()
+        self._written_tables = set()
+
+    def __enter__(self) -> "BulkWriter":
+        self.connection = self.bind.connect()
+        try:
+            self._apply_pragmas()
+            # With partitioned storage, the rows go to the partitions instead.
+            if not partitions.PARTITIONED_STORAGE:
+                self._prepare_indexes(WeatherRecord.__table__)
+            self.connection.commit()
+        except Exception:
+            self.connection.close()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.connection.rollback()
+            self._pending_station_years = set()
+            if self._dropped_indexes:
+                self._create_indexes()
+            self._restore_pragmas()
+        finally:
+            self.connection.close()
+            self.connection = None
+
+    def write(self, records, on_conflict: str | None = None) -> int:
+        """
+        Inserts `records` in chunks and returns the number of rows actually
+        inserted or updated. `records` is a list of dicts shaped like
+        `process_file`'s, or a `ColumnBatch` from the vectorized parser.
+        `on_conflict` overrides the writer's action for these records.
+        """
+        on_conflict = on_conflict or self.on_conflict
+        if on_conflict not in ON_CONFLICT_ACTIONS:
+            raise ValueError(
+                f"Unknown on_conflict action '{on_conflict}', expected one of {ON_CONFLICT_ACTIONS}")
+        if isinstance(records, list):
+            groups = record_rows(records)
+        else:
+            groups = records.station_year_rows()
+        if not partitions.PARTITIONED_STORAGE:
+            return self._write(WeatherRecord.__table__, groups, on_conflict)
+        written = 0
+        for table, table_groups in partitions.route(self.connection, groups):
+            if table not in self._written_tables:
+                self._written_tables.add(table)
+                self._prepare_indexes(table)
+            self._configure_partition(table.schema)
+            written += self._write(table, table_groups, on_conflict)
+        return written
+
+    def _write(self, table, groups: list[tuple[tuple[str, int], list[tuple]]],
+               on_conflict: str) -> int:
+        sql = self._statements.get((table, on_conflict))
+        if sql is None:
+            sql = self._statements[(table, on_conflict)] = str(
+                _upsert_statement(table, on_conflict).compile(
+                    dialect=self.connection.dialect, column_keys=list(ROW_COLUMNS)))
+        written = 0
+        for station_year, rows in groups:
+            group_written = 0
+            for start in range(0, len(rows), self.chunk_size):
+                result = self.connection.exec_driver_sql(sql, rows[start:start + self.chunk_size])
+                group_written += result.rowcount
+            if group_written:
+                self._pending_station_years.add(station_year)
+            written += group_written
+        return written
+
+    def commit(self):
+        self.connection.commit()
+        self.station_years |= self._pending_station_years
+        self._pending_station_years = set()
+
+    def _pragma(self, name: str):
+        return self.connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+    def _apply_pragmas(self, schema: str = "main"):
+        for name, value in INGEST_PRAGMAS.items():
+            if name == "journal_mode" and partitions.PARTITIONED_STORAGE:
+                continue
+            name = f"{schema}.{name}"
+            self._saved_pragmas[name] = self._pragma(name)
+            self.connection.exec_driver_sql(f"PRAGMA {name} = {value}")
+
+    def _configure_partition(self, schema: str):
+        # SQLite refuses to change the safety level inside a transaction, which
+        # creating a partition opens; its PRAGMAs are then applied on a later write.
+        if (schema in self._configured_partitions
+                or self.connection.connection.dbapi_connection.in_transaction):
+            return
+        self._apply_pragmas(schema)
+        self._configured_partitions.add(schema)
+
+    def _restore_pragmas(self):
+        for name, value in self._saved_pragmas.items():
+            self.connection.exec_driver_sql(f"PRAGMA {name} = {value}")
+        self._saved_pragmas = {}
+
+    def _rebuilds(self, table) -> bool:
+        """Whether to drop the indexes of `table` for the load, by default when it is empty."""
+        if self.rebuild_indexes is not None:
+            return self.rebuild_indexes
+        return self.connection.execute(select(table.c.id).limit(1)).first() is None
+
+    def _prepare_indexes(self, table):
+        if self._rebuilds(table):
+            self._drop_indexes(table)
+            return
+        # A load that died before `__exit__` leaves the table without the
+        # indexes it dropped, and `create_all` never adds indexes to an
+        # existing table.
+        existing = {index["name"] for index in inspect(self.connection).get_indexes(
+            table.name, schema=table.schema)}
+        missing = [index for index in table.indexes if index.name not in existing]
+        for index in missing:
+            index.create(self.connection)
+        if missing:
+            logger.warning(f"Recreated {len(missing)} indexes of {table.fullname} "
+                           f"missing after an interrupted load")
+
+    def _drop_indexes(self, table):
+        # `uix_station_date` is a constraint rather than an index, so it stays in
+        # place and keeps the upsert working while the others are gone.
+        for index in table.indexes:
+            index.drop(self.connection, checkfirst=True)
+            self._dropped_indexes.append(index)
+        logger.info(f"Dropped {len(table.indexes)} indexes of {table.fullname} for bulk load")
+
+    def _create_indexes(self):
+        logger.info(f"Rebuilding {len(self._dropped_indexes)} indexes")
+        for index in self._dropped_indexes:
+            index.create(self.connection, checkfirst=True)
+        self.connection.commit()
+        self._dropped_indexes = []
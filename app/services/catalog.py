@@ -0,0 +1,79 @@
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from app.models import Station, WeatherRecord
+from app.services import partitions
+
+COUNT_COLUMNS = ("record_count", "missing_max_temp", "missing_min_temp", "missing_precip")
+COVERAGE_COLUMNS = ("first_date", "last_date") + COUNT_COLUMNS
+
+
+def coverage_query(records=WeatherRecord.__table__):
+    """
+    Builds the aggregate query computing the `stations` catalog rows from the
+    records. `count(column)` skips nulls, so the difference with `count(*)` is
+    the number of missing values.
+    """
+    record = records.c
+    return (
+        select(
+            record.station_id,
+            func.min(record.date).label("first_date"),
+            func.max(record.date).label("last_date"),
+            func.count().label("record_count"),
+            (func.count() - func.count(record.max_temp)).label("missing_max_temp"),
+            (func.count() - func.count(record.min_temp)).label("missing_min_temp"),
+            (func.count() - func.count(record.precip)).label("missing_precip"),
+        )
+        .group_by(record.station_id)
+    )
+
+
+def catalog_built(connection: Connection) -> bool:
+    """
+    Whether the catalog holds any station. Databases built before the catalog
+    existed and served read-only, where the table is never created, have none.
+    """
+    try:
+        return connection.execute(select(Station.id).limit(1)).first() is not None
+    except OperationalError as e:
+        if "no such table" not in str(e.orig):
+            raise
+        return False
+
+
+def _merge_coverage(first: dict, second: dict) -> dict:
+    """Combines the coverage of one station in two partitions."""
+    return {"station_id": first["station_id"],
+            "first_date": min(first["first_date"], second["first_date"]),
+            "last_date": max(first["last_date"], second["last_date"]),
+            **{column: first[column] + second[column] for column in COUNT_COLUMNS}}
+
+
+def refresh_catalog(connection: Connection, station_ids: set[str] | None = None) -> int:
+    """
+    Recomputes the catalog rows of `station_ids` (default: every station) and
+    upserts them. Each station is aggregated with a range scan of the
+    `uix_station_date` index. With partitioned storage each partition is
+    aggregated on its own, in index order, and the coverages are combined
+    here. The caller commits.
+    """
+    coverage = {}
+    for records in partitions.record_tables(connection):
+        stmt = coverage_query(records)
+        if station_ids is not None:
+            stmt = stmt.where(records.c.station_id.in_(station_ids))
+        for row in connection.execute(stmt):
+            row = row._asdict()
+            previous = coverage.get(row["station_id"])
+            coverage[row["station_id"]] = row if previous is None else _merge_coverage(previous, row)
+    rows = list(coverage.values())
+    if rows:
+        upsert = insert(Station.__table__)
+        upsert = upsert.on_conflict_do_update(
+            index_elements=["station_id"],
+            set_={column: upsert.excluded[column] for column in COVERAGE_COLUMNS},
+        )
+        connection.execute(upsert, rows)
+    return len(rows)
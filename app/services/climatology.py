@@ -0,0 +1,101 @@
+import math
+from datetime import date
+import numpy as np
+from sqlalchemy import String, cast, select
+from sqlalchemy.orm import Session
+from app.services import partitions
+
+# Years whose daily records make up the normals, inclusive.
+BASELINE_START_YEAR = 1985
+BASELINE_END_YEAR = 2014
+VALUE_COLUMNS = ("max_temp", "min_temp", "precip")
+DAYS_PER_YEAR = 366
+# Day-of-year of the day before each month's first day, on a leap-year calendar.
+_MONTH_OFFSETS = np.cumsum([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+# Rows converted to arrays at a time while reading the baseline.
+FETCH_SIZE = 50000
+
+
+def day_of_year(dates: np.ndarray) -> np.ndarray:
+    """
+    Numbers `datetime64[D]` dates 1-366 on a leap-year calendar, so that a given
+    calendar day has the same number in every year.
+    """
+    months = dates.astype("datetime64[M]")
+    month_index = (months - dates.astype("datetime64[Y]")).astype(np.int64)
+    return _MONTH_OFFSETS[month_index] + (dates - months).astype(np.int64) + 1
+
+
+def _null_if_nan(value: float) -> float | None:
+    # NaN marks a column with no value on that day in any baseline year.
+    return None if math.isnan(value) else value
+
+
+def group_normals(keys: np.ndarray, values: np.ndarray):
+    """
+    Aggregates `values` (one row per record, one column per series, NaN where
+    missing) by `keys` in one sorted pass. Returns the distinct keys and, per key,
+    the mean, minimum and maximum of each column (NaN when the column has no
+    value) and the number of rows.
+    """
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    values = values[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    present = ~np.isnan(values)
+    counts = np.add.reduceat(present, starts)
+    sums = np.add.reduceat(np.where(present, values, 0.0), starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+    # fmin/fmax skip NaNs, returning NaN only when a whole group is missing.
+    mins = np.fmin.reduceat(values, starts)
+    maxs = np.fmax.reduceat(values, starts)
+    rows = np.diff(np.r_[starts, len(keys)])
+    return keys[starts], means, mins, maxs, rows
+
+
+def compute_climatology(session: Session, station_ids: set[str] | None = None) -> list[dict]:
+    """
+    Computes the day-of-year normals of the given stations (default: all) from
+    their baseline records, returned as `weather_climatology` rows.
+
+    The baseline is read once, in chunks converted straight to NumPy arrays;
+    every (station, day) group is then aggregated in a single vectorised pass.
+    """
+    start, end = date(BASELINE_START_YEAR, 1, 1), date(BASELINE_END_YEAR, 12, 31)
+    records = partitions.records_source(session.connection(), start, end)
+    stmt = select(records.c.station_id, cast(records.c.date, String),
+                  *(records.c[column] for column in VALUE_COLUMNS)).where(
+        records.c.date >= start, records.c.date <= end)
+    if station_ids is not None:
+        stmt = stmt.where(records.c.station_id.in_(station_ids))
+
+    codes = {}
+    key_chunks, value_chunks = [], []
+    # Executed on the session's connection: plain Core rows skip the ORM's row
+    # processing, which would otherwise dominate the run.
+    result = session.connection().execution_options(yield_per=FETCH_SIZE).execute(stmt)
+    for rows in result.partitions():
+        stations, dates, *values = zip(*rows)
+        station_codes = np.fromiter((codes.setdefault(s, len(codes)) for s in stations),
+                                    np.int64, len(stations))
+        days = day_of_year(np.array(dates, dtype="datetime64[D]"))
+        key_chunks.append(station_codes * DAYS_PER_YEAR + days - 1)
+        value_chunks.append(np.array(values, dtype=np.float64).T)
+    if not key_chunks:
+        return []
+
+    keys, means, mins, maxs, rows = group_normals(
+        np.concatenate(key_chunks), np.concatenate(value_chunks))
+    station_names = list(codes)
+    normals = []
+    for key, mean, low, high, count in zip(
+            keys.tolist(), means.tolist(), mins.tolist(), maxs.tolist(), rows.tolist()):
+        normal = {"station_id": station_names[key // DAYS_PER_YEAR],
+                  "day_of_year": key % DAYS_PER_YEAR + 1, "years": count}
+        for j, column in enumerate(VALUE_COLUMNS):
+            normal[f"{column}_mean"] = _null_if_nan(mean[j])
+            normal[f"{column}_min"] = _null_if_nan(low[j])
+            normal[f"{column}_max"] = _null_if_nan(high[j])
+        normals.append(normal)
+    return normals
@@ -0,0 +1,274 @@
+import os
+import time
+import shutil
+import logging
+import threading
+from datetime import date
+from typing import NamedTuple
+import numpy as np
+from sqlalchemy import String, cast, select
+from sqlalchemy.engine import Engine
+from app.core.generation import RECORDS_GENERATION_ROW_ID, current_generation
+from app.services import partitions
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: serve single-station `/weather` queries from the columnar store.
+COLUMNAR_READS_ENABLED = os.environ.get("COLUMNAR_READS", "false").lower() in ("1", "true", "yes")
+COLUMNAR_DIR = os.environ.get("COLUMNAR_DIR", "./columnar")
+
+# File in the store's root naming the build readers should use.
+CURRENT_FILE = "CURRENT"
+# File in each build holding the records generation it was built from.
+GENERATION_FILE = "GENERATION"
+VALUE_COLUMNS = ("max_temp", "min_temp", "precip")
+# One .npy file per column in each station's directory.
+ARRAY_FILES = ("ids", "dates", "values", "nulls")
+
+
+class StationSeries(NamedTuple):
+    """
+    The records of one station, sorted by date. Arrays loaded from the store are
+    read-only memory maps.
+    """
+    ids: np.ndarray  # int64
+    dates: np.ndarray  # datetime64[D]
+    values: np.ndarray  # float64, one column per VALUE_COLUMNS entry, 0 where null
+    nulls: np.ndarray  # bool, True where the value is null
+
+
+EMPTY_SERIES = StationSeries(np.empty(0, np.int64), np.empty(0, "datetime64[D]"),
+                             np.empty((0, len(VALUE_COLUMNS))),
+                             np.empty((0, len(VALUE_COLUMNS)), bool))
+
+
+def _station_dir(build_dir: str, station_id: str) -> str:
+    if not station_id or os.sep in station_id or station_id.startswith("."):
+        raise ValueError(f"Unsupported station ID for the columnar store: {station_id!r}")
+    return os.path.join(build_dir, station_id)
+
+
+def _read_current(root: str) -> str | None:
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _read_generation(build_dir: str) -> int | None:
+    try:
+        with open(os.path.join(build_dir, GENERATION_FILE)) as f:
+            return int(f.read())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _load_series(connection, records, station_id: str) -> StationSeries:
+    # Dates are fetched as their stored ISO strings, which NumPy parses far
+    # faster than it converts `datetime.date` objects.
+    rows = connection.execute(
+        select(records.c.id, cast(records.c.date, String),
+               *(records.c[column] for column in VALUE_COLUMNS))
+        .where(records.c.station_id == station_id)
+        .order_by(records.c.date)
+    ).all()
+    if not rows:
+        return EMPTY_SERIES
+    # Transposing the rows first lets NumPy convert whole columns at once.
+    ids, dates, *values = zip(*rows)
+    raw = np.array(values, dtype=np.float64).T
+    nulls = np.isnan(raw)
+    return StationSeries(np.array(ids, dtype=np.int64), np.array(dates, dtype="datetime64[D]"),
+                         np.where(nulls, 0.0, raw), nulls)
+
+
+def _write_series(station_dir: str, series: StationSeries):
+    os.makedirs(station_dir)
+    for name, array in zip(ARRAY_FILES, series):
+        np.save(os.path.join(station_dir, f"{name}.npy"), array)
+
+
+def _link_station(source: str, target: str):
+    """Reuses an unchanged station's files from the previous build."""
+    os.makedirs(target)
+    for name in ARRAY_FILES:
+        file_name = f"{name}.npy"
+        try:
+            os.link(os.path.join(source, file_name), os.path.join(target, file_name))
+        except OSError:
+            shutil.copy2(os.path.join(source, file_name), os.path.join(target, file_name))
+
+
+def store_generation(root: str | None = None) -> int | None:
+    """
+    The records generation the current build of the store under `root`
+    (default `COLUMNAR_DIR`) was made from, or None without a build.
+    """
+    root = root or COLUMNAR_DIR
+    build = _read_current(root)
+    return _read_generation(os.path.join(root, build)) if build else None
+
+
+def build_store(bind: Engine, root: str | None = None,
+                station_ids: set[str] | None = None) -> str:
+    """
+    Materialises the records of every station into a new build of the columnar
+    store under `root` (default `COLUMNAR_DIR`), then points `CURRENT` at it.
+    Returns the build's name.
+
+    Builds are immutable: readers keep using the memory maps of the build they
+    opened while a new one is written, and pick the new one up on their next
+    request. With `station_ids`, only those stations are re-read from the
+    database and the others are hard-linked from the current build.
+
+    Each build is stamped with the records generation it was read at, so that
+    readers can tell when ingestion has changed the records since.
+    """
+    started = time.perf_counter()
+    root = root or COLUMNAR_DIR
+    os.makedirs(root, exist_ok=True)
+    previous = _read_current(root)
+    previous_dir = os.path.join(root, previous) if previous else None
+    if previous_dir is None or not os.path.isdir(previous_dir):
+        station_ids = None
+
+    build = f"build-{time.time_ns()}"
+    build_dir = os.path.join(root, build)
+    os.makedirs(build_dir)
+    rebuilt = 0
+    with bind.connect() as connection:
+        # Read first: records ingested while the build runs make it stale, not current.
+        generation, _ = current_generation(connection, RECORDS_GENERATION_ROW_ID)
+        records = partitions.records_source(connection)
+        all_station_ids = connection.scalars(
+            select(records.c.station_id).distinct()).all()
+        for station_id in all_station_ids:
+            target = _station_dir(build_dir, station_id)
+            source = os.path.join(previous_dir, station_id) if previous_dir else None
+            if station_ids is not None and station_id not in station_ids and os.path.isdir(source):
+                _link_station(source, target)
+            else:
+                _write_series(target, _load_series(connection, records, station_id))
+                rebuilt += 1
+    with open(os.path.join(build_dir, GENERATION_FILE), "w") as f:
+        f.write(str(generation))
+
+    # Atomically switch readers over to the new build, then drop the older ones.
+    # Readers still mapping their files keep them alive until they let go.
+    pointer = os.path.join(root, f"{CURRENT_FILE}.tmp")
+    with open(pointer, "w") as f:
+        f.write(build)
+    os.replace(pointer, os.path.join(root, CURRENT_FILE))
+    for entry in os.listdir(root):
+        if entry.startswith("build-") and entry != build:
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+
+    logger.info(f"Columnar store {build}: {rebuilt} of {len(all_station_ids)} stations "
+                f"rebuilt in {time.perf_counter() - started:.2f}s")
+    return build
+
+
+class ColumnarStore:
+    """
+    Reads station series from the current build of a columnar store, memory
+    mapping each station's arrays on first use. Range queries are answered with
+    a binary search on the dates and slices of the maps, without copying rows.
+
+    The store only answers for the records generation its build was made from:
+    once ingestion has changed the records, reads fall back to SQL until the
+    store is rebuilt.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        self._pointer_mtime = None
+        self._build = None
+        self._generation = None
+        self._stations = {}
+
+    def _current_build(self, records_generation: int) -> str | None:
+        try:
+            mtime = os.stat(os.path.join(self.root, CURRENT_FILE)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            if mtime != self._pointer_mtime:
+                self._pointer_mtime = mtime
+                self._build = _read_current(self.root)
+                self._generation = self._build and _read_generation(
+                    os.path.join(self.root, self._build))
+                self._stations = {}
+            if self._generation != records_generation:
+                return None
+            return self._build
+
+    def station(self, station_id: str, records_generation: int) -> StationSeries | None:
+        """
+        Returns the station's series, or None when the build is missing, was
+        made from another records generation, has no such station (one ingested
+        since, or unknown to the database too) or the ID cannot be stored.
+        """
+        build = self._current_build(records_generation)
+        if build is None:
+            return None
+        with self._lock:
+            series = self._stations.get(station_id)
+        if series is not None:
+            return series
+        try:
+            station_dir = _station_dir(os.path.join(self.root, build), station_id)
+        except ValueError:
+            return None
+        if not os.path.isdir(station_dir):
+            return None
+        series = StationSeries(*(
+            np.load(os.path.join(station_dir, f"{name}.npy"), mmap_mode="r")
+            for name in ARRAY_FILES))
+        with self._lock:
+            self._stations[station_id] = series
+        return series
+
+    def read_records(self, station_id: str, start_date: date | None, end_date: date | None,
+                     after_date: date | None, skip: int, limit: int,
+                     records_generation: int) -> list[dict] | None:
+        """
+        Returns the station's records within [start_date, end_date] and after
+        `after_date`, paginated by `skip` and `limit`, shaped like the
+        `WeatherRecord` schema. Returns None when the store cannot answer for
+        the database's `records_generation`.
+        """
+        series = self.station(station_id, records_generation)
+        if series is None:
+            return None
+        lo = 0
+        hi = len(series.dates)
+        if start_date:
+            lo = max(lo, int(np.searchsorted(series.dates, np.datetime64(start_date, "D"), "left")))
+        if after_date:
+            lo = max(lo, int(np.searchsorted(series.dates, np.datetime64(after_date, "D"), "right")))
+        if end_date:
+            hi = int(np.searchsorted(series.dates, np.datetime64(end_date, "D"), "right"))
+        lo += skip
+        hi = max(lo, min(hi, lo + limit))
+
+        values = series.values[lo:hi].tolist()
+        nulls = series.nulls[lo:hi].tolist()
+        return [
+            {
+                "station_id": station_id,
+                "date": day,
+                "max_temp": None if null[0] else value[0],
+                "min_temp": None if null[1] else value[1],
+                "precip": None if null[2] else value[2],
+                "id": record_id,
+            }
+            for record_id, day, value, null in zip(
+                series.ids[lo:hi].tolist(),
+                np.datetime_as_string(series.dates[lo:hi]).tolist(),
+                values, nulls)
+        ]
+
+
+columnar_store = ColumnarStore(COLUMNAR_DIR) if COLUMNAR_READS_ENABLED else None
@@ -0,0 +1,62 @@
+import numpy as np
+
+
+def _normalize(values: np.ndarray) -> np.ndarray:
+    """
+    Scales each column to [0, 1], so that series in different units weigh the
+    same, and fills missing values with the column's mean.
+    """
+    scaled = np.zeros_like(values, dtype=np.float64)
+    for j, column in enumerate(values.T):
+        present = column[~np.isnan(column)]
+        if present.size == 0:
+            continue
+        span = np.ptp(present) or 1.0
+        filled = np.where(np.isnan(column), present.mean(), column)
+        scaled[:, j] = (filled - present.min()) / span
+    return scaled
+
+
+def lttb_indices(x: np.ndarray, values: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling: returns the sorted indices of at
+    most `max_points` points that preserve the visual shape of the series.
+
+    `x` holds the sorted x coordinates and `values` one column per series. The
+    first and last points are always kept; every other bucket keeps the point
+    forming the largest triangle with the previously kept point and the average
+    of the next bucket, summed over the (normalized) series so that peaks in any
+    of them survive.
+    """
+    if max_points < 3:
+        raise ValueError("max_points must be at least 3")
+    n = len(x)
+    if max_points >= n:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = _normalize(np.asarray(values, dtype=np.float64).reshape(n, -1))
+    # The points between the first and the last are split into `max_points - 2`
+    # contiguous buckets, bucket k spanning [edges[k], edges[k + 1]).
+    n_buckets = max_points - 2
+    edges = 1 + np.arange(n_buckets + 1) * (n - 2) // n_buckets
+    counts = np.diff(edges)
+    # The average point of the bucket following each bucket; the last bucket is
+    # followed by the last point.
+    next_x = np.append((np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts)[1:], x[-1])
+    next_y = np.vstack([(np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts[:, None])[1:],
+                        y[-1:]])
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for k in range(n_buckets):
+        lo, hi = edges[k], edges[k + 1]
+        # Twice the triangle areas; the constant factor does not change the argmax.
+        areas = np.abs(
+            (x[previous] - next_x[k]) * (y[lo:hi] - y[previous])
+            - (x[previous] - x[lo:hi])[:, None] * (next_y[k] - y[previous])
+        ).sum(axis=1)
+        previous = lo + int(np.argmax(areas))
+        selected[k + 1] = previous
+    return selected
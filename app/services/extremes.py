@@ -0,0 +1,62 @@
+from itertools import groupby
+import numpy as np
+
+HEAT_DAY_MAX_TEMP = 30.0  # Degrees Celsius, inclusive
+FROST_DAY_MIN_TEMP = 0.0  # Degrees Celsius, exclusive
+DRY_DAY_PRECIP = 1.0  # mm, exclusive
+PERCENTILES = (10, 50, 90)
+
+
+def _percentiles(values: np.ndarray) -> list[float | None]:
+    present = values[~np.isnan(values)]
+    if present.size == 0:
+        return [None] * len(PERCENTILES)
+    return np.percentile(present, PERCENTILES).tolist()
+
+
+def _count(values: np.ndarray, condition: np.ndarray) -> int | None:
+    """Counts the days matching `condition`, or None when no day has a value."""
+    if np.isnan(values).all():
+        return None
+    return int(condition.sum())
+
+
+def longest_dry_spell(dates: np.ndarray, precip: np.ndarray) -> int | None:
+    """
+    Length of the longest run of consecutive days with less than `DRY_DAY_PRECIP`
+    of precipitation. A missing day or value ends a run, as it might have been wet.
+    """
+    if np.isnan(precip).all():
+        return None
+    dry = precip < DRY_DAY_PRECIP
+    continues = np.r_[False, dry[1:] & dry[:-1] & (np.diff(dates).astype(np.int64) == 1)]
+    runs = np.cumsum(~continues)[dry]
+    return int(np.bincount(runs).max()) if runs.size else 0
+
+
+def year_extremes(dates: np.ndarray, max_temp: np.ndarray, min_temp: np.ndarray,
+                  precip: np.ndarray) -> dict:
+    """Computes the extremes of one station-year from its date-ordered daily values."""
+    extremes = {
+        "heat_days": _count(max_temp, max_temp >= HEAT_DAY_MAX_TEMP),
+        "frost_days": _count(min_temp, min_temp < FROST_DAY_MIN_TEMP),
+        "longest_dry_spell": longest_dry_spell(dates, precip),
+    }
+    for column, values in (("max_temp", max_temp), ("min_temp", min_temp)):
+        for percentile, value in zip(PERCENTILES, _percentiles(values)):
+            extremes[f"{column}_p{percentile}"] = value
+    return extremes
+
+
+def station_year_extremes(rows):
+    """
+    Consumes (station_id, ISO date, max_temp, min_temp, precip) rows ordered by
+    station and date, e.g. straight from a streaming cursor, and yields the
+    `weather_stats_extremes` row of each station-year as soon as it is complete.
+    Only one station-year is held in memory at a time.
+    """
+    for (station_id, year), group in groupby(rows, key=lambda row: (row[0], row[1][:4])):
+        _, dates, *values = zip(*group)
+        max_temp, min_temp, precip = np.array(values, dtype=np.float64)
+        yield {"station_id": station_id, "year": int(year),
+               **year_extremes(np.array(dates, dtype="datetime64[D]"), max_temp, min_temp, precip)}
@@ -0,0 +1,128 @@
+import os
+import hashlib
+from datetime import datetime
+from typing import NamedTuple
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Connection
+from app.models import IngestManifest
+from app.services import sources
+
+# Read size used while hashing files.
+HASH_CHUNK_SIZE = 1024 * 1024
+
+SKIP = "skip"
+APPEND = "append"
+FULL = "full"
+
+
+class FilePlan(NamedTuple):
+    """
+    What ingestion has to do with one file, and the manifest state to record once
+    the file's rows are committed.
+    """
+    file_path: str
+    file_name: str
+    action: str  # SKIP, APPEND or FULL
+    offset: int  # Byte offset to start parsing from
+    size: int
+    mtime: float
+    content_hash: str  # SHA-256 of the first `end` bytes
+    # Byte offset just past the last complete line, where the next run resumes.
+    # A last line without its newline may still be being written.
+    end: int
+    # Whether parsing starts at a last line that was incomplete on the previous
+    # run, whose rows may have been stored from a truncated line.
+    rereads_partial_line: bool = False
+
+
+def load_manifest(connection: Connection) -> dict:
+    """Returns the manifest rows keyed by file name."""
+    return {entry.file_name: entry
+            for entry in connection.execute(select(IngestManifest.__table__))}
+
+
+def plan_file(file_path: str, data_dir: str, entry=None) -> FilePlan:
+    """
+    Compares a file with its manifest entry and decides how to ingest it.
+
+    - Same size and mtime: skipped without reading the file.
+    - Content up to the stored offset unchanged: only the bytes after the offset
+      are parsed (or nothing, if no line was completed since).
+    - Anything else, or no entry at all: the whole file is re-read.
+
+    The stored offset is the end of the last complete line rather than of the
+    file, so that a line still being appended is read again once finished.
+    The file is read once, hashing the previously ingested prefix and the
+    content up to its last newline in the same pass. Compressed files and
+    archives are hashed as stored and are never appended to: any change
+    re-reads them.
+    """
+    file_name = os.path.relpath(file_path, data_dir)
+    stat = os.stat(file_path)
+    if entry is not None and entry.size == stat.st_size and entry.mtime == stat.st_mtime:
+        return FilePlan(file_path, file_name, SKIP, entry.byte_offset, entry.size,
+                        entry.mtime, entry.content_hash, entry.byte_offset)
+
+    appendable = sources.is_plain(file_path)
+    prefix_size = entry.byte_offset if entry is not None and appendable else 0
+    digest = hashlib.sha256()
+    prefix_hash = None
+    size = 0
+    # Hash of the content up to the last newline seen, and where that is.
+    lines_hash, end = digest.hexdigest(), 0
+    with open(file_path, 'rb') as f:
+        if 0 < prefix_size <= stat.st_size:
+            prefix = f.read(prefix_size)
+            digest.update(prefix)
+            size = len(prefix)
+            prefix_hash = lines_hash = digest.hexdigest()
+            end = size
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            newline = chunk.rfind(b"\n")
+            if newline >= 0:
+                lines = digest.copy()
+                lines.update(chunk[:newline + 1])
+                lines_hash, end = lines.hexdigest(), size + newline + 1
+            digest.update(chunk)
+            size += len(chunk)
+    content_hash = digest.hexdigest()
+    if not appendable or end == size:
+        lines_hash, end = content_hash, size
+
+    if entry is not None and not appendable and content_hash == entry.content_hash:
+        return FilePlan(file_path, file_name, SKIP, entry.byte_offset, size,
+                        stat.st_mtime, content_hash, size)
+    if entry is not None and prefix_hash == entry.content_hash:
+        action = SKIP if end == entry.byte_offset else APPEND
+        return FilePlan(file_path, file_name, action, entry.byte_offset, size,
+                        stat.st_mtime, lines_hash, end,
+                        rereads_partial_line=entry.size > entry.byte_offset)
+    return FilePlan(file_path, file_name, FULL, 0, size, stat.st_mtime, lines_hash, end)
+
+
+def record_files(connection: Connection, plans: list[FilePlan]):
+    """
+    Upserts the state of successfully ingested files into the manifest. The
+    caller commits, ideally in the same transaction as the files' rows.
+    """
+    if not plans:
+        return
+    stmt = insert(IngestManifest.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["file_name"],
+        set_={column: stmt.excluded[column] for column in (
+            "size", "mtime", "content_hash", "byte_offset", "ingested_at")},
+    )
+    now = datetime.now()
+    connection.execute(stmt, [
+        {
+            "file_name": plan.file_name,
+            "size": plan.size,
+            "mtime": plan.mtime,
+            "content_hash": plan.content_hash,
+            "byte_offset": plan.end,
+            "ingested_at": now,
+        }
+        for plan in plans
+    ])
@@ -0,0 +1,261 @@
+import os
+import logging
+import argparse
+from datetime import date
+from functools import lru_cache
+from urllib.parse import quote
+from sqlalchemy import (
+    Column, Index, MetaData, Table, UniqueConstraint, delete, func, inspect, select, union_all, update,
+)
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
+from app.models import RecordPartition, WeatherRecord
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: keep the records in one SQLite file per span of years instead of the
+# main database's `weather_records` table.
+PARTITIONED_STORAGE = os.environ.get("PARTITIONED_STORAGE", "false").lower() in ("1", "true", "yes")
+PARTITION_DIR = os.environ.get("PARTITION_DIR", "./partitions")
+# Years per partition. Partitions start on multiples of it (1980, 1990, ...
+# for decades); it must not change once partitions exist.
+PARTITION_YEARS = int(os.environ.get("PARTITION_YEARS", "10"))
+# A partition's ids start at its first year times this, so that record ids stay
+# unique across partitions.
+ID_BLOCK = 10 ** 9
+# Key of the attached partitions in a connection's `info`, which lives as long
+# as the pooled DBAPI connection.
+ATTACHED_KEY = "attached_partitions"
+
+
+def partition_start(year: int) -> int:
+    """First year of the partition holding `year`."""
+    return year - year % PARTITION_YEARS
+
+
+def schema_name(first_year: int) -> str:
+    """Name the partition starting in `first_year` is attached under."""
+    return f"records_{first_year}"
+
+
+@lru_cache(maxsize=None)
+def records_table(first_year: int) -> Table:
+    """
+    The `weather_records` table of a partition. Only the `uix_station_date`
+    constraint and the date index are kept: the single-column station and id
+    indexes of the main table duplicate the constraint and the primary key.
+    """
+    columns = [Column(column.key, column.type, primary_key=column.primary_key,
+                      nullable=column.nullable)
+               for column in WeatherRecord.__table__.columns]
+    return Table(
+        WeatherRecord.__tablename__, MetaData(), *columns,
+        UniqueConstraint("station_id", "date", name="uix_station_date"),
+        Index("ix_weather_records_date", "date"),
+        schema=schema_name(first_year),
+        # Lets the id sequence be seeded with the partition's id block.
+        sqlite_autoincrement=True,
+    )
+
+
+def _partitions(connection: Connection, first_year: int | None = None,
+                last_year: int | None = None) -> list:
+    """Registry rows of the partitions overlapping [first_year, last_year], by year."""
+    # Plain SQL: the registry is read by every request, and compiling a
+    # statement would cost several times the query itself.
+    rows = connection.exec_driver_sql(
+        f"SELECT first_year, last_year, file_name, frozen FROM {RecordPartition.__tablename__} "
+        "ORDER BY first_year").all()
+    return [row for row in rows
+            if (first_year is None or row.last_year >= first_year)
+            and (last_year is None or row.first_year <= last_year)]
+
+
+def _attach(connection: Connection, partition) -> Table:
+    """
+    Attaches a partition's file to `connection` unless it already is, and
+    returns its table. Frozen partitions are opened read-only.
+    """
+    schema = schema_name(partition.first_year)
+    path = os.path.abspath(os.path.join(PARTITION_DIR, partition.file_name))
+    frozen = bool(partition.frozen)
+    attached = connection.info.setdefault(ATTACHED_KEY, {})
+    if attached.get(schema) != (path, frozen):
+        if schema in attached:
+            connection.exec_driver_sql(f"DETACH DATABASE {schema}")
+            del attached[schema]
+        target = f"file:{quote(path)}?mode=ro" if frozen else path
+        try:
+            connection.exec_driver_sql(f"ATTACH DATABASE ? AS {schema}", (target,))
+        except OperationalError as e:
+            if "too many attached databases" in str(e.orig):
+                raise RuntimeError(
+                    f"Cannot attach partition {schema}: SQLite attaches at most 10 databases "
+                    f"per connection by default. Use a larger PARTITION_YEARS.") from e
+            raise
+        attached[schema] = (path, frozen)
+    return records_table(partition.first_year)
+
+
+def record_tables(connection: Connection, first_year: int | None = None,
+                  last_year: int | None = None) -> list[Table]:
+    """
+    The tables holding the records of [first_year, last_year] (default: all),
+    attached to `connection`. Without partitioned storage, that is always the
+    main `weather_records` table.
+    """
+    if not PARTITIONED_STORAGE:
+        return [WeatherRecord.__table__]
+    return [_attach(connection, partition)
+            for partition in _partitions(connection, first_year, last_year)]
+
+
+def records_source(connection: Connection, start_date: date | None = None,
+                   end_date: date | None = None):
+    """
+    Returns the selectable to read the records between `start_date` and
+    `end_date` from, with the columns of `weather_records`: the main table,
+    a single partition, or the `UNION ALL` of the partitions the range
+    overlaps. Partitions outside the range are pruned.
+
+    SQLite flattens the union into the outer query, pushing its conditions
+    into every branch and merging the branches' index order for an `ORDER BY`
+    on (station_id, date), so statements read it like a table.
+    """
+    tables = record_tables(connection, start_date.year if start_date else None,
+                           end_date.year if end_date else None)
+    if not tables:
+        # No partition holds the range; the main table is empty once partitioned.
+        return WeatherRecord.__table__
+    if len(tables) == 1:
+        return tables[0]
+    return union_all(*(select(*table.c) for table in tables)).subquery(WeatherRecord.__tablename__)
+
+
+def attach_partitions(connection: Connection):
+    """Attaches every partition to `connection`, for statements built on another one."""
+    record_tables(connection)
+
+
+def ensure_partition(connection: Connection, first_year: int) -> Table:
+    """
+    Returns the attached table of the partition starting in `first_year`,
+    creating its file, table and registry entry first if needed. Raises if the
+    partition is frozen.
+    """
+    partition = connection.execute(
+        select(RecordPartition).where(RecordPartition.first_year == first_year)).first()
+    if partition is None:
+        os.makedirs(PARTITION_DIR, exist_ok=True)
+        connection.execute(insert(RecordPartition).values(
+            first_year=first_year, last_year=first_year + PARTITION_YEARS - 1,
+            file_name=f"weather_records_{first_year}.db", frozen=False,
+        ).on_conflict_do_nothing(index_elements=["first_year"]))
+        partition = connection.execute(
+            select(RecordPartition).where(RecordPartition.first_year == first_year)).one()
+    if partition.frozen:
+        raise RuntimeError(f"Partition {partition.first_year}-{partition.last_year} is frozen")
+    if partition.last_year != first_year + PARTITION_YEARS - 1:
+        raise ValueError(f"Partition {partition.first_year}-{partition.last_year} does not "
+                         f"span PARTITION_YEARS={PARTITION_YEARS} years")
+
+    table = _attach(connection, partition)
+    if not inspect(connection).has_table(table.name, schema=table.schema):
+        table.create(connection)
+        connection.exec_driver_sql(
+            f"INSERT INTO {table.schema}.sqlite_sequence (name, seq) VALUES (?, ?)",
+            (table.name, first_year * ID_BLOCK))
+        logger.info(f"Created partition {table.schema} for {first_year}-{partition.last_year}")
+    return table
+
+
+def route(connection: Connection, groups: list[tuple[tuple[str, int], list]]) -> list[tuple[Table, list]]:
+    """
+    Splits `BulkWriter` row groups, keyed by (station_id, year), by partition,
+    returning each partition's table and groups.
+    """
+    by_partition = {}
+    for group in groups:
+        (_, year), _ = group
+        by_partition.setdefault(partition_start(year), []).append(group)
+    return [(ensure_partition(connection, first_year), partition_groups)
+            for first_year, partition_groups in sorted(by_partition.items())]
+
+
+def partition_existing_records(bind: Engine) -> int:
+    """
+    Moves the records of the main `weather_records` table into their
+    partitions, one partition per transaction, and returns how many were moved.
+    Ids are kept, so existing rows keep their identity.
+    """
+    main = WeatherRecord.__table__
+    moved = 0
+    with bind.connect() as connection:
+        first, last = connection.execute(select(func.min(main.c.date), func.max(main.c.date))).one()
+        if first is None:
+            return 0
+        for first_year in range(partition_start(first.year), last.year + 1, PARTITION_YEARS):
+            table = ensure_partition(connection, first_year)
+            in_range = (main.c.date >= date(first_year, 1, 1),
+                        main.c.date < date(first_year + PARTITION_YEARS, 1, 1))
+            connection.execute(table.insert().prefix_with("OR IGNORE").from_select(
+                [column.name for column in main.c], select(*main.c).where(*in_range)))
+            moved += connection.execute(delete(main).where(*in_range)).rowcount
+            connection.commit()
+            logger.info(f"Moved records of {first_year}-{first_year + PARTITION_YEARS - 1} "
+                        f"to {table.schema} ({moved} so far)")
+    return moved
+
+
+def compact_partition(bind: Engine, first_year: int):
+    """Rebuilds one partition's file with `VACUUM`, leaving the others alone."""
+    with bind.connect() as connection:
+        partition = connection.execute(
+            select(RecordPartition).where(RecordPartition.first_year == first_year)).one()
+        if partition.frozen:
+            raise RuntimeError(f"Partition {first_year}-{partition.last_year} is frozen")
+        table = _attach(connection, partition)
+        connection.exec_driver_sql(f"VACUUM {table.schema}")
+
+
+def set_frozen(bind: Engine, first_year: int, frozen: bool):
+    """
+    Freezes a partition, compacting it first, or thaws it. Connections attach
+    frozen partitions read-only from then on and ingestion refuses their years.
+    """
+    if frozen:
+        compact_partition(bind, first_year)
+    with bind.begin() as connection:
+        connection.execute(update(RecordPartition).where(RecordPartition.first_year == first_year)
+                           .values(frozen=frozen))
+
+
+def main():
+    from app.core.database import Base, engine
+
+    parser = argparse.ArgumentParser(description="Manage the partitions of the weather records.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List the partitions")
+    commands.add_parser("migrate", help="Move the main table's records into partitions")
+    for command in ("compact", "freeze", "thaw"):
+        commands.add_parser(command, help=f"{command.capitalize()} one partition").add_argument(
+            "first_year", type=int, help="First year of the partition")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    if args.command == "list":
+        with engine.connect() as connection:
+            for partition in _partitions(connection):
+                state = "frozen" if partition.frozen else "writable"
+                print(f"{partition.first_year}-{partition.last_year}\t{partition.file_name}\t{state}")
+    elif args.command == "migrate":
+        print(f"Moved {partition_existing_records(engine)} records")
+    elif args.command == "compact":
+        compact_partition(engine, args.first_year)
+    else:
+        set_frozen(engine, args.first_year, args.command == "freeze")
+
+
+if __name__ == "__main__":
+    main()
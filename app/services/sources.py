@@ -0,0 +1,134 @@
+import io
+import os
+import glob
+import gzip
+import logging
+import tarfile
+from typing import BinaryIO, NamedTuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Separates an archive's path from the name of one of its members.
+MEMBER_SEPARATOR = "::"
+STATION_SUFFIX = ".txt"
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+ARCHIVE_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.zst")
+# Source patterns ingestion picks up from the data directory.
+SOURCE_PATTERNS = ("*.txt", "*.txt.gz", "*.txt.zst") + tuple(f"*{suffix}" for suffix in ARCHIVE_SUFFIXES)
+
+
+class ParseTask(NamedTuple):
+    """
+    One station file to parse. Archive members carry their decompressed
+    `content`; other sources are opened by the worker from `source`.
+    """
+    source: str  # File path, or "<archive path>::<member name>"
+    offset: int
+    content: bytes | None
+    last: bool  # Whether this is the last task of its file's plan
+
+
+def is_archive(path: str) -> bool:
+    return path.endswith(ARCHIVE_SUFFIXES)
+
+
+def is_plain(path: str) -> bool:
+    """Whether `path` is an uncompressed station file, the only kind read from an offset."""
+    return path.endswith(STATION_SUFFIX) and MEMBER_SEPARATOR not in path
+
+
+def station_id(source: str) -> str:
+    """Takes the station ID from the file or member name, e.g. `x.tgz::d/USC001.txt.gz`."""
+    name = os.path.basename(source.rsplit(MEMBER_SEPARATOR, 1)[-1])
+    for suffix in COMPRESSED_SUFFIXES:
+        name = name.removesuffix(suffix)
+    return name.removesuffix(STATION_SUFFIX)
+
+
+def _requires_zstandard(path: str):
+    if zstandard is None:
+        raise RuntimeError(f"Reading {path} requires the optional `zstandard` package")
+
+
+def _decompress(raw: BinaryIO, name: str) -> BinaryIO:
+    """Wraps `raw` in a streaming decompressor chosen by `name`'s suffix."""
+    if name.endswith((".gz", ".tgz")):
+        return gzip.GzipFile(fileobj=raw)
+    if name.endswith(".zst"):
+        _requires_zstandard(name)
+        return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+    return raw
+
+
+def discover(data_dir: str) -> list[str]:
+    """
+    Lists the station files, compressed station files and archives in `data_dir`.
+    Zstandard sources are skipped with a warning when `zstandard` is not installed.
+    """
+    paths = sorted({path for pattern in SOURCE_PATTERNS
+                    for path in glob.glob(os.path.join(data_dir, pattern))})
+    if zstandard is None:
+        skipped = [path for path in paths if path.endswith(".zst")]
+        if skipped:
+            logger.warning(f"Skipping {len(skipped)} .zst file(s): `zstandard` is not installed")
+        paths = [path for path in paths if not path.endswith(".zst")]
+    return paths
+
+
+def open_source(source: str, offset: int = 0, content: bytes | None = None) -> BinaryIO:
+    """
+    Opens a station file as a binary stream of its decompressed content, or
+    wraps the `content` already read from an archive member. Only plain files
+    can be opened at a non-zero `offset`.
+    """
+    if content is not None:
+        return io.BytesIO(content)
+    if offset and not is_plain(source):
+        raise ValueError(f"Cannot seek into compressed source {source}")
+    f = _decompress(open(source, 'rb'), source)
+    if offset:
+        f.seek(offset)
+    return f
+
+
+def iter_members(archive_path: str):
+    """
+    Yields the (source, content) of each station file in a tar archive, reading
+    the archive as a single forward stream: a compressed tarball is decompressed
+    exactly once and nothing is extracted to disk. Members that are themselves
+    compressed are decompressed here too.
+    """
+    with _decompress(open(archive_path, 'rb'), archive_path) as stream, \
+            tarfile.open(fileobj=stream, mode="r|") as archive:
+        for member in archive:
+            name = os.path.basename(member.name)
+            if not member.isfile() or not name.endswith(
+                    (STATION_SUFFIX,) + tuple(STATION_SUFFIX + s for s in COMPRESSED_SUFFIXES)):
+                continue
+            with _decompress(archive.extractfile(member), name) as f:
+                yield f"{archive_path}{MEMBER_SEPARATOR}{member.name}", f.read()
+
+
+def parse_tasks(plans):
+    """
+    Expands file plans into parse tasks, in order. A plain or compressed file is
+    one task; an archive is one task per station member, streamed lazily so that
+    only the members being parsed are held in memory. The last task of each
+    plan is flagged, so the plan can be recorded once all of its rows are written.
+    """
+    for plan in plans:
+        if not is_archive(plan.file_path):
+            yield plan, ParseTask(plan.file_path, plan.offset, None, True)
+            continue
+        previous = None
+        for source, content in iter_members(plan.file_path):
+            if previous is not None:
+                yield plan, previous
+            previous = ParseTask(source, 0, content, False)
+        # An archive without station files still yields a task, recording its plan.
+        yield plan, (previous or ParseTask(plan.file_path, 0, b"", False))._replace(last=True)
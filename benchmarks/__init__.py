@@ -0,0 +1,3 @@
+"""
+Reproducible performance benchmarks for ingestion, analysis and the API.
+"""
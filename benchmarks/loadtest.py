@@ -0,0 +1,306 @@
+import sys
+import json
+import time
+import random
+import logging
+import asyncio
+import argparse
+import platform
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import httpx
+
+from benchmarks.run import DEFAULT_TOLERANCE, _git_commit
+
+# The requests `index.html` makes, weighted by how often a dashboard session
+# makes them: the station catalog on load, then yearly stats and daily series
+# for the chosen station, plus raw record pages and the plain station list.
+# Placeholders are filled per request from a random station of the catalog
+# and a random year of its coverage.
+DEFAULT_MIX = {
+    "stations.catalog": {"path": "/api/weather/stations/catalog", "weight": 1},
+    "stations": {"path": "/api/weather/stations", "weight": 1},
+    "stats": {"path": "/api/weather/stats?limit=1000&station_id={station_id}&format=columnar", "weight": 3},
+    "series": {"path": "/api/weather/series?bucket=day&max_points=1000&station_id={station_id}"
+                       "&start_date={start_date}&end_date={end_date}&format=columnar", "weight": 3},
+    "weather": {"path": "/api/weather?limit=1000&station_id={station_id}"
+                        "&start_date={start_date}&end_date={end_date}", "weight": 2},
+}
+PERCENTILES = (50, 95, 99)
+
+
+def _percentile(ordered: list[float], percentile: float) -> float:
+    """Nearest-rank percentile of an ascending, non-empty list."""
+    rank = max(1, -(-len(ordered) * percentile // 100))
+    return ordered[int(rank) - 1]
+
+
+class Recorder:
+    """Latencies and outcomes of the requests sent, per mix entry."""
+
+    def __init__(self, names):
+        self.latencies = {name: [] for name in names}
+        self.statuses = {name: {} for name in names}
+        self.errors = {name: 0 for name in names}
+
+    def record(self, name: str, seconds: float, status: str, failed: bool):
+        self.latencies[name].append(seconds)
+        self.statuses[name][status] = self.statuses[name].get(status, 0) + 1
+        self.errors[name] += failed
+
+    @staticmethod
+    def _summary(latencies: list[float], errors: int, statuses: dict, seconds: float) -> dict:
+        summary = {
+            "requests": len(latencies),
+            "errors": errors,
+            "error_rate": round(errors / len(latencies), 4) if latencies else None,
+            "requests_per_second": round(len(latencies) / seconds, 1) if seconds > 0 else None,
+        }
+        ordered = sorted(latencies)
+        for percentile in PERCENTILES:
+            summary[f"latency_p{percentile}_ms"] = (
+                round(_percentile(ordered, percentile) * 1000, 3) if ordered else None)
+        summary["latency_max_ms"] = round(ordered[-1] * 1000, 3) if ordered else None
+        summary["status_codes"] = dict(sorted(statuses.items()))
+        return summary
+
+    def report(self, seconds: float) -> tuple[dict, list[dict]]:
+        """Returns the overall summary and one summary per mix entry."""
+        routes = [{"name": name, **self._summary(self.latencies[name], self.errors[name],
+                                                 self.statuses[name], seconds)}
+                  for name in self.latencies]
+        statuses = {}
+        for route in routes:
+            for status, count in route["status_codes"].items():
+                statuses[status] = statuses.get(status, 0) + count
+        overall = self._summary([latency for latencies in self.latencies.values()
+                                 for latency in latencies],
+                                sum(self.errors.values()), statuses, seconds)
+        return overall, routes
+
+
+class RequestMix:
+    """Draws weighted requests from a mix, filling in their placeholders."""
+
+    def __init__(self, mix: dict, stations: list[dict], seed: int):
+        self.names = list(mix)
+        self.paths = [mix[name]["path"] for name in self.names]
+        self.weights = [mix[name].get("weight", 1) for name in self.names]
+        self.stations = stations
+        self.random = random.Random(seed)
+
+    def _placeholders(self) -> dict:
+        if not self.stations:
+            return {}
+        station = self.random.choice(self.stations)
+        first, last = int(station["first_date"][:4]), int(station["last_date"][:4])
+        year = self.random.randint(first, last)
+        return {"station_id": station["station_id"], "year": year,
+                "start_date": f"{year}-01-01", "end_date": f"{year}-12-31"}
+
+    def fill(self, name: str) -> str:
+        """The path of mix entry `name`, with its placeholders filled in."""
+        return self.paths[self.names.index(name)].format(**self._placeholders())
+
+    def draw(self) -> tuple[str, str]:
+        name = self.random.choices(self.names, self.weights)[0]
+        return name, self.fill(name)
+
+
+async def _send(client: httpx.AsyncClient, recorder: Recorder, name: str, path: str,
+                started: float):
+    """
+    Sends one request and records its latency from `started` until the body is
+    read. Transport failures count as errors under the exception's name.
+    """
+    try:
+        response = await client.get(path)
+        status, failed = str(response.status_code), response.status_code >= 400
+    except httpx.HTTPError as e:
+        status, failed = type(e).__name__, True
+    recorder.record(name, time.perf_counter() - started, status, failed)
+
+
+async def run_closed_loop(client, mix: RequestMix, recorder: Recorder, concurrency: int,
+                          duration: float, requests: int | None):
+    """
+    `concurrency` virtual users each send their next request as soon as the
+    previous one completes, until `duration` seconds or `requests` requests.
+    """
+    deadline = time.perf_counter() + duration
+    sent = 0
+
+    async def user():
+        nonlocal sent
+        while time.perf_counter() < deadline and (requests is None or sent < requests):
+            sent += 1
+            name, path = mix.draw()
+            await _send(client, recorder, name, path, time.perf_counter())
+
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+
+
+async def run_open_loop(client, mix: RequestMix, recorder: Recorder, rate: float,
+                        duration: float, requests: int | None):
+    """
+    Sends requests on a fixed schedule of `rate` per second, whether or not the
+    earlier ones have completed. Latency counts from each request's scheduled
+    time, so a server falling behind shows up in the percentiles instead of
+    slowing the load down (coordinated omission).
+    """
+    total = int(rate * duration) if requests is None else requests
+    loop_started = time.perf_counter()
+    tasks = []
+    for i in range(total):
+        scheduled = loop_started + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        name, path = mix.draw()
+        tasks.append(asyncio.create_task(_send(client, recorder, name, path, scheduled)))
+    await asyncio.gather(*tasks)
+
+
+@asynccontextmanager
+async def _client(url: str | None, timeout: float):
+    """
+    A client for a running server at `url`, or for `app.main:app` driven
+    in-process through ASGI, its lifespan included.
+    """
+    if url:
+        # Unbounded pool: the load, not the client, decides how many requests are in flight.
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+            yield client
+        return
+    from app.main import app
+
+    async with app.router.lifespan_context(app), httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://loadtest",
+            timeout=timeout) as client:
+        yield client
+
+
+async def load_test(mix: dict, url: str | None = None, concurrency: int = 10,
+                    rate: float | None = None, duration: float = 30.0,
+                    requests: int | None = None, seed: int = 0,
+                    timeout: float = 30.0) -> dict:
+    """
+    Replays `mix` against the target, closed-loop at `concurrency` or
+    open-loop at `rate` requests per second, and returns the report. Each mix
+    entry is requested once beforehand as a warm-up, outside the measurements.
+    """
+    async with _client(url, timeout) as client:
+        response = await client.get("/api/weather/stations/catalog")
+        response.raise_for_status()
+        stations = [station for station in response.json() if station["first_date"]]
+        request_mix = RequestMix(mix, stations, seed)
+        for name in request_mix.names:
+            (await client.get(request_mix.fill(name))).raise_for_status()
+
+        recorder = Recorder(request_mix.names)
+        started = time.perf_counter()
+        if rate:
+            await run_open_loop(client, request_mix, recorder, rate, duration, requests)
+        else:
+            await run_closed_loop(client, request_mix, recorder, concurrency, duration, requests)
+        seconds = time.perf_counter() - started
+
+    overall, routes = recorder.report(seconds)
+    return {
+        "metadata": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "target": url or "asgi:app.main:app",
+            "mode": {"rate": rate} if rate else {"concurrency": concurrency},
+            "wall_seconds": round(seconds, 3),
+            "seed": seed,
+            "mix": mix,
+        },
+        "summary": overall,
+        "routes": routes,
+    }
+
+
+def compare(previous: dict, current: dict, tolerance: float) -> list[str]:
+    """
+    Returns the routes whose p95 latency grew by more than `tolerance`, or
+    whose error rate grew at all.
+    """
+    baseline = {route["name"]: route for route in previous["routes"]}
+    regressions = []
+    for route in current["routes"]:
+        before = baseline.get(route["name"])
+        if not before or not before["latency_p95_ms"] or not route["latency_p95_ms"]:
+            continue
+        ratio = route["latency_p95_ms"] / before["latency_p95_ms"]
+        flag = ""
+        if ratio > 1 + tolerance or route["error_rate"] > before["error_rate"]:
+            regressions.append(route["name"])
+            flag = "  REGRESSION"
+        print(f"{route['name']:<20} {ratio:>7.2f}x p95 "
+              f"({before['latency_p95_ms']:.1f} -> {route['latency_p95_ms']:.1f} ms, "
+              f"errors {before['error_rate']:.2%} -> {route['error_rate']:.2%}){flag}")
+    return regressions
+
+
+def _print_report(report: dict):
+    print(f"{'route':<20} {'requests':>8} {'req/s':>8} {'errors':>7} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route in report["routes"] + [{"name": "total", **report["summary"]}]:
+        if not route["requests"]:
+            continue
+        print(f"{route['name']:<20} {route['requests']:>8} {route['requests_per_second']:>8.1f} "
+              f"{route['error_rate']:>7.2%} {route['latency_p50_ms']:>9.2f} "
+              f"{route['latency_p95_ms']:>9.2f} {route['latency_p99_ms']:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay a mix of dashboard requests against the API and report "
+                    "throughput, latency percentiles and error rates per route.")
+    parser.add_argument("--url", help="Base URL of a running server, e.g. http://127.0.0.1:8000 "
+                                      "(default: drive app.main:app in-process)")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, default=10,
+                      help="Virtual users sending requests back to back (default)")
+    load.add_argument("--rate", type=float, help="Requests per second, sent on a fixed schedule")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run for")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests instead")
+    parser.add_argument("--mix", metavar="MIX_JSON",
+                        help='Request mix as {"name": {"path": ..., "weight": ...}}; paths may use '
+                             '{station_id}, {year}, {start_date} and {end_date}')
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--output", default="loadtest_results.json")
+    parser.add_argument("--compare", metavar="PREVIOUS_JSON",
+                        help="Compare against an earlier results file and exit with "
+                             "status 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    # httpx logs every request at INFO, which would cost more than some requests take.
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    mix = DEFAULT_MIX
+    if args.mix:
+        with open(args.mix) as f:
+            mix = json.load(f)
+    report = asyncio.run(load_test(mix, args.url, args.concurrency, args.rate, args.duration,
+                                   args.requests, args.seed, args.timeout))
+    _print_report(report)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        if compare(previous, report, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
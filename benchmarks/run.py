@@ -0,0 +1,258 @@
+import os
+import sys
+import glob
+import json
+import time
+import logging
+import argparse
+import platform
+import resource
+import statistics
+import subprocess
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from benchmarks.synthetic import generate_dataset
+
+# Requests sent to each endpoint by the API benchmark.
+DEFAULT_API_REQUESTS = 50
+# Relative drop in throughput reported as a regression by `--compare`.
+DEFAULT_TOLERANCE = 0.10
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is reported in KiB on Linux and in bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _result(name: str, rows: int, seconds: float, **extra) -> dict:
+    return {
+        "name": name,
+        "rows": rows,
+        "wall_seconds": round(seconds, 6),
+        "rows_per_second": round(rows / seconds, 1) if seconds > 0 else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        **extra,
+    }
+
+
+def bench_parse(data_dir: str, parser: str) -> list[dict]:
+    """Times one parser backend over every station file, in a single process."""
+    from app.ingest import PARSERS
+
+    parse = PARSERS[parser]
+    files = sorted(glob.glob(os.path.join(data_dir, "*.txt")))
+    started = time.perf_counter()
+    rows = sum(len(parse(file_path)) for file_path in files)
+    return [_result(f"parse.{parser}", rows, time.perf_counter() - started, files=len(files))]
+
+
+def bench_insert(data_dir: str) -> list[dict]:
+    """
+    Times the insert phase alone: the records are parsed up front, then written
+    into an empty table through `BulkWriter`, including the index rebuild.
+    """
+    from app.core.database import engine
+    from app.ingest import process_file_vectorized
+    from app.models import Base
+    from app.services.bulk_writer import BulkWriter
+
+    Base.metadata.create_all(bind=engine)
+    batches = [process_file_vectorized(file_path)
+               for file_path in sorted(glob.glob(os.path.join(data_dir, "*.txt")))]
+
+    started = time.perf_counter()
+    with BulkWriter(engine) as writer:
+        written = sum(writer.write(batch) for batch in batches)
+        writer.commit()
+    return [_result("insert", written, time.perf_counter() - started)]
+
+
+def bench_stats() -> list[dict]:
+    """Times a full statistics rebuild and an incremental single-group update."""
+    from sqlalchemy import func, select
+    from app.core.database import engine
+    from app.services import partitions
+    from app.services.analysis import calculate_and_store_stats
+
+    with engine.connect() as connection:
+        records = partitions.records_source(connection)
+        rows, station_id, last_date = connection.execute(
+            select(func.count(), func.min(records.c.station_id),
+                   func.max(records.c.date))).one()
+
+    started = time.perf_counter()
+    calculate_and_store_stats()
+    full = _result("stats.full", rows, time.perf_counter() - started)
+
+    dirty = {(station_id, int(str(last_date)[:4]))}
+    started = time.perf_counter()
+    calculate_and_store_stats(dirty)
+    incremental = _result("stats.incremental", 1, time.perf_counter() - started)
+    return [full, incremental]
+
+
+def _api_requests(station_id: str, total_rows: int) -> dict:
+    """
+    The dashboard's requests, plus a page 90% of the way through the table,
+    keyed by benchmark name.
+    """
+    return {
+        "api.weather": f"/api/weather?limit=1000&station_id={station_id}"
+                       "&start_date=1990-01-01&end_date=1992-12-31",
+        "api.weather.deep_page": f"/api/weather?limit=100&skip={int(total_rows * 0.9)}",
+        "api.weather.stats": "/api/weather/stats?limit=1000",
+        "api.weather.stations": "/api/weather/stations",
+    }
+
+
+def bench_api(requests_per_endpoint: int) -> list[dict]:
+    """
+    Drives each `/api/weather*` endpoint through the ASGI app in-process and
+    reports latency percentiles alongside throughput.
+    """
+    from fastapi.testclient import TestClient
+    from sqlalchemy import func, select
+    from app.core.database import engine
+    from app.main import app
+    from app.services import partitions
+
+    with engine.connect() as connection:
+        records = partitions.records_source(connection)
+        total_rows, station_id = connection.execute(
+            select(func.count(), func.min(records.c.station_id))).one()
+
+    results = []
+    with TestClient(app) as client:
+        for name, url in _api_requests(station_id, total_rows).items():
+            client.get(url)  # Warm-up
+            latencies = []
+            rows = 0
+            for _ in range(requests_per_endpoint):
+                started = time.perf_counter()
+                response = client.get(url)
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+                rows += len(response.json())
+            total = sum(latencies)
+            quantiles = statistics.quantiles(latencies, n=100)
+            results.append(_result(
+                name, rows, total,
+                requests=requests_per_endpoint,
+                requests_per_second=round(requests_per_endpoint / total, 1),
+                latency_p50_ms=round(quantiles[49] * 1000, 3),
+                latency_p95_ms=round(quantiles[94] * 1000, 3),
+            ))
+    return results
+
+
+def _run_isolated(func, *args) -> list[dict]:
+    """
+    Runs a benchmark in a fresh process so that its peak RSS is not inflated by
+    the phases that ran before it.
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=logging.disable, initargs=(logging.INFO,)) as executor:
+        return executor.submit(func, *args).result()
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(data_dir: str, work_dir: str, api_requests: int) -> list[dict]:
+    # Set before any `app` module is imported, so every phase uses the scratch database.
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(work_dir, 'benchmark.db')}"
+
+    results = []
+    for phase, args in [
+        (bench_parse, (data_dir, "python")),
+        (bench_parse, (data_dir, "numpy")),
+        (bench_insert, (data_dir,)),
+        (bench_stats, ()),
+        (bench_api, (api_requests,)),
+    ]:
+        for result in _run_isolated(phase, *args):
+            print(f"{result['name']:<28} {result['wall_seconds']:>10.3f}s "
+                  f"{result['rows_per_second'] or 0:>14,.0f} rows/s "
+                  f"{result['peak_rss_mb']:>9.1f} MB")
+            results.append(result)
+    return results
+
+
+def compare(previous: dict, current: dict, tolerance: float) -> list[str]:
+    """Returns the names of benchmarks whose throughput dropped by more than `tolerance`."""
+    baseline = {result["name"]: result for result in previous["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = baseline.get(result["name"])
+        if not before or not before["rows_per_second"] or not result["rows_per_second"]:
+            continue
+        ratio = result["rows_per_second"] / before["rows_per_second"]
+        flag = ""
+        if ratio < 1 - tolerance:
+            regressions.append(result["name"])
+            flag = "  REGRESSION"
+        print(f"{result['name']:<28} {ratio:>7.2f}x rows/s "
+              f"({before['rows_per_second']:,.0f} -> {result['rows_per_second']:,.0f}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark parsing, insertion, statistics and the API.")
+    parser.add_argument("--stations", type=int, default=167,
+                        help="Number of synthetic stations to generate")
+    parser.add_argument("--years", type=int, default=30,
+                        help="Years of daily data per synthetic station")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir",
+                        help="Benchmark an existing directory of station files instead "
+                             "of generating one (e.g. app/artifacts/wx_data)")
+    parser.add_argument("--api-requests", type=int, default=DEFAULT_API_REQUESTS)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", metavar="PREVIOUS_JSON",
+                        help="Compare against an earlier results file and exit with "
+                             "status 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="weather-bench-") as work_dir:
+        data_dir = args.data_dir
+        if data_dir is None:
+            data_dir = os.path.join(work_dir, "wx_data")
+            generate_dataset(data_dir, args.stations, args.years, seed=args.seed)
+        results = run_suite(data_dir, work_dir, args.api_requests)
+
+    report = {
+        "metadata": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "dataset": args.data_dir or {
+                "stations": args.stations, "years": args.years, "seed": args.seed},
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        if compare(previous, report, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import os
+import argparse
+import numpy as np
+
+# Fraction of observations written as missing (-9999), per variable.
+MISSING_RATE = 0.02
+
+
+def generate_station(path: str, rng: np.random.Generator, start_year: int, years: int):
+    """
+    Writes one station file in the same tab separated format as `wx_data`:
+    YYYYMMDD, max temp, min temp (tenths of a degree C) and precipitation
+    (tenths of a mm), right aligned, with -9999 for missing values.
+    """
+    dates = np.arange(np.datetime64(f"{start_year}-01-01"),
+                      np.datetime64(f"{start_year + years}-01-01"), dtype="datetime64[D]")
+    day_of_year = (dates - dates.astype("datetime64[Y]")).astype(np.int64)
+    season = np.cos(2 * np.pi * (day_of_year - 200) / 365.25)
+    offset = rng.normal(0, 40)
+
+    max_temp = (150 + 150 * season + offset + rng.normal(0, 40, len(dates))).astype(np.int64)
+    min_temp = max_temp - rng.integers(40, 150, len(dates))
+    precip = np.where(rng.random(len(dates)) < 0.3,
+                      rng.exponential(60, len(dates)), 0).astype(np.int64)
+    for column in (max_temp, min_temp, precip):
+        column[rng.random(len(dates)) < MISSING_RATE] = -9999
+
+    ymd = np.char.replace(dates.astype(str), "-", "")
+    with open(path, "w") as f:
+        for row in zip(ymd, max_temp, min_temp, precip):
+            f.write("%s\t%5d\t%5d\t%5d\n" % row)
+
+
+def generate_dataset(data_dir: str, stations: int = 167, years: int = 30,
+                     start_year: int = 1985, seed: int = 0) -> list[str]:
+    """
+    Generates `stations` synthetic station files covering `years` years each.
+    The output only depends on the arguments, so runs are reproducible.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(stations):
+        path = os.path.join(data_dir, f"SYN{i:08d}.txt")
+        generate_station(path, rng, start_year, years)
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic station files.")
+    parser.add_argument("data_dir")
+    parser.add_argument("--stations", type=int, default=167)
+    parser.add_argument("--years", type=int, default=30)
+    parser.add_argument("--start-year", type=int, default=1985)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate_dataset(args.data_dir, args.stations, args.years, args.start_year, args.seed)
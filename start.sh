@@ -17,6 +17,12 @@ else
     echo "Database download complete."
 fi
 
+# The downloaded database is only ever read: serve it immutable and memory-mapped,
+# skip schema creation and warm the page cache in the background.
+# Set either variable to false to override.
+export READ_ONLY_MODE="${READ_ONLY_MODE:-true}"
+export WARMUP_ON_START="${WARMUP_ON_START:-true}"
+
 echo "Starting web server..."
 # Use the PORT environment variable if available (Cloud Run standard), otherwise default to 8080
 exec uvicorn app.main:app --host 0.0.0.0 --port ${PORT:-8080}
\ No newline at end of file
@@ -0,0 +1,136 @@
+import pytest
+import numpy as np
+from datetime import date
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models import (
+    WeatherClimatology, WeatherMonthlyStats, WeatherRecord, WeatherStats, WeatherStatsExtremes)
+from app.services import analysis, climatology
+
+
+@pytest.fixture
+def analysis_db(tmp_path, monkeypatch):
+    """Points the analysis module at a throwaway SQLite database with sample rows."""
+    test_engine = create_engine(f"sqlite:///{tmp_path / 'analysis.db'}")
+    Base.metadata.create_all(bind=test_engine)
+    session_factory = sessionmaker(
+        autocommit=False, autoflush=False, bind=test_engine)
+    monkeypatch.setattr(analysis, "SessionLocal", session_factory)
+
+    session = session_factory()
+    session.add_all([
+        WeatherRecord(station_id="A", date=date(2000, 1, 1),
+                      max_temp=10.0, min_temp=0.0, precip=5.0),
+        WeatherRecord(station_id="A", date=date(2000, 6, 1),
+                      max_temp=20.0, min_temp=10.0, precip=15.0),
+        WeatherRecord(station_id="A", date=date(2001, 1, 1),
+                      max_temp=5.0, min_temp=None, precip=None),
+        WeatherRecord(station_id="B", date=date(2000, 1, 1),
+                      max_temp=1.0, min_temp=-1.0, precip=2.0),
+    ])
+    session.commit()
+    yield session
+    session.close()
+    test_engine.dispose()
+
+
+def _stats(session):
+    session.expire_all()
+    return {(s.station_id, s.year): (s.avg_max_temp, s.avg_min_temp, s.total_precip)
+            for s in session.query(WeatherStats)}
+
+
+def test_full_rebuild_computes_every_group(analysis_db):
+    analysis.calculate_and_store_stats()
+    assert _stats(analysis_db) == {
+        ("A", 2000): (15.0, 5.0, 2.0),
+        ("A", 2001): (5.0, None, None),
+        ("B", 2000): (1.0, -1.0, 0.2),
+    }
+
+
+def test_incremental_run_only_recomputes_dirty_groups(analysis_db):
+    analysis.calculate_and_store_stats()
+    analysis_db.add(WeatherRecord(station_id="A", date=date(2001, 1, 2),
+                                  max_temp=7.0, min_temp=1.0, precip=4.0))
+    analysis_db.add(WeatherRecord(station_id="B", date=date(2000, 1, 2),
+                                  max_temp=3.0, min_temp=1.0, precip=0.0))
+    analysis_db.commit()
+
+    analysis.calculate_and_store_stats({("A", 2001)})
+    stats = _stats(analysis_db)
+    assert stats[("A", 2001)] == (6.0, 1.0, 0.4)
+    # B/2000 was not in the dirty set, so it keeps its previous value.
+    assert stats[("B", 2000)] == (1.0, -1.0, 0.2)
+    assert len(stats) == 3
+
+    analysis.calculate_and_store_stats()
+    assert _stats(analysis_db)[("B", 2000)] == (2.0, 0.0, 0.2)
+
+
+def test_monthly_stats_and_climatology_follow_dirty_groups(analysis_db):
+    analysis.calculate_and_store_stats()
+    analysis_db.expire_all()
+    monthly = {(m.station_id, m.year, m.month): (m.avg_max_temp, m.total_precip, m.days)
+               for m in analysis_db.query(WeatherMonthlyStats)}
+    assert monthly == {
+        ("A", 2000, 1): (10.0, 0.5, 1),
+        ("A", 2000, 6): (20.0, 1.5, 1),
+        ("A", 2001, 1): (5.0, None, 1),
+        ("B", 2000, 1): (1.0, 0.2, 1),
+    }
+
+    # January 1st of 2000 and 2001 share day 1.
+    normal = analysis_db.query(WeatherClimatology).filter_by(station_id="A", day_of_year=1).one()
+    assert (normal.max_temp_mean, normal.max_temp_min, normal.max_temp_max) == (7.5, 5.0, 10.0)
+    assert (normal.min_temp_mean, normal.precip_max, normal.years) == (0.0, 5.0, 2)
+
+    analysis_db.add(WeatherRecord(station_id="A", date=date(2002, 1, 1),
+                                  max_temp=0.0, min_temp=-3.0, precip=1.0))
+    analysis_db.commit()
+    analysis.calculate_and_store_stats({("A", 2002)})
+    analysis_db.expire_all()
+    normal = analysis_db.query(WeatherClimatology).filter_by(station_id="A", day_of_year=1).one()
+    assert (normal.max_temp_mean, normal.years) == (5.0, 3)
+    assert analysis_db.query(WeatherMonthlyStats).filter_by(year=2002).one().avg_min_temp == -3.0
+    assert analysis_db.query(WeatherClimatology).count() == 3
+
+
+def test_day_of_year_uses_a_leap_year_calendar():
+    dates = np.array(["2001-02-28", "2001-03-01", "2000-02-29", "2000-03-01", "2001-12-31"],
+                     dtype="datetime64[D]")
+    assert climatology.day_of_year(dates).tolist() == [59, 61, 60, 61, 366]
+
+
+def test_extremes_are_computed_per_station_year(analysis_db):
+    analysis_db.add_all([
+        WeatherRecord(station_id="A", date=date(2000, 6, 2),
+                      max_temp=31.0, min_temp=12.0, precip=0.0),
+        WeatherRecord(station_id="A", date=date(2000, 6, 3),
+                      max_temp=30.0, min_temp=-0.5, precip=0.5),
+        # June 4th is missing, which ends the dry spell.
+        WeatherRecord(station_id="A", date=date(2000, 6, 5),
+                      max_temp=25.0, min_temp=None, precip=0.0),
+    ])
+    analysis_db.commit()
+    analysis.calculate_and_store_stats()
+    analysis_db.expire_all()
+
+    extremes = analysis_db.query(WeatherStatsExtremes).filter_by(station_id="A", year=2000).one()
+    assert (extremes.heat_days, extremes.frost_days, extremes.longest_dry_spell) == (2, 1, 2)
+    # Daily maxima 10, 20, 31, 30 and 25.
+    assert (extremes.max_temp_p10, extremes.max_temp_p50, extremes.max_temp_p90) == (14.0, 25.0, 30.6)
+
+    extremes = analysis_db.query(WeatherStatsExtremes).filter_by(station_id="A", year=2001).one()
+    assert (extremes.heat_days, extremes.frost_days, extremes.longest_dry_spell) == (0, None, None)
+    assert extremes.min_temp_p50 is None
+
+    analysis_db.add(WeatherRecord(station_id="A", date=date(2000, 6, 4),
+                                  max_temp=35.0, min_temp=20.0, precip=0.2))
+    analysis_db.commit()
+    analysis.calculate_and_store_stats({("A", 2000)})
+    analysis_db.expire_all()
+    extremes = analysis_db.query(WeatherStatsExtremes).filter_by(station_id="A", year=2000).one()
+    assert (extremes.heat_days, extremes.longest_dry_spell) == (3, 4)
@@ -1,3 +1,4 @@
+import json
 import pytest
 import os
 from fastapi.testclient import TestClient
@@ -8,7 +9,9 @@ from datetime import date
 from app.main import app
 from app.core.database import Base
 from app.api.weather import get_db
-from app.models import WeatherRecord, WeatherStats
+from app.models import (
+    Station, WeatherClimatology, WeatherMonthlyStats, WeatherRecord, WeatherStats, WeatherStatsExtremes)
+from app.core.generation import RECORDS_GENERATION_ROW_ID, bump_generation
 
 # Use a dedicated SQLite file for testing
 TEST_DB_PATH = "./test_weather.db"
@@ -43,6 +46,7 @@ def db_session_with_data():
         # Clear existing data
         db.query(WeatherRecord).delete()
         db.query(WeatherStats).delete()
+        db.query(WeatherStatsExtremes).delete()
         db.commit()
 
         # Populate with fresh sample data for each test
@@ -58,6 +62,8 @@ def db_session_with_data():
         db.add(WeatherStats(station_id="TEST02", year=2022,
                avg_max_temp=15.0, avg_min_temp=5.0, total_precip=0.1))
 
+        # Like the ingestion and analysis jobs, invalidate cached responses.
+        bump_generation(db)
         db.commit()
         yield db
     finally:
@@ -76,6 +82,35 @@ app.dependency_overrides[get_db] = override_get_db
 client = TestClient(app)
 
 
+@pytest.fixture
+def baseline_db(tmp_path):
+    """
+    Serves a database holding only the original records and yearly stats
+    tables, like one built before the analysis tables existed.
+    """
+    from app.core.cache import response_cache
+
+    baseline_engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}",
+                                    connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=baseline_engine,
+                             tables=[WeatherRecord.__table__, WeatherStats.__table__])
+    baseline_session = sessionmaker(autocommit=False, autoflush=False, bind=baseline_engine)
+
+    def override_get_baseline_db():
+        db = baseline_session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_baseline_db
+    response_cache.clear()
+    yield baseline_session
+    app.dependency_overrides[get_db] = override_get_db
+    response_cache.clear()
+    baseline_engine.dispose()
+
+
 def test_read_root():
     response = client.get("/")
     assert response.status_code == 200
@@ -123,8 +158,402 @@ def test_read_weather_stats_filter_by_year_and_station(db_session_with_data):
     assert data[0]["year"] == 2022
 
 
+def test_read_weather_stats_include_extremes(db_session_with_data):
+    db_session_with_data.add(WeatherStatsExtremes(
+        station_id="TEST01", year=2022, heat_days=0, frost_days=0, longest_dry_spell=1,
+        max_temp_p10=10.2, max_temp_p50=11.0, max_temp_p90=11.8))
+    bump_generation(db_session_with_data)
+    db_session_with_data.commit()
+
+    data = client.get("/api/weather/stats").json()
+    assert (data[0]["longest_dry_spell"], data[0]["max_temp_p90"], data[0]["min_temp_p50"]) == (1, 11.8, None)
+    # Station-years without computed extremes are still listed.
+    assert data[1]["station_id"] == "TEST02" and data[1]["heat_days"] is None
+
+
+def test_read_weather_stats_without_extremes_table(baseline_db):
+    db = baseline_db()
+    db.add(WeatherStats(station_id="TEST01", year=2022,
+           avg_max_temp=11.0, avg_min_temp=1.0, total_precip=0.5))
+    db.commit()
+    db.close()
+
+    response = client.get("/api/weather/stats")
+    assert response.status_code == 200
+    [stats] = response.json()
+    assert (stats["station_id"], stats["avg_max_temp"]) == ("TEST01", 11.0)
+    assert stats["heat_days"] is None and stats["max_temp_p90"] is None
+
+
+def test_monthly_stats_climatology_and_anomalies_without_tables(baseline_db):
+    db = baseline_db()
+    db.add(WeatherRecord(station_id="TEST01", date=date(2022, 1, 1),
+                         max_temp=10.0, min_temp=0.0, precip=5.0))
+    db.commit()
+    db.close()
+
+    for url in ("/api/weather/stats/monthly", "/api/weather/climatology?station_id=TEST01"):
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.json() == []
+    response = client.get("/api/weather/anomalies?station_id=TEST01")
+    assert response.status_code == 200
+    assert response.json() == [{"station_id": "TEST01", "date": "2022-01-01", "max_temp": 10.0,
+                                "min_temp": 0.0, "precip": 5.0, "max_temp_anomaly": None,
+                                "min_temp_anomaly": None, "precip_anomaly": None}]
+
+
 def test_read_station_ids(db_session_with_data):
     response = client.get("/api/weather/stations")
     assert response.status_code == 200
     data = response.json()
     assert sorted(data) == ["TEST01", "TEST02"]
+
+
+def test_read_weather_records_cursor_pagination(db_session_with_data):
+    first_page = client.get("/api/weather?limit=2")
+    assert first_page.status_code == 200
+    assert [(r["station_id"], r["date"]) for r in first_page.json()] == [
+        ("TEST01", "2022-01-01"), ("TEST01", "2022-01-02")]
+    cursor = first_page.headers["X-Next-Cursor"]
+
+    second_page = client.get(f"/api/weather?limit=2&cursor={cursor}")
+    assert second_page.status_code == 200
+    assert [(r["station_id"], r["date"]) for r in second_page.json()] == [
+        ("TEST02", "2022-01-01")]
+    assert "X-Next-Cursor" not in second_page.headers
+
+
+def test_read_weather_stats_cursor_pagination(db_session_with_data):
+    first_page = client.get("/api/weather/stats?limit=1")
+    cursor = first_page.headers["X-Next-Cursor"]
+    second_page = client.get(f"/api/weather/stats?limit=1&cursor={cursor}")
+    assert second_page.status_code == 200
+    assert [r["station_id"] for r in first_page.json() + second_page.json()] == [
+        "TEST01", "TEST02"]
+
+
+def test_invalid_cursor_is_rejected(db_session_with_data):
+    response = client.get("/api/weather?cursor=not-a-cursor")
+    assert response.status_code == 400
+
+
+def test_export_weather_records_csv(db_session_with_data):
+    response = client.get("/api/weather/export?station_id=TEST01")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text.splitlines() == [
+        "station_id,date,max_temp,min_temp,precip",
+        "TEST01,2022-01-01,10.0,0.0,5.0",
+        "TEST01,2022-01-02,12.0,2.0,0.0",
+    ]
+
+
+def test_export_weather_records_ndjson_gzip(db_session_with_data):
+    response = client.get(
+        "/api/weather/export?format=ndjson&gzip=true&start_date=2022-01-02")
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    # The test client transparently decompresses the body.
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows == [{"station_id": "TEST01", "date": "2022-01-02",
+                     "max_temp": 12.0, "min_temp": 2.0, "precip": 0.0}]
+
+
+def test_stats_response_is_cached_with_etag(db_session_with_data):
+    response = client.get("/api/weather/stats")
+    etag = response.headers["ETag"]
+    assert "Last-Modified" in response.headers
+
+    not_modified = client.get("/api/weather/stats", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    # A write without a generation bump is not visible until the next bump.
+    db_session_with_data.query(WeatherStats).filter_by(
+        station_id="TEST02").delete()
+    db_session_with_data.commit()
+    assert len(client.get("/api/weather/stats").json()) == 2
+
+    bump_generation(db_session_with_data)
+    db_session_with_data.commit()
+    response = client.get("/api/weather/stats", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.json()) == 1
+
+
+def test_station_ids_support_if_none_match(db_session_with_data):
+    response = client.get("/api/weather/stations")
+    not_modified = client.get(
+        "/api/weather/stations", headers={"If-None-Match": response.headers["ETag"]})
+    assert not_modified.status_code == 304
+
+
+def test_async_endpoints_match_sync(db_session_with_data):
+    pytest.importorskip("aiosqlite")
+    from fastapi import FastAPI
+    from app.api import weather_async
+    from app.core.cache import response_cache
+    from app.core.database import (
+        async_database_url, create_async_session_factory, get_async_db)
+
+    async_session_factory = create_async_session_factory(
+        async_database_url(SQLALCHEMY_DATABASE_URL))
+
+    async def override_get_async_db():
+        async with async_session_factory() as db:
+            yield db
+
+    async_app = FastAPI()
+    async_app.include_router(weather_async.router, prefix="/api")
+    async_app.dependency_overrides[get_async_db] = override_get_async_db
+
+    urls = [
+        "/api/weather?limit=2",
+        "/api/weather?station_id=TEST02&start_date=2022-01-01",
+        "/api/weather/stats?limit=1",
+        "/api/weather/stats?format=columnar",
+        "/api/weather/stations",
+    ]
+    with TestClient(async_app) as async_client:
+        for url in urls:
+            # Render both responses from the database rather than the shared cache.
+            response_cache.clear()
+            expected = client.get(url)
+            response_cache.clear()
+            response = async_client.get(url)
+            assert response.status_code == expected.status_code == 200
+            assert response.json() == expected.json()
+            for header in ("X-Next-Cursor", "ETag"):
+                assert response.headers.get(header) == expected.headers.get(header)
+        async_client.portal.call(async_session_factory.kw["bind"].dispose)
+
+
+def test_read_weather_series_buckets(db_session_with_data):
+    response = client.get("/api/weather/series")
+    assert response.status_code == 200
+    assert response.json() == [
+        {"date": "2022-01-01", "max_temp": 12.5, "min_temp": 2.5, "precip": 3.0, "days": 2},
+        {"date": "2022-01-02", "max_temp": 12.0, "min_temp": 2.0, "precip": 0.0, "days": 1},
+    ]
+
+    # 2022-01-01 and 2022-01-02 fall in the week starting on Monday 2021-12-27.
+    week = client.get("/api/weather/series?station_id=TEST01&bucket=week").json()
+    assert week == [
+        {"date": "2021-12-27", "max_temp": 11.0, "min_temp": 1.0, "precip": 5.0, "days": 2}]
+    month = client.get("/api/weather/series?station_id=TEST01&bucket=month").json()
+    assert [point["date"] for point in month] == ["2022-01-01"]
+
+    assert client.get("/api/weather/series?bucket=hour").status_code == 422
+    assert client.get("/api/weather/series?max_points=2").status_code == 422
+
+
+def test_columnar_store_serves_station_records(db_session_with_data, tmp_path, monkeypatch):
+    from app.services import columnar
+
+    urls = [
+        "/api/weather?station_id=TEST01",
+        "/api/weather?station_id=TEST01&start_date=2022-01-02",
+        "/api/weather?station_id=TEST01&end_date=2022-01-01&skip=0&limit=1",
+        "/api/weather?station_id=TEST01&skip=1",
+        "/api/weather?station_id=NOPE",
+        "/api/weather?station_id=TEST01&format=columnar",
+    ]
+    expected = [client.get(url) for url in urls]
+
+    columnar.build_store(engine, str(tmp_path))
+    store = columnar.ColumnarStore(str(tmp_path))
+    monkeypatch.setattr(columnar, "columnar_store", store)
+    for url, sql_response in zip(urls, expected):
+        response = client.get(url)
+        assert response.content == sql_response.content
+        assert response.headers.get("X-Next-Cursor") == sql_response.headers.get("X-Next-Cursor")
+
+    # Following the cursor stays within the store.
+    cursor = client.get("/api/weather?station_id=TEST01&limit=1").headers["X-Next-Cursor"]
+    page = client.get(f"/api/weather?station_id=TEST01&limit=1&cursor={cursor}").json()
+    assert [record["date"] for record in page] == ["2022-01-02"]
+    assert "TEST01" in store._stations
+
+    # Stations missing from the build, and every station once ingestion has
+    # changed the records since, are served from SQL.
+    db_session_with_data.add(WeatherRecord(station_id="TEST03", date=date(2022, 1, 1)))
+    db_session_with_data.add(WeatherRecord(station_id="TEST01", date=date(2022, 1, 3)))
+    db_session_with_data.commit()
+    assert len(client.get("/api/weather?station_id=TEST03").json()) == 1
+    assert len(client.get("/api/weather?station_id=TEST01").json()) == 2
+    bump_generation(db_session_with_data, RECORDS_GENERATION_ROW_ID)
+    db_session_with_data.commit()
+    assert len(client.get("/api/weather?station_id=TEST01").json()) == 3
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_fast_serialization_matches_response_models(db_session_with_data, monkeypatch, use_orjson):
+    from fastapi.responses import JSONResponse
+    from app.core import serialization
+    from app.schemas import weather as weather_schema
+
+    if use_orjson:
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(serialization, "orjson", None)
+
+    records = db_session_with_data.query(WeatherRecord).order_by(
+        WeatherRecord.station_id, WeatherRecord.date).all()
+    expected = JSONResponse([weather_schema.WeatherRecord.model_validate(
+        record, from_attributes=True).model_dump(mode="json") for record in records]).body
+    assert client.get("/api/weather").content == expected
+
+    bump_generation(db_session_with_data)
+    stats = db_session_with_data.query(WeatherStats).order_by(
+        WeatherStats.station_id, WeatherStats.year).all()
+    expected = JSONResponse([weather_schema.WeatherStats.model_validate(
+        stat, from_attributes=True).model_dump(mode="json") for stat in stats]).body
+    assert client.get("/api/weather/stats").content == expected
+
+
+def test_read_weather_batch(db_session_with_data):
+    response = client.post("/api/weather/batch", json={
+        "station_ids": ["TEST02", "NOPE"],
+        "windows": [["TEST01", "2022-01-02", None], {"station_id": "TEST02", "end_date": "2022-01-01"}],
+    })
+    assert response.status_code == 200
+    data = response.json()
+    assert list(data) == ["TEST02", "NOPE", "TEST01"]
+    assert [record["date"] for record in data["TEST01"]] == ["2022-01-02"]
+    # TEST02's record matches both its station ID and its window, but is returned once.
+    assert [record["max_temp"] for record in data["TEST02"]] == [15.0]
+    assert data["NOPE"] == []
+
+    stream = client.post("/api/weather/batch?format=ndjson", json={"station_ids": ["TEST01"]})
+    assert stream.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line)["date"] for line in stream.text.splitlines()] == ["2022-01-01", "2022-01-02"]
+
+    for batch_format in ("json", "ndjson"):
+        capped = client.post(f"/api/weather/batch?format={batch_format}",
+                             json={"station_ids": ["TEST01"], "max_rows": 1})
+        assert capped.status_code == 400
+    assert client.post("/api/weather/batch", json={}).status_code == 422
+
+
+def test_monthly_stats_climatology_and_anomalies(db_session_with_data):
+    db_session_with_data.query(WeatherMonthlyStats).delete()
+    db_session_with_data.query(WeatherClimatology).delete()
+    db_session_with_data.add(WeatherMonthlyStats(
+        station_id="TEST01", year=2022, month=1, avg_max_temp=11.0, avg_min_temp=1.0,
+        total_precip=0.5, days=2))
+    db_session_with_data.add(WeatherClimatology(
+        station_id="TEST01", day_of_year=2, max_temp_mean=10.0, min_temp_mean=None,
+        precip_mean=1.5, years=30))
+    bump_generation(db_session_with_data)
+    db_session_with_data.commit()
+
+    monthly = client.get("/api/weather/stats/monthly?station_id=TEST01&month=1").json()
+    assert [(m["year"], m["month"], m["days"]) for m in monthly] == [(2022, 1, 2)]
+    assert client.get("/api/weather/stats/monthly?month=13").status_code == 422
+
+    normals = client.get("/api/weather/climatology?station_id=TEST01").json()
+    assert [(n["day_of_year"], n["max_temp_mean"], n["years"]) for n in normals] == [(2, 10.0, 30)]
+
+    response = client.get("/api/weather/anomalies?station_id=TEST01&limit=1")
+    assert response.json()[0]["max_temp_anomaly"] is None  # No normal for January 1st
+    cursor = response.headers["X-Next-Cursor"]
+    anomaly = client.get(f"/api/weather/anomalies?station_id=TEST01&cursor={cursor}").json()
+    assert anomaly == [{"station_id": "TEST01", "date": "2022-01-02", "max_temp": 12.0,
+                        "min_temp": 2.0, "precip": 0.0, "max_temp_anomaly": 2.0,
+                        "min_temp_anomaly": None, "precip_anomaly": -1.5}]
+    assert client.get("/api/weather/anomalies").status_code == 422
+
+
+def test_station_catalog_and_coverage_filters(db_session_with_data):
+    from app.services import catalog
+
+    # Without a catalog, coverage is aggregated from the records.
+    fallback = client.get("/api/weather/stations/catalog").json()
+    assert fallback == [
+        {"station_id": "TEST01", "first_date": "2022-01-01", "last_date": "2022-01-02",
+         "record_count": 2, "missing_max_temp": 0, "missing_min_temp": 0, "missing_precip": 0},
+        {"station_id": "TEST02", "first_date": "2022-01-01", "last_date": "2022-01-01",
+         "record_count": 1, "missing_max_temp": 0, "missing_min_temp": 0, "missing_precip": 0},
+    ]
+    assert client.get("/api/weather/stations?min_records=2").json() == ["TEST01"]
+
+    db_session_with_data.add(WeatherRecord(station_id="TEST02", date=date(2022, 1, 5),
+                                           max_temp=None, min_temp=1.0, precip=None))
+    db_session_with_data.flush()
+    catalog.refresh_catalog(db_session_with_data.connection())
+    bump_generation(db_session_with_data)
+    db_session_with_data.commit()
+    try:
+        rows = client.get("/api/weather/stations/catalog?start_date=2022-01-03").json()
+        assert [(r["station_id"], r["last_date"], r["record_count"], r["missing_precip"])
+                for r in rows] == [("TEST02", "2022-01-05", 2, 1)]
+        assert client.get("/api/weather/stations?end_date=2021-12-31").json() == []
+        assert client.get("/api/weather/stations").json() == ["TEST01", "TEST02"]
+    finally:
+        db_session_with_data.query(Station).delete()
+        db_session_with_data.commit()
+
+
+def test_columnar_format(db_session_with_data):
+    response = client.get("/api/weather?limit=2&format=columnar")
+    assert response.status_code == 200
+    assert response.json() == {
+        "length": 2,
+        "station_id": {"values": ["TEST01"], "runs": [2]},
+        "date": {"start": "2022-01-01", "deltas": [0, 1]},
+        "max_temp": [10.0, 12.0], "min_temp": [0.0, 2.0], "precip": [5.0, 0.0],
+        "id": [record["id"] for record in client.get("/api/weather?limit=2").json()],
+    }
+    assert response.headers["X-Next-Cursor"] == client.get("/api/weather?limit=2").headers["X-Next-Cursor"]
+    # A new station restarts the date deltas from the previous row.
+    assert client.get("/api/weather?format=columnar").json()["date"]["deltas"] == [0, 1, -1]
+    assert client.get("/api/weather?station_id=NOPE&format=columnar").json()["date"] == {
+        "start": None, "deltas": []}
+
+    stats = client.get("/api/weather/stats?format=columnar").json()
+    assert stats["station_id"] == {"values": ["TEST01", "TEST02"], "runs": [1, 1]}
+    assert stats["year"] == [2022, 2022]
+    assert stats["avg_max_temp"] == [11.0, 15.0]
+    assert stats["heat_days"] == [None, None]
+
+    series = client.get("/api/weather/series?format=columnar").json()
+    assert series["date"] == {"start": "2022-01-01", "deltas": [0, 1]}
+    assert series["days"] == [2, 1]
+    assert client.get("/api/weather?format=xml").status_code == 422
+
+
+def test_responses_are_compressed_as_negotiated(db_session_with_data):
+    from app.core.compression import CompressionMiddleware, negotiate_encoding
+
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0, identity") is None
+    assert negotiate_encoding("*;q=0.5") in ("br", "gzip")
+    assert negotiate_encoding("") is None
+
+    # The sample responses are tiny, so compress everything for this test.
+    compressing_client = TestClient(CompressionMiddleware(app, minimum_size=1))
+    expected = client.get("/api/weather/stats")
+    response = compressing_client.get("/api/weather/stats", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.headers["ETag"] == f"W/{expected.headers['ETag']}"
+    assert response.content == expected.content
+    revalidated = compressing_client.get("/api/weather/stats", headers={
+        "Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+    identity = compressing_client.get("/api/weather/stats", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in identity.headers
+    assert identity.headers["Vary"] == "Accept-Encoding"
+    assert identity.content == expected.content
+
+    # Streamed responses are compressed chunk by chunk; encoded ones pass through.
+    export = compressing_client.get("/api/weather/export", headers={"Accept-Encoding": "gzip"})
+    assert export.headers["Content-Encoding"] == "gzip"
+    assert export.text == client.get("/api/weather/export").text
+    gzipped = compressing_client.get("/api/weather/export?gzip=true&format=ndjson",
+                                     headers={"Accept-Encoding": "gzip"})
+    assert "Vary" not in gzipped.headers
+    assert len(gzipped.text.splitlines()) == 3
@@ -0,0 +1,73 @@
+import sqlite3
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.core.database import configure_read_only, pool_options, read_only_database_url
+from app.core.generation import current_generation
+from app.core.startup import StartupTimer, warm_up
+from app.models import Base
+
+
+@pytest.fixture
+def database_file(tmp_path):
+    path = tmp_path / "serving.db"
+    setup_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=setup_engine)
+    setup_engine.dispose()
+    return path
+
+
+def test_read_only_url_opens_immutable_file():
+    assert read_only_database_url("sqlite:///./weather.db") == \
+        "sqlite:///file:./weather.db?mode=ro&immutable=1&uri=true"
+    assert read_only_database_url("sqlite:////data/weather.db") == \
+        "sqlite:///file:/data/weather.db?mode=ro&immutable=1&uri=true"
+    assert read_only_database_url("sqlite://") == "sqlite://"
+
+
+def test_read_only_url_keeps_existing_parameters(database_file):
+    url = read_only_database_url(f"sqlite:///{database_file}?timeout=5&mode=rwc")
+    assert url == f"sqlite:///file:{database_file}?timeout=5&mode=ro&immutable=1&uri=true"
+    # Opened read-only even without the `query_only` PRAGMA.
+    read_only_engine = create_engine(url)
+    with read_only_engine.connect() as connection:
+        with pytest.raises(OperationalError, match="readonly"):
+            connection.execute(text("DELETE FROM weather_records"))
+    read_only_engine.dispose()
+
+
+def test_pool_options_skip_single_connection_pools():
+    assert pool_options("sqlite:///./weather.db", 10, 30) == {"pool_size": 10, "max_overflow": 30}
+    for url in ("sqlite://", "sqlite:///:memory:"):
+        assert pool_options(url, 10, 30) == {}
+        create_engine(url, **pool_options(url, 10, 30)).dispose()
+
+
+def test_read_only_engine_refuses_writes_and_warms_up(database_file):
+    read_only_engine = create_engine(read_only_database_url(f"sqlite:///{database_file}"))
+    configure_read_only(read_only_engine)
+    with read_only_engine.connect() as connection:
+        assert connection.execute(text("PRAGMA query_only")).scalar() == 1
+        assert connection.execute(text("PRAGMA mmap_size")).scalar() > 0
+        with pytest.raises(OperationalError):
+            connection.execute(text("DELETE FROM weather_records"))
+    warm_up(read_only_engine)
+    read_only_engine.dispose()
+
+
+def test_generation_defaults_when_table_is_missing(tmp_path):
+    sqlite3.connect(tmp_path / "old.db").close()
+    old_engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with old_engine.connect() as connection:
+        assert current_generation(connection) == (0, None)
+    old_engine.dispose()
+
+
+def test_startup_timer_reports_phases():
+    timer = StartupTimer(0.0)
+    timer.mark("imports")
+    timer.mark("schema")
+    report = timer.report()
+    assert "imports" in report and "schema" in report
+    assert report.startswith("Startup took ")
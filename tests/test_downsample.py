@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from app.services.downsample import lttb_indices
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000)
+    values = np.sin(x / 50.0)
+    values[123] = 10.0  # A spike that must survive downsampling
+    indices = lttb_indices(x, values, 50)
+
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+    assert 123 in indices
+
+
+def test_lttb_handles_short_and_missing_series():
+    x = np.arange(10)
+    values = np.column_stack([np.arange(10.0), np.full(10, np.nan)])
+    assert list(lttb_indices(x, values, 20)) == list(range(10))
+    assert len(lttb_indices(x, values, 4)) == 4
+    with pytest.raises(ValueError):
+        lttb_indices(x, values, 2)
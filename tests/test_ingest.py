@@ -0,0 +1,437 @@
+import io
+import os
+import gzip
+import tarfile
+import pytest
+from datetime import date
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app import ingest
+from app.core.database import Base
+from app.models import Station, WeatherRecord
+from app.services import columnar, manifest, partitions, sources
+from app.services.bulk_writer import BulkWriter, record_rows
+
+SAMPLE_LINES = [
+    "19850101\t  -22\t -128\t   94\n",
+    "19850102\t -122\t -217\t    0\n",
+    "19850103\t-9999\t -244\t-9999\n",
+]
+
+
+def _write_station(directory, station_id, lines):
+    file_path = directory / f"{station_id}.txt"
+    file_path.write_text("".join(lines))
+    return str(file_path)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    wx_dir = tmp_path / "wx_data"
+    wx_dir.mkdir()
+    _write_station(wx_dir, "STATION1", SAMPLE_LINES)
+    _write_station(wx_dir, "STATION2", SAMPLE_LINES[:2])
+    return wx_dir
+
+
+@pytest.fixture
+def ingest_db(tmp_path, monkeypatch):
+    """Points the ingestion module at a throwaway SQLite database."""
+    test_engine = create_engine(
+        f"sqlite:///{tmp_path / 'ingest.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=test_engine)
+    session_factory = sessionmaker(
+        autocommit=False, autoflush=False, bind=test_engine)
+    monkeypatch.setattr(ingest, "engine", test_engine)
+    monkeypatch.setenv("SEQUENTIAL_INGEST", "true")
+    yield session_factory
+    test_engine.dispose()
+
+
+def test_process_file_converts_units_and_missing_values(data_dir):
+    records = ingest.process_file(str(data_dir / "STATION1.txt"))
+    assert len(records) == 3
+    assert records[0] == {
+        "station_id": "STATION1", "date": date(1985, 1, 1),
+        "max_temp": -2.2, "min_temp": -12.8, "precip": 9.4,
+    }
+    assert records[2]["max_temp"] is None
+    assert records[2]["precip"] is None
+
+
+def test_vectorized_parser_matches_process_file(data_dir):
+    file_path = str(data_dir / "STATION1.txt")
+    batch = ingest.process_file_vectorized(file_path)
+    assert len(batch) == 3
+    assert batch.to_records() == ingest.process_file(file_path)
+
+
+def test_column_batch_rows_match_record_rows(tmp_path):
+    lines = SAMPLE_LINES + ["19860101\t10\t-9999\t0\n", "19860102\t-9999\t5\t7\n"]
+    batch = ingest.process_file_vectorized(_write_station(tmp_path, "STATION1", lines))
+    groups = batch.station_year_rows()
+    assert [station_year for station_year, _ in groups] == [("STATION1", 1985), ("STATION1", 1986)]
+    assert groups == record_rows(batch.to_records())
+    assert groups[1][1][0] == ("STATION1", "1986-01-01", 1.0, None, 0.0)
+
+
+def test_vectorized_parser_falls_back_on_malformed_lines(tmp_path):
+    file_path = tmp_path / "STATION3.txt"
+    file_path.write_text(
+        "DATE\tTMAX\tTMIN\tPRCP\n" + SAMPLE_LINES[0] + "19850230\t1\t2\t3\n"
+        + SAMPLE_LINES[1])
+    records = ingest.process_file_vectorized(str(file_path)).to_records()
+    assert records == ingest.process_file(str(file_path))
+    assert [rec["date"] for rec in records] == [
+        date(1985, 1, 1), date(1985, 1, 2)]
+
+
+@pytest.mark.parametrize("streaming,parser", [
+    (False, "python"), (True, "python"), (False, "numpy"), (True, "numpy")])
+def test_ingest_data_is_idempotent(data_dir, ingest_db, streaming, parser):
+    ingest.ingest_data(str(data_dir), streaming=streaming, batch_size=2,
+                       parser=parser)
+    ingest.ingest_data(str(data_dir), streaming=streaming, batch_size=2,
+                       parser=parser)
+
+    session = ingest_db()
+    try:
+        assert session.query(WeatherRecord).count() == 5
+        assert session.query(WeatherRecord).filter_by(
+            station_id="STATION2").count() == 2
+    finally:
+        session.close()
+
+
+def test_manifest_skips_unchanged_and_reads_appended_rows(data_dir, ingest_db):
+    ingest.ingest_data(str(data_dir), parser="numpy")
+    session = ingest_db()
+    try:
+        entries = manifest.load_manifest(session.connection())
+        assert set(entries) == {"STATION1.txt", "STATION2.txt"}
+
+        station2 = data_dir / "STATION2.txt"
+        assert manifest.plan_file(
+            str(station2), str(data_dir), entries["STATION2.txt"]).action == manifest.SKIP
+
+        original_size = station2.stat().st_size
+        with open(station2, "a") as f:
+            f.write(SAMPLE_LINES[2])
+        plan = manifest.plan_file(str(station2), str(data_dir), entries["STATION2.txt"])
+        assert plan.action == manifest.APPEND
+        assert plan.offset == original_size
+        assert [rec["date"] for rec in ingest.process_file(plan.file_path, plan.offset)] == [
+            date(1985, 1, 3)]
+
+        station2.write_text(SAMPLE_LINES[1])
+        plan = manifest.plan_file(str(station2), str(data_dir), entries["STATION2.txt"])
+        assert plan.action == manifest.FULL
+        assert plan.offset == 0
+    finally:
+        session.close()
+
+
+def test_incremental_ingest_only_parses_changed_files(data_dir, ingest_db, monkeypatch):
+    ingest.ingest_data(str(data_dir))
+    with open(data_dir / "STATION2.txt", "a") as f:
+        f.write(SAMPLE_LINES[2])
+
+    parsed = []
+    original_process_file = ingest.process_file
+
+    def tracking_process_file(file_path, offset=0, content=None):
+        parsed.append((file_path, offset))
+        return original_process_file(file_path, offset, content)
+    monkeypatch.setitem(ingest.PARSERS, "python", tracking_process_file)
+
+    ingest.ingest_data(str(data_dir))
+    assert [path for path, offset in parsed] == [str(data_dir / "STATION2.txt")]
+    assert parsed[0][1] > 0
+
+    session = ingest_db()
+    try:
+        assert session.query(WeatherRecord).filter_by(
+            station_id="STATION2").count() == 3
+    finally:
+        session.close()
+
+
+@pytest.mark.parametrize("parser", ["python", "numpy"])
+def test_ingest_data_rereads_a_line_still_being_written(data_dir, ingest_db, parser):
+    # The writer has only got as far as the first digit of the precipitation.
+    station1 = data_dir / "STATION1.txt"
+    station1.write_text("".join(SAMPLE_LINES[:2]) + "19850103\t  -50\t -244\t    1")
+    ingest.ingest_data(str(data_dir), parser=parser)
+    session = ingest_db()
+    try:
+        entries = manifest.load_manifest(session.connection())
+        assert entries["STATION1.txt"].byte_offset == len("".join(SAMPLE_LINES[:2]))
+    finally:
+        session.close()
+
+    with open(station1, "a") as f:
+        f.write("2\n19850104\t  -10\t -100\t    0\n")
+    plan = manifest.plan_file(str(station1), str(data_dir), entries["STATION1.txt"])
+    assert (plan.action, plan.rereads_partial_line) == (manifest.APPEND, True)
+    assert ingest.ingest_data(str(data_dir), parser=parser) == {("STATION1", 1985)}
+
+    session = ingest_db()
+    try:
+        rows = session.query(WeatherRecord.date, WeatherRecord.precip).filter_by(
+            station_id="STATION1").order_by(WeatherRecord.date).all()
+        assert rows[2:] == [(date(1985, 1, 3), 1.2), (date(1985, 1, 4), 0.0)]
+        assert manifest.load_manifest(session.connection())["STATION1.txt"].byte_offset == \
+            station1.stat().st_size
+    finally:
+        session.close()
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_ingest_data_applies_files_edited_in_place(tmp_path, ingest_db, streaming):
+    wx_dir = tmp_path / "wx_data"
+    wx_dir.mkdir()
+    _write_station(wx_dir, "STATION1", SAMPLE_LINES + ["19860101\t   10\t    0\t    0\n"])
+    _write_station(wx_dir, "STATION2", SAMPLE_LINES)
+    ingest.ingest_data(str(wx_dir), streaming=streaming)
+
+    # Same size, so the file can only be re-read in full.
+    _write_station(wx_dir, "STATION1", [SAMPLE_LINES[0].replace("  -22", "  999")]
+                   + SAMPLE_LINES[1:] + ["19860101\t   10\t    0\t    0\n"])
+    assert ingest.ingest_data(str(wx_dir), streaming=streaming) == {("STATION1", 1985)}
+
+    session = ingest_db()
+    try:
+        record = session.query(WeatherRecord).filter_by(
+            station_id="STATION1", date=date(1985, 1, 1)).one()
+        assert record.max_temp == 99.9
+        assert session.query(WeatherRecord).count() == 7
+    finally:
+        session.close()
+    assert ingest.ingest_data(str(wx_dir), streaming=streaming) == set()
+
+
+def test_bulk_writer_upserts_and_restores_connection_state(tmp_path):
+    test_engine = create_engine(f"sqlite:///{tmp_path / 'writer.db'}")
+    Base.metadata.create_all(bind=test_engine)
+    records = ingest.process_file_vectorized(
+        _write_station(tmp_path, "STATION1", SAMPLE_LINES)).to_records()
+
+    with BulkWriter(test_engine) as writer:
+        assert writer._pragma("journal_mode") == "wal"
+        assert writer.write(records) == 3
+        assert writer.write(records) == 0
+        writer.commit()
+
+    changed = [dict(rec, max_temp=1.0) for rec in records]
+    with BulkWriter(test_engine, on_conflict="update", chunk_size=2) as writer:
+        assert writer.write(changed) == 3
+        assert writer.station_years == set()
+        writer.commit()
+        # Rows whose values are unchanged are not rewritten.
+        assert writer.write(changed) == 0
+        writer.commit()
+        assert writer.station_years == {("STATION1", 1985)}
+
+    with test_engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "delete"
+        assert connection.exec_driver_sql(
+            "SELECT COUNT(*), MIN(max_temp), MAX(max_temp) FROM weather_records").one() == (3, 1.0, 1.0)
+        indexes = {row[1] for row in connection.exec_driver_sql(
+            "PRAGMA index_list('weather_records')")}
+    assert {"ix_weather_records_station_id", "ix_weather_records_date"} <= indexes
+    test_engine.dispose()
+
+
+def test_bulk_writer_recreates_indexes_after_an_interrupted_load(tmp_path):
+    test_engine = create_engine(f"sqlite:///{tmp_path / 'writer.db'}")
+    Base.metadata.create_all(bind=test_engine)
+    records = ingest.process_file_vectorized(
+        _write_station(tmp_path, "STATION1", SAMPLE_LINES)).to_records()
+
+    def index_names():
+        with test_engine.connect() as connection:
+            return {row[1] for row in connection.exec_driver_sql(
+                "PRAGMA index_list('weather_records')")}
+
+    # The initial load drops the indexes, commits rows, then dies before
+    # `__exit__` rebuilds them.
+    writer = BulkWriter(test_engine).__enter__()
+    writer.write(records)
+    writer.commit()
+    writer.connection.close()
+    assert "ix_weather_records_date" not in index_names()
+
+    # The table is no longer empty, so the next load keeps the indexes and
+    # recreates the missing ones first.
+    with BulkWriter(test_engine) as writer:
+        assert writer.write(records) == 0
+    assert {"ix_weather_records_station_id", "ix_weather_records_date"} <= index_names()
+    test_engine.dispose()
+
+
+def test_ingest_data_returns_dirty_station_years(data_dir, ingest_db):
+    assert ingest.ingest_data(str(data_dir)) == {
+        ("STATION1", 1985), ("STATION2", 1985)}
+    assert ingest.ingest_data(str(data_dir)) == set()
+
+
+def test_ingest_data_refreshes_columnar_store(data_dir, ingest_db, tmp_path, monkeypatch):
+    store_dir = tmp_path / "columnar"
+    monkeypatch.setattr(columnar, "COLUMNAR_DIR", str(store_dir))
+    store = columnar.ColumnarStore(str(store_dir))
+
+    ingest.ingest_data(str(data_dir), build_columnar=True)
+    assert columnar.store_generation() == 1
+    first = store.station("STATION1", 1)
+    assert [str(day) for day in first.dates] == ["1985-01-01", "1985-01-02", "1985-01-03"]
+    assert first.nulls[2].tolist() == [True, False, True]
+    unchanged = os.stat(store_dir / (store_dir / "CURRENT").read_text() / "STATION1" / "ids.npy")
+
+    with open(data_dir / "STATION2.txt", "a") as f:
+        f.write(SAMPLE_LINES[2])
+    ingest.ingest_data(str(data_dir), build_columnar=True)
+
+    build_dir = store_dir / (store_dir / "CURRENT").read_text()
+    assert len(store.station("STATION2", 2).dates) == 3
+    # STATION1 had no new records, so its files were linked from the previous build.
+    assert os.stat(build_dir / "STATION1" / "ids.npy").st_ino == unchanged.st_ino
+    assert [entry for entry in os.listdir(store_dir) if entry.startswith("build-")] == [build_dir.name]
+
+    # A run without the store leaves it stale, so readers stop using it and
+    # the next run with the store rebuilds it in full, new records or not.
+    _write_station(data_dir, "STATION3", SAMPLE_LINES)
+    ingest.ingest_data(str(data_dir), build_columnar=False)
+    assert columnar.store_generation() == 2
+    assert store.station("STATION1", 3) is None
+    ingest.ingest_data(str(data_dir), build_columnar=True)
+    assert columnar.store_generation() == 3
+    assert len(store.station("STATION3", 3).dates) == 3
+    assert store.station("NOPE", 3) is None
+
+
+def _write_archive(path, members):
+    with tarfile.open(path, "w:gz") as archive:
+        for name, lines in members.items():
+            data = "".join(lines).encode()
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+def _as_records(parsed) -> list[dict]:
+    if isinstance(parsed, ingest.ColumnBatch):
+        return parsed.to_records()
+    return parsed
+
+
+@pytest.mark.parametrize("parser", ["python", "numpy"])
+def test_parsers_read_compressed_files_and_archive_members(data_dir, tmp_path, parser):
+    expected = ingest.process_file(str(data_dir / "STATION1.txt"))
+    compressed = tmp_path / "STATION1.txt.gz"
+    compressed.write_bytes(gzip.compress("".join(SAMPLE_LINES).encode()))
+    assert _as_records(ingest.PARSERS[parser](str(compressed))) == expected
+
+    archive = tmp_path / "drop.tar.gz"
+    _write_archive(archive, {"drop/STATION1.txt": SAMPLE_LINES, "drop/README": ["x"]})
+    tasks = [task for _, task in sources.parse_tasks([manifest.plan_file(str(archive), str(tmp_path))])]
+    assert [(task.source, task.last) for task in tasks] == [(f"{archive}::drop/STATION1.txt", True)]
+    task = tasks[0]
+    assert _as_records(ingest.PARSERS[parser](task.source, task.offset, task.content)) == expected
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_ingest_data_reads_archives_and_compressed_files(tmp_path, ingest_db, streaming):
+    wx_dir = tmp_path / "drop"
+    wx_dir.mkdir()
+    _write_archive(wx_dir / "stations.tgz", {"STATION1.txt": SAMPLE_LINES,
+                                             "STATION2.txt": SAMPLE_LINES[:2]})
+    (wx_dir / "STATION3.txt.gz").write_bytes(gzip.compress("".join(SAMPLE_LINES[:1]).encode()))
+
+    station_years = ingest.ingest_data(str(wx_dir), streaming=streaming)
+    assert station_years == {("STATION1", 1985), ("STATION2", 1985), ("STATION3", 1985)}
+    session = ingest_db()
+    try:
+        assert session.query(WeatherRecord).count() == 6
+        entries = manifest.load_manifest(session.connection())
+        assert sorted(entries) == ["STATION3.txt.gz", "stations.tgz"]
+    finally:
+        session.close()
+    # Unchanged files are skipped on the next run.
+    assert ingest.ingest_data(str(wx_dir), streaming=streaming) == set()
+
+    # A rewritten archive is re-read as a whole, never from a byte offset; only
+    # the station whose rows changed is dirty.
+    _write_archive(wx_dir / "stations.tgz", {"STATION1.txt": SAMPLE_LINES,
+                                             "STATION2.txt": SAMPLE_LINES})
+    assert ingest.ingest_data(str(wx_dir), streaming=streaming) == {("STATION2", 1985)}
+    session = ingest_db()
+    try:
+        assert session.query(WeatherRecord).filter_by(station_id="STATION2").count() == 3
+    finally:
+        session.close()
+
+
+def test_zstandard_sources(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    compressed = tmp_path / "STATION1.txt.zst"
+    compressed.write_bytes(zstandard.ZstdCompressor().compress("".join(SAMPLE_LINES).encode()))
+    assert sources.discover(str(tmp_path)) == [str(compressed)]
+    assert [rec["station_id"] for rec in ingest.process_file(str(compressed))] == ["STATION1"] * 3
+
+
+def test_ingest_data_maintains_station_catalog(data_dir, ingest_db):
+    ingest.ingest_data(str(data_dir))
+    with open(data_dir / "STATION2.txt", "a") as f:
+        f.write(SAMPLE_LINES[2])
+    ingest.ingest_data(str(data_dir))
+
+    session = ingest_db()
+    try:
+        stations = {station.station_id: station for station in session.query(Station)}
+        assert sorted(stations) == ["STATION1", "STATION2"]
+        station = stations["STATION2"]
+        assert (station.first_date, station.last_date) == (date(1985, 1, 1), date(1985, 1, 3))
+        assert (station.record_count, station.missing_max_temp, station.missing_min_temp,
+                station.missing_precip) == (3, 1, 0, 1)
+    finally:
+        session.close()
+
+
+def test_partitioned_storage_routes_prunes_and_freezes(tmp_path, ingest_db, monkeypatch):
+    monkeypatch.setattr(partitions, "PARTITIONED_STORAGE", True)
+    monkeypatch.setattr(partitions, "PARTITION_DIR", str(tmp_path / "partitions"))
+    wx_dir = tmp_path / "wx_data"
+    wx_dir.mkdir()
+    _write_station(wx_dir, "STATION1", SAMPLE_LINES[:2] + ["19950101\t  10\t  -10\t    0\n"])
+
+    assert ingest.ingest_data(str(wx_dir)) == {("STATION1", 1985), ("STATION1", 1995)}
+    assert sorted(os.listdir(tmp_path / "partitions")) == [
+        "weather_records_1980.db", "weather_records_1990.db"]
+    session = ingest_db()
+    try:
+        connection = session.connection()
+        assert session.query(WeatherRecord).count() == 0
+        eighties = partitions.records_source(connection, date(1985, 1, 1), date(1985, 12, 31))
+        assert eighties is partitions.records_table(1980)
+        records = partitions.records_source(connection)
+        rows = connection.execute(select(records.c.id, records.c.date).order_by(
+            records.c.station_id, records.c.date)).all()
+        assert [row.date for row in rows] == [date(1985, 1, 1), date(1985, 1, 2), date(1995, 1, 1)]
+        assert rows[-1].id > 1990 * partitions.ID_BLOCK
+        station = session.query(Station).one()
+        assert (station.first_date, station.last_date, station.record_count) == (
+            date(1985, 1, 1), date(1995, 1, 1), 3)
+    finally:
+        session.close()
+
+    partitions.set_frozen(ingest.engine, 1980, True)
+    with open(wx_dir / "STATION1.txt", "a") as f:
+        f.write(SAMPLE_LINES[2])
+    ingest.ingest_data(str(wx_dir))
+    session = ingest_db()
+    try:
+        table = partitions.record_tables(session.connection(), 1985, 1985)[0]
+        assert session.connection().execute(select(func.count()).select_from(table)).scalar() == 2
+    finally:
+        session.close()
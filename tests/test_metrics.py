@@ -0,0 +1,69 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core import metrics
+from app.core.metrics import MetricsConnection, MetricsMiddleware, instrument_engine
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    metrics.registry.clear()
+    yield
+    metrics.registry.clear()
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5.0, "/a")
+    assert list(histogram.samples()) == [
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="1.0"} 2',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        'latency_seconds_sum{route="/a"} 5.55',
+        'latency_seconds_count{route="/a"} 3',
+    ]
+
+
+def test_statement_label_keeps_verb_and_table():
+    assert metrics.statement_label(
+        "SELECT weather_records.id FROM weather_records WHERE station_id = ?") == "SELECT weather_records"
+    assert metrics.statement_label('INSERT INTO "weather_stats" (a) VALUES (?)') == "INSERT weather_stats"
+    assert metrics.statement_label("PRAGMA query_only") == "PRAGMA"
+
+
+def test_middleware_and_engine_hooks_feed_metrics_endpoint(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'metrics.db'}",
+                           connect_args={"check_same_thread": False, "factory": MetricsConnection})
+    instrument_engine(engine)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+        connection.execute(text("INSERT INTO items (id) VALUES (1), (2), (3)"))
+
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items")
+    def read_items():
+        with engine.connect() as connection:
+            return connection.execute(text("SELECT id FROM items")).scalars().all()
+
+    app.add_api_route("/metrics", metrics.metrics_response)
+    client = TestClient(app)
+    assert client.get("/items").json() == [1, 2, 3]
+    assert client.get("/missing").status_code == 404
+    metrics.record_phase("ingest", "parse", 0.2)  # Not recorded while disabled
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/items",status="200"} 1' in body
+    assert 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"} 1' in body
+    assert 'db_query_duration_seconds_count{statement="SELECT items"} 1' in body
+    assert 'db_query_duration_seconds_count{statement="INSERT items"} 1' in body
+    assert 'db_rows_returned_total{statement="SELECT items"} 3' in body
+    assert "job_phase_duration_seconds_count" not in body
+    engine.dispose()